@@ -0,0 +1,8 @@
+from phyether import main
+from phyether.line_benchmark import accuracy_report
+
+main.init()
+print(f"{'standard':<11} {'accuracy':<8} {'runtime':>10} {'points':>7} {'max error':>10}")
+for result in accuracy_report():
+    print(f"{result.standard:<11} {result.accuracy:<8} {result.runtime * 1e3:>8.2f}ms "
+          f"{result.points:>7} {result.max_error:>9.4f}V")
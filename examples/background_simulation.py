@@ -0,0 +1,29 @@
+import random
+import tempfile
+import time
+
+from phyether import main
+from phyether.dac import DAC
+from phyether.twisted_pair import TwistedPair
+
+main.init()
+dac = DAC(1, 7, 15)
+pair = TwistedPair(dac=dac, length=100, transmission_type='lossy')
+symbols = dac.random_signals(20000, random.Random(0))
+
+with tempfile.TemporaryDirectory() as directory:
+    run = pair.start_simulation(symbols, warm_start='dc', accuracy='signoff',
+                                partial_results=directory)
+    started = time.monotonic()
+    while run.running:
+        partial = run.partial()
+        points = len(partial[0]) if partial is not None else 0
+        print(f"{run.progress:6.1%} {points:>8} points")
+        if time.monotonic() - started > 5:
+            run.cancel()
+            print("Cancelled after 5 s")
+            break
+        time.sleep(0.5)
+    else:
+        analysis = run.wait()
+        print(f"Finished with {len(analysis.time)} points")
@@ -0,0 +1,10 @@
+from phyether.ldpc import ldpc_40gbase_t
+from phyether.ldpc_benchmark import benchmark_ldpc
+
+code = ldpc_40gbase_t()
+print(f"LDPC({code.n},{code.k}), {len(code.checks)} checks in {len(code.layers)} layers")
+print(f"{'Eb/N0':>6} {'encode':>12} {'decode':>12} {'iterations':>10} {'BER':>10} {'FER':>10}")
+for result in benchmark_ldpc(code):
+    print(f"{result.ebn0_db:>4.1f}dB {result.encode_rate:>8.0f}cw/s {result.decode_rate:>8.0f}cw/s "
+          f"{result.mean_iterations:>10.2f} {result.bit_error_rate:>10.2e} "
+          f"{result.frame_error_rate:>10.2e}")
@@ -0,0 +1,15 @@
+from phyether import main
+from phyether.line_benchmark import benchmark_line_models, fastest_models
+
+main.init()
+results = benchmark_line_models(lengths=(1, 10, 50, 100))
+
+print(f"{'cable':<6} {'length':>6} {'model':<12} {'runtime':>10} {'max error':>10} {'rms error':>10}")
+for result in results:
+    print(f"{result.cable:<6} {result.length:>5}m {result.model:<12} "
+          f"{result.runtime * 1e3:>8.2f}ms {result.max_error:>9.4f}V {result.rms_error:>9.4f}V")
+
+budget = 0.01
+print(f"\nFastest models with error below {budget} V:")
+for cable, lengths in fastest_models(results, budget).items():
+    print(cable, ', '.join(f"{length}m: {model}" for length, model in lengths.items()))
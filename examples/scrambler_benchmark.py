@@ -0,0 +1,6 @@
+from phyether.scrambler_benchmark import benchmark_scrambler
+
+print(f"{'implementation':>14} {'bits':>10} {'scramble':>14} {'descramble':>14}")
+for result in benchmark_scrambler():
+    print(f"{result.implementation:>14} {result.bits:>10} "
+          f"{result.scramble_rate / 1e6:>8.1f}Mbit/s {result.descramble_rate / 1e6:>8.1f}Mbit/s")
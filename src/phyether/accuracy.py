@@ -0,0 +1,72 @@
+from typing import Dict, Literal, NamedTuple, Union
+
+
+class AccuracyPreset(NamedTuple):
+    points_per_rise: int
+    """number of output points during one rise time"""
+    max_step_ratio: float
+    """maximum internal time step as multiple of output step"""
+    reltol: float
+    """ngspice relative error tolerance"""
+    compact: bool
+    """compact past history of LTRA lines"""
+    compactrel: float
+    """relative tolerance of LTRA history compaction"""
+    compactabs: float
+    """absolute tolerance of LTRA history compaction"""
+
+
+ACCURACY_PRESETS: Dict[str, AccuracyPreset] = {
+    "draft": AccuracyPreset(points_per_rise=2, max_step_ratio=2, reltol=1e-2,
+                            compact=True, compactrel=1e-2, compactabs=1e-4),
+    "normal": AccuracyPreset(points_per_rise=5, max_step_ratio=1, reltol=1e-3,
+                             compact=True, compactrel=1e-3, compactabs=1e-6),
+    "signoff": AccuracyPreset(points_per_rise=20, max_step_ratio=1, reltol=1e-4,
+                              compact=False, compactrel=1e-6, compactabs=1e-9),
+}
+
+Accuracy = Literal['draft', 'normal', 'signoff']
+
+
+class TransientSettings(NamedTuple):
+    step_time: float
+    """output step in seconds"""
+    max_time: float
+    """maximum internal step in seconds"""
+    options: Dict[str, Union[float, bool]]
+    """ngspice options set before analysis"""
+    ltra: Dict[str, float]
+    """parameters of LTRA models"""
+
+
+def transient_settings(accuracy: str, symbol_time: float, rise_time: float,
+                       transmission_delay: float) -> TransientSettings:
+    """Time steps and tolerances of transient analysis for accuracy preset
+
+    Output step resolves rise time of signal. Maximum step is limited also by symbol
+    time and transmission delay, because ngspice doesn't see breakpoints of external
+    sources and LTRA is inaccurate with steps longer than line delay.
+
+    :param accuracy: name of preset from :data:`ACCURACY_PRESETS`
+    :param symbol_time: duration of one symbol in seconds
+    :param rise_time: rise time of signal in seconds
+    :param transmission_delay: delay of the longest line in seconds
+    """
+    try:
+        preset = ACCURACY_PRESETS[accuracy]
+    except KeyError:
+        raise ValueError(f"Unknown accuracy preset {accuracy!r}, "
+                         f"expected one of {', '.join(ACCURACY_PRESETS)}") from None
+    step_time = min(rise_time, symbol_time) / preset.points_per_rise
+    max_time = step_time * preset.max_step_ratio
+    if transmission_delay > 0:
+        max_time = min(max_time, transmission_delay)
+    # flag options are always sent, options stay set in loaded circuit, so a preset
+    # without a flag has to clear it after a preset with it
+    options: Dict[str, Union[float, bool]] = {'reltol': preset.reltol,
+                                              'trytocompact': preset.compact}
+    return TransientSettings(
+        step_time=step_time,
+        max_time=max_time,
+        options=options,
+        ltra={'compactrel': preset.compactrel, 'compactabs': preset.compactabs})
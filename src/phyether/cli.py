@@ -0,0 +1,402 @@
+"""Headless batch runner of simulation and FEC scenarios
+
+Scenario files are JSON or TOML with a list of scenarios under ``scenarios`` key::
+
+    [[scenarios]]
+    name = "cat6-100m"
+    type = "twisted_pair"
+    modulation = "PAM16"
+    dac = {rise_time = 1, on_time = 7, cable = "Cat6"}
+    line = {transmission_type = "lossy", length = 100}
+    data = {random = 200, seed = 0}
+    run = {warm_start = "dc", accuracy = "normal"}
+
+    [[scenarios]]
+    name = "rs-544-514"
+    type = "reed_solomon"
+    code = {codeword_length = 544, message_length = 514, field_order = 1024}
+    message = {random = 514, seed = 0}
+    errors = {random = 15, seed = 1}
+
+    [[scenarios]]
+    name = "link-cat6-100m"
+    type = "link"
+    dac = {rise_time = 1, on_time = 7, cable = "Cat6"}
+    line = {transmission_type = "behavioural", length = 100}
+    channel = "response"
+    code = {codeword_length = 544, message_length = 514, field_order = 1024}
+    payload = {random = 100000, seed = 0}
+    equalizer = {ffe_taps = 7, dfe_taps = 4}
+    noise = 0.001
+
+Scenario types:
+
+* ``twisted_pair`` - ``dac`` and ``line`` are keyword arguments of :class:`DAC` and
+  :class:`TwistedPair`, ``run`` of :meth:`TwistedPair.simulate`
+* ``ethernet_cable`` - the same for :class:`EthernetCable`, ``data`` is one data
+  description for every pair or a list of four
+* ``reed_solomon`` - ``code`` are keyword arguments of :class:`RS_Original`,
+  message is encoded, symbols at ``errors`` positions are corrupted and decoded
+* ``link`` - ``payload`` bytes go through :class:`LinkPipeline`: optional RS
+  ``code``, PAM16 or DSQ128 (``dsq128 = true``) symbols, ``channel`` and
+  ``equalizer`` (keyword arguments of :class:`Equalizer`, omitted for slicing only),
+  ``noise`` is standard deviation of added noise in volts. ``channel`` is "spice"
+  (every batch simulated with ``run`` arguments), "response" (response of pair
+  simulated once) or a list of symbol-spaced taps of behavioural channel
+
+``dac.cable`` names attenuation of cable category (Cat5, Cat5e, Cat6, Cat7) or is
+a table of k1, k2 and k3. ``modulation`` (NRZ, PAM4, PAM16) sets highest symbol
+and symbol step of DAC. Data is a list of symbols, ``{random = n, seed = s}`` or
+``{hex = "...", dsq128 = false, scramble = false}`` modulated with scenario
+modulation, PAM16 data can be scrambled by :class:`Scrambler` first.
+
+Nothing in this module imports Qt, so it can run on servers without display.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import random
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+from PySpice.Spice.NgSpice.Shared import NgSpiceShared
+
+from phyether.dac import DAC, Attenuation, Cat5, Cat5e, Cat6, Cat7, NoLossCable
+from phyether.ethernet_cable import EthernetCable
+from phyether.link_pipeline import Channel, LinkPipeline, ResponseChannel, SpiceChannel
+from phyether.main import init
+from phyether.pam import NRZ, PAM, PAM4, PAM16
+from phyether.receiver import Equalizer
+from phyether.reed_solomon import RS_Original
+from phyether.scrambler import Scrambler
+from phyether.twisted_pair import TwistedPair
+from phyether.util import list_from_string, string_to_bytes, string_to_list
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    try:
+        import tomli as tomllib  # type: ignore
+    except ImportError:
+        tomllib = None
+
+CABLES = {"none": NoLossCable, "Cat5": Cat5, "Cat5e": Cat5e, "Cat6": Cat6, "Cat7": Cat7}
+MODULATIONS: Dict[str, Callable[[], PAM]] = {"NRZ": NRZ, "PAM4": PAM4, "PAM16": PAM16}
+
+
+class ScenarioResult(NamedTuple):
+    name: str
+    type: str
+    ok: bool
+    runtime: float
+    """wall time of scenario in seconds"""
+    output: str
+    """path of written result, empty if scenario failed"""
+    message: str
+    """summary of result or error"""
+
+
+def load_scenarios(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    """Read scenarios from JSON or TOML file, chosen by extension
+
+    :param path: scenario file, scenarios without name are named after file and index
+    """
+    path = Path(path)
+    if path.suffix == '.toml':
+        if tomllib is None:
+            raise ValueError("Reading TOML scenarios needs Python 3.11 or tomli package")
+        with open(path, 'rb') as file:
+            content = tomllib.load(file)
+    else:
+        with open(path) as file:
+            content = json.load(file)
+    scenarios = content.get('scenarios') if isinstance(content, dict) else None
+    if not isinstance(scenarios, list):
+        raise ValueError(f"{path}: expected list of scenarios under 'scenarios' key")
+    for index, scenario in enumerate(scenarios):
+        scenario.setdefault('name', f"{path.stem}-{index}")
+    return scenarios
+
+
+def _modulation(scenario: Mapping[str, Any]) -> Optional[PAM]:
+    name = scenario.get('modulation')
+    if name is None:
+        return None
+    try:
+        return MODULATIONS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown modulation {name!r}, "
+                         f"expected one of {', '.join(MODULATIONS)}") from None
+
+
+def _dac(scenario: Mapping[str, Any]) -> DAC:
+    kwargs = dict(scenario.get('dac', {}))
+    modulation = _modulation(scenario)
+    if modulation is not None:
+        kwargs.setdefault('high_symbol', modulation.high_symbol)
+        kwargs.setdefault('symbol_step', modulation.symbol_step)
+    cable = kwargs.pop('cable', None)
+    if isinstance(cable, str):
+        if cable not in CABLES:
+            raise ValueError(f"Unknown cable {cable!r}, expected one of {', '.join(CABLES)}")
+        kwargs['attenuation'] = CABLES[cable]()
+    elif cable is not None:
+        kwargs['attenuation'] = Attenuation(**cable)
+    return DAC(**kwargs)
+
+
+def _symbols(spec: Any, dac: DAC, modulation: Optional[PAM]) -> List[int]:
+    if isinstance(spec, list):
+        return [int(symbol) for symbol in spec]
+    if 'random' in spec:
+        return dac.random_signals(int(spec['random']), random.Random(spec.get('seed')))
+    if 'hex' in spec:
+        if modulation is None:
+            raise ValueError("Hexadecimal data needs scenario modulation")
+        if isinstance(modulation, PAM16):
+            scrambler = Scrambler() if spec.get('scramble', False) else None
+            signals = modulation.hex_to_signals(spec['hex'], spec.get('dsq128', False),
+                                                scrambler)
+        else:
+            signals = modulation.hex_to_signals(spec['hex'])
+        symbols: List[int] = list_from_string(signals)
+        return symbols
+    raise ValueError(f"Data must be a list of symbols, random or hex, got {spec!r}")
+
+
+def _analysis_arrays(analysis) -> Dict[str, np.ndarray]:
+    arrays = {'time': np.asarray(analysis.time, dtype=float)}
+    arrays.update({name: np.asarray(node, dtype=float)
+                   for name, node in analysis.nodes.items()})
+    return arrays
+
+
+def _run_twisted_pair(scenario: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    dac = _dac(scenario)
+    symbols = _symbols(scenario.get('data', []), dac, _modulation(scenario))
+    pair = TwistedPair(dac=dac, **scenario.get('line', {}))
+    return _analysis_arrays(pair.simulate(symbols, **scenario.get('run', {})))
+
+
+def _run_ethernet_cable(scenario: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    dac = _dac(scenario)
+    modulation = _modulation(scenario)
+    data = scenario.get('data', [])
+    if isinstance(data, dict) or not data or not isinstance(data[0], (list, dict)):
+        data = [data] * 4
+    if len(data) != 4:
+        raise ValueError(f"Ethernet cable needs data for 4 pairs, got {len(data)}")
+    symbols = tuple(_symbols(spec, dac, modulation) for spec in data)
+    cable = EthernetCable(dac=dac, **scenario.get('line', {}))
+    return _analysis_arrays(cable.simulate(symbols, **scenario.get('run', {})))  # type: ignore
+
+
+def _run_reed_solomon(scenario: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    code = RS_Original(**scenario['code'])
+    field_order = code.gf.order
+    message_spec = scenario.get('message', {'random': code.message_length})
+    if isinstance(message_spec, str):
+        message = string_to_list(message_spec)
+    elif isinstance(message_spec, list):
+        message = [int(symbol) for symbol in message_spec]
+    else:
+        rng = random.Random(message_spec.get('seed'))
+        message = [rng.randrange(field_order) for _ in range(int(message_spec['random']))]
+    codeword = code.encode(list(message), custom=scenario.get('custom', False))
+
+    errors_spec = scenario.get('errors', [])
+    if isinstance(errors_spec, list):
+        positions = [int(position) for position in errors_spec]
+    else:
+        rng = random.Random(errors_spec.get('seed'))
+        positions = rng.sample(range(len(codeword)), int(errors_spec['random']))
+    received = list(codeword)
+    for position in positions:
+        # xor with non-zero value always changes the symbol
+        received[position] ^= 1 + (position % (field_order - 1))
+    decoded, found, fixed = code.decode(list(received), custom=scenario.get('custom', False))
+    return {
+        'message': np.array(message),
+        'codeword': np.array(codeword),
+        'error_positions': np.array(sorted(positions), dtype=int),
+        'received': np.array(received),
+        'decoded': np.array(decoded),
+        'errors_found': np.array([found]),
+        'fixed': np.array([fixed]),
+        'success': np.array([list(decoded) == message]),
+    }
+
+
+def _run_link(scenario: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    dac = _dac({'modulation': 'PAM16', **scenario})
+    channel_spec = scenario.get('channel', 'response')
+    channel: Channel
+    if isinstance(channel_spec, list):
+        channel = ResponseChannel(dac, [float(tap) for tap in channel_spec])
+    elif channel_spec in ('spice', 'response'):
+        pair = TwistedPair(dac=dac, **scenario.get('line', {}))
+        if channel_spec == 'spice':
+            channel = SpiceChannel(pair, **scenario.get('run', {}))
+        else:
+            channel = ResponseChannel.from_pair(pair, **scenario.get('run', {}))
+    else:
+        raise ValueError(f"Channel must be 'spice', 'response' or list of taps, "
+                         f"got {channel_spec!r}")
+    payload_spec = scenario.get('payload', {'random': 10000})
+    if isinstance(payload_spec, str):
+        payload = string_to_bytes(payload_spec)
+    else:
+        payload = np.random.default_rng(payload_spec.get('seed')).bytes(
+            int(payload_spec['random']))
+    pipeline = LinkPipeline(
+        channel,
+        reed_solomon=RS_Original(**scenario['code']) if 'code' in scenario else None,
+        use_dsq128=scenario.get('dsq128', False),
+        equalizer=(Equalizer.from_dac(dac, **scenario['equalizer'])
+                   if 'equalizer' in scenario else None),
+        noise=scenario.get('noise', 0))
+    result = pipeline.simulate(payload, seed=scenario.get('seed'))
+    arrays = {field: np.array([value]) for field, value in result._asdict().items()}
+    arrays.update(symbol_error_rate=np.array([result.symbol_error_rate]),
+                  pre_fec_ber=np.array([result.pre_fec_ber]),
+                  post_fec_ber=np.array([result.post_fec_ber]))
+    return arrays
+
+
+RUNNERS = {
+    'twisted_pair': _run_twisted_pair,
+    'ethernet_cable': _run_ethernet_cable,
+    'reed_solomon': _run_reed_solomon,
+    'link': _run_link,
+}
+
+
+def write_csv(path: Union[str, Path], arrays: Mapping[str, np.ndarray]) -> None:
+    """Write arrays as columns, or as (array, index, value) rows if lengths differ"""
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        lengths = {len(values) for values in arrays.values()}
+        if len(lengths) == 1:
+            writer.writerow(arrays.keys())
+            writer.writerows(zip(*(values.tolist() for values in arrays.values())))
+        else:
+            writer.writerow(('array', 'index', 'value'))
+            for name, values in arrays.items():
+                writer.writerows((name, index, value) for index, value in enumerate(values.tolist()))
+
+
+def run_scenario(scenario: Mapping[str, Any], output_directory: Union[str, Path],
+                 output_format: str = 'npz',
+                 library_path: Optional[str] = None) -> ScenarioResult:
+    """Run one scenario and write its arrays, errors are returned, not raised
+
+    :param scenario: scenario description, see module documentation
+    :param output_directory: directory of result files
+    :param output_format: 'npz' or 'csv'
+    :param library_path: path of libngspice, set in worker processes
+    """
+    if library_path is not None:
+        NgSpiceShared.LIBRARY_PATH = library_path
+    name = str(scenario.get('name', 'scenario'))
+    scenario_type = str(scenario.get('type', ''))
+    start = time.perf_counter()
+    try:
+        if scenario_type not in RUNNERS:
+            raise ValueError(f"Unknown scenario type {scenario_type!r}, "
+                             f"expected one of {', '.join(RUNNERS)}")
+        arrays = RUNNERS[scenario_type](scenario)
+        output = Path(output_directory) / f"{name}.{output_format}"
+        if output_format == 'csv':
+            write_csv(output, arrays)
+        else:
+            np.savez_compressed(output, **arrays)  # type: ignore[arg-type]
+        if scenario_type == 'reed_solomon':
+            message = f"{int(arrays['errors_found'][0])} errors found, " \
+                      f"{'decoded' if arrays['success'][0] else 'not decoded'}"
+        elif scenario_type == 'link':
+            message = f"pre-FEC BER {arrays['pre_fec_ber'][0]:.2e}, " \
+                      f"post-FEC BER {arrays['post_fec_ber'][0]:.2e}"
+        else:
+            message = f"{len(arrays['time'])} time points"
+        return ScenarioResult(name, scenario_type, True, time.perf_counter() - start,
+                              str(output), message)
+    except Exception as e:
+        traceback.print_exc()
+        return ScenarioResult(name, scenario_type, False, time.perf_counter() - start,
+                              '', f"{type(e).__name__}: {e}")
+
+
+def run_scenarios(scenarios: Sequence[Mapping[str, Any]],
+                  output_directory: Union[str, Path],
+                  output_format: str = 'npz',
+                  jobs: int = 1) -> List[ScenarioResult]:
+    """Run scenarios, in parallel processes if jobs > 1
+
+    :param scenarios: scenario descriptions, names must be unique
+    :param output_directory: directory of result files, created if it doesn't exist
+    :param output_format: 'npz' or 'csv', defaults to 'npz'
+    :param jobs: number of processes, defaults to 1, run in this process
+    :return: result of every scenario, in order of scenarios
+    """
+    names = [str(scenario.get('name')) for scenario in scenarios]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate scenario names: {', '.join(sorted(duplicates))}")
+    Path(output_directory).mkdir(parents=True, exist_ok=True)
+    if jobs <= 1 or len(scenarios) <= 1:
+        return [run_scenario(scenario, output_directory, output_format)
+                for scenario in scenarios]
+    # spawn: forked child would inherit loaded ngspice library of parent process
+    with ProcessPoolExecutor(max_workers=min(jobs, len(scenarios)),
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(run_scenario, scenario, output_directory, output_format,
+                                   NgSpiceShared.LIBRARY_PATH)
+                   for scenario in scenarios]
+        return [future.result() for future in futures]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='phyether-batch',
+        description="Run simulation and FEC scenarios without GUI")
+    parser.add_argument('scenarios', nargs='+', type=Path,
+                        help="JSON or TOML scenario files")
+    parser.add_argument('-o', '--output', type=Path, default=Path('results'),
+                        help="directory of result files, defaults to ./results")
+    parser.add_argument('-f', '--format', choices=('npz', 'csv'), default='npz',
+                        help="format of result files, defaults to npz")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="number of parallel processes, defaults to 1")
+    args = parser.parse_args(argv)
+
+    try:
+        init()
+    except FileNotFoundError as e:
+        # scenarios without ngspice can still run
+        print(f"Warning: {e}", file=sys.stderr)
+
+    try:
+        scenarios = [scenario for path in args.scenarios for scenario in load_scenarios(path)]
+        results = run_scenarios(scenarios, args.output, args.format, args.jobs)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    write_csv(args.output / 'summary.csv', {
+        field: np.array([getattr(result, field) for result in results], dtype=object)
+        for field in ScenarioResult._fields})
+    for result in results:
+        print(f"{'OK' if result.ok else 'FAILED':<6} {result.name:<24} "
+              f"{result.runtime:>8.2f}s  {result.message}")
+    return 0 if all(result.ok for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Whitespace-separated integer text in bases 2 to 16, parsed and formatted with numpy
+
+Parsing maps ASCII bytes of text to digit values through a lookup table and sums
+digits times powers of base per token, formatting builds a character matrix of
+digits, so neither calls int() or f-strings per number. Input the fast paths
+can't represent exactly (signs, prefixes, non-ASCII whitespace, numbers beyond
+int64) goes through plain Python conversion with its results and errors.
+"""
+from typing import Iterable, Union
+
+import numpy as np
+
+_SEPARATOR = -1
+_INVALID = -2
+
+# ASCII byte -> digit value, -1 whitespace, -2 anything else
+_DIGITS = np.full(256, _INVALID, dtype=np.int64)
+_DIGITS[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+_DIGITS[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16)
+_DIGITS[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+_DIGITS[np.frombuffer(b' \t\n\r\v\f', dtype=np.uint8)] = _SEPARATOR
+
+_CHARS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+_SPACE = ord(' ')
+
+
+def _max_digits(base: int) -> int:
+    """Longest number of digits whose every value fits into int64"""
+    digits = 0
+    while base**(digits + 1) <= 2**63:
+        digits += 1
+    return digits
+
+
+def _parse_slow(text: str, base: int) -> np.ndarray:
+    return np.array([int(token, base) for token in text.split()], dtype=object)
+
+
+def parse_ints(text: str, base: int = 10) -> np.ndarray:
+    """Parse "0 2 34 20..." like int() of every whitespace-separated token
+
+    :param text: numbers separated by whitespace
+    :param base: base of numbers, 2 to 16 use vectorized parsing
+    :return: int64 array, object array of Python ints for numbers beyond int64
+    :raises ValueError: token isn't a number in base
+    """
+    if not 2 <= base <= 16:
+        return _parse_slow(text, base)
+    try:
+        raw = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        return _parse_slow(text, base)
+    digits = _DIGITS[raw]
+    if np.any((digits == _INVALID) | (digits >= base)):
+        return _parse_slow(text, base)
+    is_digit = digits != _SEPARATOR
+    previous = np.concatenate(([False], is_digit[:-1]))
+    following = np.concatenate((is_digit[1:], [False]))
+    starts = np.flatnonzero(is_digit & ~previous)
+    ends = np.flatnonzero(is_digit & ~following) + 1
+    if not len(starts):
+        return np.zeros(0, dtype=np.int64)
+    lengths = ends - starts
+    if lengths.max() > _max_digits(base):
+        return _parse_slow(text, base)
+    positions = np.flatnonzero(is_digit)
+    # power of base of every digit is its distance from end of its token
+    exponents = np.repeat(ends, lengths) - positions - 1
+    powers = base ** np.arange(lengths.max(), dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.add.reduceat(digits[positions] * powers[exponents], offsets)
+
+
+def format_ints(values: Union[np.ndarray, Iterable[int]], base: int = 10, fill: int = 0) -> str:
+    """Format integers as "1 2 3 ...", like f'{value:0{fill}x}' of every value
+
+    :param values: integers
+    :param base: base of numbers, 2 to 16
+    :param fill: minimum number of digits, shorter numbers are padded with zeros
+    """
+    if not 2 <= base <= 16:
+        raise ValueError(f"Unsupported base {base}")
+    if isinstance(values, np.ndarray):
+        array = values.view(np.ndarray)
+    else:
+        values = list(values)
+        try:
+            array = np.asarray(values, dtype=np.int64)
+        except OverflowError:
+            array = np.asarray(values, dtype=object)
+    numbers = None
+    if array.dtype.kind in 'ib' or (array.dtype.kind == 'u'
+                                    and (not array.size or array.max() < 2**63)):
+        numbers = array.astype(np.int64)
+    if numbers is None or (len(numbers) and numbers.min() < 0):
+        # negative, non-integer or beyond int64
+        return ' '.join(_format_slow(int(value), base, fill) for value in array.ravel())
+    numbers = numbers.ravel()
+    if not len(numbers):
+        return ''
+
+    widths = np.ones(len(numbers), dtype=np.int64)
+    remaining = numbers // base
+    while np.any(remaining):
+        widths += remaining > 0
+        remaining //= base
+    columns = int(widths.max())
+    divisors = base ** np.arange(columns - 1, -1, -1, dtype=np.uint64)
+    matrix = (numbers.astype(np.uint64)[:, None] // divisors) % base
+    if fill > columns:
+        matrix = np.pad(matrix, ((0, 0), (fill - columns, 0)))
+        columns = fill
+    widths = np.maximum(widths, fill)
+
+    chars = np.empty((len(numbers), columns + 1), dtype=np.uint8)
+    chars[:, :-1] = _CHARS[matrix.astype(np.intp)]
+    chars[:, -1] = _SPACE
+    # leading zeros beyond width of every number are dropped, separator is kept
+    keep = np.arange(columns + 1) >= (columns - widths)[:, None]
+    return chars[keep][:-1].tobytes().decode('ascii')
+
+
+def _format_slow(value: int, base: int, fill: int) -> str:
+    sign = '-' if value < 0 else ''
+    value = abs(value)
+    digits = ''
+    while True:
+        value, digit = divmod(value, base)
+        digits = '0123456789abcdef'[digit] + digits
+        if not value:
+            break
+    return sign + digits.rjust(fill - len(sign), '0')
+
+
+def convert_ints(text: str, from_base: int, to_base: int, fill: int = 0) -> str:
+    """Reformat whitespace-separated numbers from one base to another"""
+    return format_ints(parse_ints(text, from_base), to_base, fill)
+
@@ -2,6 +2,8 @@ from __future__ import annotations
 import random
 from typing import Iterable, Optional, Sequence, List, Tuple
 
+import numpy as np
+
 from PySpice.Unit import *
 from PySpice.Unit.Unit import UnitValue  # pylint: disable=unused-wildcard-import, wildcard-import
 
@@ -83,8 +85,45 @@ class DAC:
 
         return pwl
 
-    def random_signals(self, number_of_signals: int) -> List[int]:
-            return random.choices(
+    def to_pwl_arrays(self, data: Sequence[int],
+                      settled: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Turn data into PWL form as arrays of times in seconds and voltages.
+
+        Same points as :meth:`to_pwl` without creating unit values for every point.
+
+        Args:
+            data (Sequence[int]): digital data
+            settled (bool): start at voltage of first symbol instead of 0 V, so that
+                DC operating point settles the line at that voltage
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: PWL times and voltages
+        """
+        voltages = np.asarray(data, dtype=float) * self.quotient
+        symbol_starts = float(self.rise_time) + np.arange(len(voltages)) * float(self.symbol_time)
+        times = np.empty(2 * len(voltages) + 2)
+        values = np.zeros_like(times)
+        times[0] = 0
+        times[1:-1:2] = symbol_starts
+        times[2:-1:2] = symbol_starts + float(self.on_time)
+        times[-1] = float(self.rise_time) + len(voltages) * float(self.symbol_time)
+        values[1:-1:2] = voltages
+        values[2:-1:2] = voltages
+        if settled and len(voltages):
+            values[0] = voltages[0]
+
+        return times, values
+
+    def random_signals(self, number_of_signals: int,
+                       rng: Optional[random.Random] = None) -> List[int]:
+            """Random symbols ending with 0.
+
+            Args:
+                number_of_signals (int): number of symbols
+                rng (Optional[random.Random]): generator, e.g. seeded for reproducible
+                    symbols, defaults to global generator of random module
+            """
+            return (rng if rng is not None else random).choices(
                 self.possible_symbols,
                 k=number_of_signals - 1
                 ) + [0]
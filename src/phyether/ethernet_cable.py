@@ -1,10 +1,15 @@
-from typing import Iterable, Literal, overload, Tuple
+import random
+from typing import Iterable, Literal, Optional, overload, Tuple
 from PySpice.Probe.WaveForm import TransientAnalysis
 
 from PySpice.Spice.Netlist import Circuit
-from PySpice.Unit import u_V, u_s
+from PySpice.Unit import u_V
 
+from phyether.accuracy import Accuracy, transient_settings
 from phyether.dac import DAC
+from phyether.probe import Probe
+from phyether.result_cache import ResultCache
+from phyether.spice_session import SimulationSession
 from phyether.twisted_pair import TwistedPair
 
 
@@ -18,19 +23,21 @@ class EthernetCable:
                  resistance: float = 0.188,
                  inductance: float = 525,
                  capacitance: float = 52,
-                 transmission_type: Literal['lossy'],
+                 transmission_type: Literal['lossy', 'txl', 'lumped'],
+                 segments: int = 20,
                  ) -> None:
         """Lossy transmission line
 
         transmission delay = length * sqrt(inductance * capacitance)
 
         :param dac: Digital to Analog Converter
-        :param transmission_type: lossy transmission line
+        :param transmission_type: model of lossy transmission line, see :class:`TwistedPair`
         :param output_impedance: In Ω, defaults to 100
         :param length: length of twisted pair in meters, defaults to 1
         :param resistance: resistance per meter, defaults to 0.188 Ω
         :param inductance: inductance per meter, defaults to 525 nH
         :param capacitance: capacitance per meter, defaults to 52 pF
+        :param segments: number of segments of lumped line, defaults to 20
         """
 
     @overload
@@ -58,46 +65,91 @@ class EthernetCable:
         self.D = TwistedPair(**kwargs, name="D")
         self.pairs = [self.A, self.B, self.C, self.D]
         self.transmission_delay = self.A.delay
+        self.circuit.V('offset', 'offset+', self.circuit.gnd, u_V(0))
         for pair in self.pairs:
-            self.circuit.subcircuit(pair)
-            self.circuit.X(pair.name, f'{pair.name}', f'{pair.name}_vin+', f'{pair.name}_vin-',
-                       f'{pair.name}_vout+', f'{pair.name}_vout-', 'offset+')
+            SimulationSession.add_signal_source(
+                self.circuit, f'{pair.name}signal',
+                f'{pair.name}_vin+', f'{pair.name}_vin-')
+            pair.add_to(self.circuit, f'{pair.name}_vin+', f'{pair.name}_vin-',
+                        f'{pair.name}_vout+', f'{pair.name}_vout-', 'offset+')
+        self._session: Optional[SimulationSession] = None
+
+    @property
+    def session(self) -> SimulationSession:
+        """Circuit kept loaded in ngspice between simulations"""
+        if self._session is None:
+            self._session = SimulationSession(self.circuit)
+        return self._session
+
+    def alter(self, **kwargs) -> None:
+        """Change parameters of all pairs without building new circuit
+
+        Accepts the same keyword arguments as :meth:`TwistedPair.alter`
+        """
+        for pair in self.pairs:
+            pair.alter(**kwargs)
+            if self._session is not None:
+                pair.alter_session(self._session)
+        self.transmission_delay = self.A.delay
 
     def simulate(self,
                  data: Tuple[Iterable[int], Iterable[int],
                              Iterable[int], Iterable[int]],
                  presimulation_ratio: int = 0,
-                 voltage_offset: float = 0) -> TransientAnalysis:
-        """_summary_
+                 voltage_offset: float = 0,
+                 warm_start: Literal['presimulation', 'dc'] = 'presimulation',
+                 seed: Optional[int] = None,
+                 accuracy: Accuracy = 'normal',
+                 probe: Optional[Probe] = None,
+                 cache: Optional[ResultCache] = None) -> TransientAnalysis:
+        """Simulate sending data over all four pairs
+
+        Circuit is loaded into ngspice on first simulation and reused afterwards.
 
         :param data: Symbol data to send over twisted pair.
         :param presimulation_ratio: Simulate ratio * transmission_delay worth of signals beforehand, defaults to 0
         :param voltage_offset: Voltage offset of one pair relative to ground, defaults to 0
+        :param warm_start: How line is settled before data. 'presimulation' sends random
+            symbols as set by presimulation_ratio, 'dc' starts from DC operating point at
+            voltage of the first symbol without presimulation, defaults to 'presimulation'
+        :param seed: Seed of presimulation symbols, same seed gives the same results, defaults to None
+        :param accuracy: Accuracy preset setting time steps and tolerances, one of
+            'draft', 'normal', 'signoff', see :mod:`phyether.accuracy`, defaults to 'normal'
+        :param probe: Nodes to save and their resolution, node names have pair prefix,
+            e.g. 'a_vout+', defaults to all nodes at time points chosen by ngspice
+        :param cache: Cache of results consulted before running ngspice, defaults to None
         :return: Transient analysis simulation
         """
-        self.circuit.VoltageSource(f'offset', 'offset+', self.circuit.gnd, u_V(voltage_offset))
-        end_time = u_s(0)
-        start_time = u_s(0)
+        if warm_start == 'dc':
+            presimulation_ratio = 0
+        rng = random.Random(seed) if seed is not None else None
+        session = self.session
+        session.alter('voffset', dc=voltage_offset)
+        end_time = 0.0
+        start_time = 0.0
         for pair, pair_data in zip(self.pairs, data):
-            presignals, pwl = pair._get_pwl(pair_data, presimulation_ratio)
-            end_time = pwl[-1][0] + pair.transmission_delay + pair.dac.rise_time
-            start_time = presignals * pair.dac.symbol_time
-            self.circuit.PieceWiseLinearVoltageSource(
-                f'{pair.name}signal', f'{pair.name}_vin+',
-                f'{pair.name}_vin-', values = pwl)
-
-        step_time = self.A.dac.rise_time / 10
-        simulator = self.circuit.simulator(temperature=25,
-            nominal_temperature=25,
-            simulator="ngspice-shared")
-        simulation = simulator.transient(
-            step_time=step_time,
-            end_time=end_time,
-            start_time=start_time)
-        simulation._time = simulation.time.as_ndarray() - simulation._time[0]
+            presignals, (times, voltages) = pair._get_pwl_arrays(
+                pair_data, presimulation_ratio, rng, settled=warm_start == 'dc')
+            end_time = times[-1] + float(pair.transmission_delay) + float(pair.dac.rise_time)
+            start_time = presignals * float(pair.dac.symbol_time)
+            session.set_signal(f'{pair.name}signal', times, voltages)
 
-        self.circuit.Voffset.detach()
+        settings = transient_settings(accuracy, float(self.A.dac.symbol_time),
+                                      float(self.A.dac.rise_time), float(self.transmission_delay))
+        if probe is None:
+            probe = Probe()
         for pair in self.pairs:
-            self.circuit[f'V{pair.name}signal'].detach()
+            if pair.line_model is not None and pair.line_model.set_ltra_options(settings.ltra):
+                pair.line_model.alter_session(session)
+        simulation = session.transient(
+            step_time=settings.step_time,
+            end_time=end_time,
+            start_time=start_time,
+            max_time=settings.max_time,
+            options=settings.options,
+            save=probe.nodes,
+            resample_step=probe.step_time(float(self.A.dac.symbol_time)),
+            cache=cache)
+        simulation._time = simulation.time.as_ndarray() - simulation._time[0]
 
         return simulation
@@ -0,0 +1,163 @@
+from typing import Dict, Hashable, Tuple
+
+import numpy as np
+
+from PySpice.Probe.WaveForm import TransientAnalysis
+
+from phyether.dac import DAC
+
+
+class EyeDiagram:
+    """Eye diagram accumulated as 2-D histogram of time within symbol and voltage
+
+    Waveform is interpolated to a uniform grid finer than time bins, so that edges
+    between samples are filled in, and folded by symbol time. Every grid point adds
+    one hit to its bin, there are no per-trace artists, so traces of any length and
+    number can be added in chunks, see :meth:`add`.
+    """
+
+    # grid points folded at once, bounds memory of long waveforms
+    CHUNK = 1 << 20
+
+    def __init__(self, symbol_time: float, *,
+                 voltage_range: Tuple[float, float] = (-2.5, 2.5),
+                 time_bins: int = 128, voltage_bins: int = 256,
+                 unit_intervals: int = 2, offset: float = 0,
+                 oversample: int = 4) -> None:
+        """
+        :param symbol_time: duration of one symbol (unit interval) in seconds
+        :param voltage_range: lowest and highest shown voltage, voltages outside of it
+            are counted in :attr:`outside`
+        :param time_bins: bins of whole eye, all unit intervals together
+        :param voltage_bins: bins of voltage_range
+        :param unit_intervals: symbols shown side by side
+        :param offset: time folded to the left edge of eye in seconds
+        :param oversample: grid points per time bin
+        """
+        if symbol_time <= 0:
+            raise ValueError("Symbol time must be positive")
+        self.symbol_time = float(symbol_time)
+        self.voltage_range = (float(min(voltage_range)), float(max(voltage_range)))
+        self.time_bins = time_bins
+        self.voltage_bins = voltage_bins
+        self.unit_intervals = unit_intervals
+        self.offset = float(offset)
+        self.period = self.symbol_time * unit_intervals
+        self._points_per_period = time_bins * oversample
+        self.step = self.period / self._points_per_period
+        # voltage bin, time bin
+        self.counts = np.zeros((voltage_bins, time_bins), dtype=np.int64)
+        self.outside = 0
+        # trace -> last added sample, next chunk of trace is interpolated from it
+        self._tails: Dict[Hashable, Tuple[float, float]] = {}
+
+    @classmethod
+    def for_dac(cls, dac: DAC, **kwargs) -> "EyeDiagram":
+        """Eye of DAC symbols with transitions in the middle of first and last unit
+        interval and voltage range of highest symbols with margin
+        """
+        symbol_time = float(dac.symbol_time)
+        max_voltage = dac.quotient * dac.high_symbol
+        kwargs.setdefault('voltage_range', (-1.25 * max_voltage, 1.25 * max_voltage))
+        # transitions start at multiples of symbol time and take rise time
+        kwargs.setdefault('offset', float(dac.rise_time) / 2 - symbol_time / 2)
+        return cls(symbol_time, **kwargs)
+
+    @property
+    def time_edges(self) -> np.ndarray:
+        """Edges of time bins relative to left edge of eye in seconds"""
+        return np.linspace(0, self.period, self.time_bins + 1)
+
+    @property
+    def voltage_edges(self) -> np.ndarray:
+        return np.linspace(*self.voltage_range, self.voltage_bins + 1)
+
+    @property
+    def extent(self) -> Tuple[float, float, float, float]:
+        """Extent of :attr:`counts` for imshow with origin='lower'"""
+        return (0, self.period, *self.voltage_range)
+
+    @property
+    def hits(self) -> int:
+        return int(self.counts.sum())
+
+    def clear(self) -> None:
+        self.counts[:] = 0
+        self.outside = 0
+        self._tails.clear()
+
+    def end_trace(self, trace: Hashable = None) -> None:
+        """Next samples of trace start a new waveform, not connected to previous ones"""
+        self._tails.pop(trace, None)
+
+    def add(self, time: np.ndarray, voltage: np.ndarray, trace: Hashable = None) -> None:
+        """Add next chunk of waveform
+
+        Consecutive calls with the same trace continue one waveform, chunks are joined
+        by interpolation from the last sample of previous chunk. Samples at or before
+        the last added time of trace are skipped, so growing partial results can be
+        passed whole.
+
+        :param time: increasing times in seconds
+        :param voltage: voltages at time
+        :param trace: key of waveform, e.g. index of simulation
+        """
+        time = np.asarray(time, dtype=float)
+        voltage = np.asarray(voltage, dtype=float)
+        tail = self._tails.get(trace)
+        if tail is not None:
+            new = time > tail[0]
+            time = np.concatenate(([tail[0]], time[new]))
+            voltage = np.concatenate(([tail[1]], voltage[new]))
+        if len(time) < 2:
+            if len(time):
+                self._tails[trace] = (float(time[-1]), float(voltage[-1]))
+            return
+        self._tails[trace] = (float(time[-1]), float(voltage[-1]))
+
+        # grid is anchored at offset, so chunks share grid points, [first, stop) of
+        # every chunk is added and each point is counted once
+        first = int(np.ceil((time[0] - self.offset) / self.step))
+        stop = int(np.ceil((time[-1] - self.offset) / self.step))
+        for start in range(first, stop, self.CHUNK):
+            points = np.arange(start, min(start + self.CHUNK, stop))
+            self._fold(points, np.interp(self.offset + points * self.step, time, voltage))
+
+    def _fold(self, points: np.ndarray, voltage: np.ndarray) -> None:
+        time_bin = (points % self._points_per_period) * self.time_bins // self._points_per_period
+        low, high = self.voltage_range
+        voltage_bin = np.floor((voltage - low) / (high - low) * self.voltage_bins).astype(np.int64)
+        inside = (voltage_bin >= 0) & (voltage_bin < self.voltage_bins)
+        self.outside += int(len(inside) - np.count_nonzero(inside))
+        flat = voltage_bin[inside] * self.time_bins + time_bin[inside]
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+
+    def add_analysis(self, analysis: TransientAnalysis, transmission_delay: float = 0,
+                     trace: Hashable = None) -> None:
+        """Add differential output vout+ - vout- of twisted pair simulation
+
+        :param analysis: simulation with vout+ and vout- nodes
+        :param transmission_delay: delay of pair, output is shifted back by it so that
+            symbols start at multiples of symbol time like at the input
+        :param trace: key of waveform, see :meth:`add`
+        """
+        time = np.asarray(analysis.time, dtype=float) - transmission_delay
+        voltage = analysis['vout+'].as_ndarray() - analysis['vout-'].as_ndarray()
+        delivered = time >= 0
+        self.add(time[delivered], voltage[delivered], trace)
+
+    def merge(self, other: "EyeDiagram") -> None:
+        """Add histogram of eye with the same bins, e.g. computed in another process"""
+        if (other.counts.shape != self.counts.shape or other.period != self.period
+                or other.voltage_range != self.voltage_range):
+            raise ValueError("Eye diagrams have different bins")
+        self.counts += other.counts
+        self.outside += other.outside
+
+    def density(self, log: bool = True) -> np.ndarray:
+        """Counts scaled to [0, 1] for display, log scale shows rare traces too"""
+        density = np.log1p(self.counts) if log else self.counts.astype(float)
+        peak = density.max() if density.size else 0
+        if peak > 0:
+            density /= peak
+        return density
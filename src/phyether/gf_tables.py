@@ -0,0 +1,247 @@
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Literal, Optional, Tuple, Type, Union
+
+import numpy as np
+
+from galois import GF, FieldArray, Poly
+
+from phyether.util import default_cache_directory
+
+# Conway polynomials used by galois for GF(2^m), x (= 2) is primitive in all of them
+DEFAULT_POLYS: Dict[int, int] = {
+    2**2: 0x7, 2**3: 0xB, 2**4: 0x13, 2**5: 0x25, 2**6: 0x5B, 2**7: 0x83,
+    2**8: 0x11D, 2**9: 0x211, 2**10: 0x46F, 2**11: 0x805, 2**12: 0x10EB,
+    2**13: 0x201B, 2**14: 0x40A9, 2**15: 0x8035, 2**16: 0x1002D,
+}
+
+# (field order, irreducible polynomial) -> primitive element
+PRIMITIVE_ELEMENTS: Dict[Tuple[int, int], int] = {
+    **{(order, poly): 2 for order, poly in DEFAULT_POLYS.items()},
+    (2**10, 0x409): 2,
+    # field of LDPC code of 10GBASE-T and 40GBASE-T
+    (2**6, 0x43): 2,
+}
+
+# (n, k, field order, irreducible polynomial) of standard codes
+STANDARD_CODES: Dict[str, Tuple[int, int, int, int]] = {
+    "RS(192,186,256)": (192, 186, 2**8, 0x11D),
+    "RS(360,326,1024)": (360, 326, 2**10, 0x409),
+    "RS(528,514,1024)": (528, 514, 2**10, 0x409),
+    "RS(544,514,1024)": (544, 514, 2**10, 0x409),
+}
+
+Repr = Literal['poly', 'int', 'power']
+
+
+def _degree(order: int) -> Optional[int]:
+    degree = order.bit_length() - 1
+    return degree if order > 2 and order == 1 << degree else None
+
+
+def _poly_int(poly: Union[int, str, Poly]) -> int:
+    if isinstance(poly, str):
+        poly = Poly.Str(poly)
+    return int(poly)
+
+
+def _multiply(a: int, b: int, order: int, poly: int) -> int:
+    """Carry-less multiplication of GF(2^m) elements modulo poly"""
+    product = 0
+    while b:
+        if b & 1:
+            product ^= a
+        b >>= 1
+        a <<= 1
+        if a & order:
+            a ^= poly
+    return product
+
+
+class GFTables:
+    """Precomputed Galois field data stored in one .npz file
+
+    Keeps primitive elements, log/antilog tables and Reed-Solomon generator
+    polynomials of binary extension fields, so that fields are constructed without
+    galois' prime factorization database and generator polynomials aren't multiplied
+    out again. Missing entries are computed on first use and written to the file.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None) -> None:
+        """
+        :param path: cache file, defaults to gf_tables.npz in subdirectory of
+            :func:`default_cache_directory`
+        """
+        self.path = (Path(path) if path is not None
+                     else default_cache_directory() / 'galois' / 'gf_tables.npz')
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._loaded = False
+        self._modified = False
+        self._lock = threading.RLock()
+
+    def _load(self) -> Dict[str, np.ndarray]:
+        if not self._loaded:
+            self._loaded = True
+            try:
+                with np.load(self.path) as data:
+                    self._arrays = {name: data[name] for name in data.files}
+            except (OSError, ValueError):
+                # new file starts with tables of all standard codes
+                self._populate()
+        return self._arrays
+
+    def _store(self, name: str, array: np.ndarray) -> None:
+        self._arrays[name] = array
+        self._modified = True
+
+    def _save(self) -> None:
+        if not self._modified:
+            return
+        self._modified = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            file_descriptor, temp_name = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        except OSError:
+            # read-only cache directory, tables stay in memory
+            return
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                np.savez_compressed(file, **self._arrays)  # type: ignore[arg-type]
+            os.replace(temp_name, self.path)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+    def primitive_element(self, order: int, poly: int) -> int:
+        """Primitive element of GF(order) defined by irreducible polynomial
+
+        Unknown polynomials are verified by galois once, which uses its database.
+        """
+        if (order, poly) in PRIMITIVE_ELEMENTS:
+            return PRIMITIVE_ELEMENTS[order, poly]
+        name = f'primitive_{order}_{poly}'
+        with self._lock:
+            arrays = self._load()
+            if name not in arrays:
+                degree = _degree(order)
+                assert degree is not None
+                element = int(GF(2, degree, irreducible_poly=poly).primitive_element)
+                self._store(name, np.array([element]))
+                self._save()
+            return int(arrays[name][0])
+
+    def field(self, order: int, irreducible_poly: Union[int, str, Poly, None] = None,
+              repr: Repr = 'int') -> Type[FieldArray]:
+        """Galois field class, built without database lookups for GF(2^m)
+
+        :param order: field order
+        :param irreducible_poly: polynomial as int, string or Poly, defaults to
+            Conway polynomial like galois
+        :param repr: element representation: 'int', 'poly' or 'power'
+        """
+        degree = _degree(order)
+        if degree is None or degree > 16:
+            return GF(order, irreducible_poly=irreducible_poly, repr=repr)  # type: ignore
+        poly = DEFAULT_POLYS[order] if irreducible_poly is None else _poly_int(irreducible_poly)
+        if poly.bit_length() - 1 != degree:
+            raise ValueError(f"Irreducible polynomial of GF({order}) must have degree {degree}")
+        return GF(2, degree, irreducible_poly=poly,  # type: ignore
+                  primitive_element=self.primitive_element(order, poly),
+                  verify=False, repr=repr)
+
+    def log_tables(self, order: int, poly: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Antilog (exp) and log tables of GF(2^m) in integer representation
+
+        exp has 2 * (order - 1) entries so that sums of two logarithms can index it,
+        log[0] is unused.
+        """
+        with self._lock:
+            tables = self._log_tables(order, poly)
+            self._save()
+            return tables
+
+    def _log_tables(self, order: int, poly: int) -> Tuple[np.ndarray, np.ndarray]:
+        exp_name, log_name = f'exp_{order}_{poly}', f'log_{order}_{poly}'
+        arrays = self._load()
+        if exp_name not in arrays:
+            alpha = self.primitive_element(order, poly)
+            exp = np.zeros(2 * (order - 1), dtype=np.int64)
+            value = 1
+            for power in range(order - 1):
+                exp[power] = value
+                value = _multiply(value, alpha, order, poly)
+            exp[order - 1:] = exp[:order - 1]
+            log = np.zeros(order, dtype=np.int64)
+            log[exp[:order - 1]] = np.arange(order - 1)
+            self._store(exp_name, exp)
+            self._store(log_name, log)
+        return arrays[exp_name], arrays[log_name]
+
+    def generator_coefficients(self, order: int, poly: int, parity: int,
+                               first_root: int = 0) -> np.ndarray:
+        """Coefficients of RS generator (x - a^first_root)...(x - a^(first_root+parity-1))
+
+        :param order: field order, power of 2
+        :param poly: irreducible polynomial of field
+        :param parity: number of parity symbols, degree of generator
+        :param first_root: power of primitive element of first root
+        :return: coefficients from highest degree as integers
+        """
+        with self._lock:
+            coefficients = self._generator_coefficients(order, poly, parity, first_root)
+            self._save()
+            return coefficients
+
+    def _generator_coefficients(self, order: int, poly: int, parity: int,
+                                first_root: int) -> np.ndarray:
+        name = f'generator_{order}_{poly}_{parity}_{first_root}'
+        arrays = self._load()
+        if name not in arrays:
+            exp, log = self._log_tables(order, poly)
+            coefficients = np.ones(1, dtype=np.int64)
+            for power in range(first_root, first_root + parity):
+                # g * (x + a^power), subtraction is addition in GF(2^m)
+                product = np.zeros_like(coefficients)
+                nonzero = coefficients != 0
+                product[nonzero] = exp[(log[coefficients[nonzero]] + power) % (order - 1)]
+                coefficients = np.append(coefficients, 0)
+                coefficients[1:] ^= product
+            self._store(name, coefficients)
+        return arrays[name]
+
+    def generator_poly(self, field: Type[FieldArray], parity: int, first_root: int = 0) -> Poly:
+        """RS generator polynomial of field with parity roots from a^first_root"""
+        order = field.order
+        poly = int(field.irreducible_poly)
+        if _degree(order) is None or \
+                int(field.primitive_element) != self.primitive_element(order, poly):
+            alpha = field.primitive_element
+            return Poly.Roots(alpha**np.arange(first_root, first_root + parity), field=field)
+        return Poly(field(self.generator_coefficients(order, poly, parity, first_root)))
+
+    def _populate(self) -> None:
+        for n, k, order, poly in STANDARD_CODES.values():
+            self._generator_coefficients(order, poly, n - k, 0)
+
+
+_default_tables = GFTables()
+
+
+def field(order: int, irreducible_poly: Union[int, str, Poly, None] = None,
+          repr: Repr = 'int') -> Type[FieldArray]:
+    """:meth:`GFTables.field` of default cache"""
+    return _default_tables.field(order, irreducible_poly, repr)
+
+
+def log_tables(order: int, irreducible_poly: Union[int, str, Poly, None] = None
+               ) -> Tuple[np.ndarray, np.ndarray]:
+    """:meth:`GFTables.log_tables` of default cache, polynomial defaults like :func:`field`"""
+    poly = DEFAULT_POLYS[order] if irreducible_poly is None else _poly_int(irreducible_poly)
+    return _default_tables.log_tables(order, poly)
+
+
+def generator_poly(field: Type[FieldArray], parity: int, first_root: int = 0) -> Poly:
+    """:meth:`GFTables.generator_poly` of default cache"""
+    return _default_tables.generator_poly(field, parity, first_root)
@@ -0,0 +1,100 @@
+import math
+from typing import Dict, List, Tuple
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QSizePolicy
+
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+from matplotlib.image import AxesImage
+from matplotlib.ticker import EngFormatter
+
+from PySpice.Probe.WaveForm import TransientAnalysis
+
+from phyether.eye_diagram import EyeDiagram
+from phyether.gui.simulation import PairSimulation, SimulationArgs
+from phyether.link_metrics import LinkMetrics, analysis_metrics
+
+
+class EyeDiagramCanvas(FigureCanvasQTAgg):
+    """Eye diagrams of twisted-pair simulations, one image per simulation
+
+    Waveforms are folded into :class:`EyeDiagram` histograms as partial and final
+    results arrive, images and :class:`LinkMetrics` of the latest results are
+    updated at most every REDRAW_INTERVAL.
+    """
+
+    # milliseconds between redraws
+    REDRAW_INTERVAL = 250
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        # simulation index -> eye, axes and image
+        self.eyes: Dict[str, EyeDiagram] = {}
+        self._axes: Dict[str, Axes] = {}
+        self._images: Dict[str, AxesImage] = {}
+        # index -> transmitted symbols and DAC arguments of simulation
+        self._sim_args: Dict[str, SimulationArgs] = {}
+        # index -> latest result not evaluated yet, analysis and transmission delay
+        self._latest: Dict[str, Tuple[TransientAnalysis, float]] = {}
+        self._redraw_timer = QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.setInterval(self.REDRAW_INTERVAL)
+        self._redraw_timer.timeout.connect(self._redraw)
+
+    def start(self, sim_args: List[SimulationArgs]):
+        """New eyes for simulations, symbol time and voltages are taken from their DACs"""
+        self.figure.clear()
+        self.eyes = {args.index: EyeDiagram.for_dac(args.init_args.dac) for args in sim_args}
+        self._sim_args = {args.index: args for args in sim_args}
+        self._latest = {}
+        self._axes = {}
+        self._images = {}
+        columns = math.ceil(math.sqrt(len(self.eyes))) if self.eyes else 1
+        rows = math.ceil(len(self.eyes) / columns) if self.eyes else 1
+        for position, (index, eye) in enumerate(self.eyes.items()):
+            axes = self.figure.add_subplot(rows, columns, position + 1)
+            axes.set_title(f"sim {index}: vout+ - vout-")
+            axes.xaxis.set_major_formatter(EngFormatter(unit='s'))
+            axes.yaxis.set_major_formatter(EngFormatter(unit='V'))
+            self._images[index] = axes.imshow(eye.density(), origin='lower', aspect='auto',
+                                              extent=eye.extent, cmap='inferno',
+                                              interpolation='nearest', vmin=0, vmax=1)
+            self._axes[index] = axes
+        self.figure.tight_layout()
+        self.draw_idle()
+
+    def add(self, analysis: TransientAnalysis, transmission_delay: float, index: str):
+        """Fold new samples of partial or final result of simulation into its eye"""
+        eye = self.eyes.get(index)
+        if eye is None:
+            return
+        eye.add_analysis(analysis, transmission_delay, trace=index)
+        self._latest[index] = (analysis, transmission_delay)
+        if not self._redraw_timer.isActive():
+            self._redraw_timer.start()
+
+    def _redraw(self):
+        for index, image in self._images.items():
+            image.set_data(self.eyes[index].density())
+        latest, self._latest = self._latest, {}
+        for index, (analysis, transmission_delay) in latest.items():
+            args = self._sim_args[index]
+            try:
+                metrics = analysis_metrics(analysis, PairSimulation._symbols(args.input),
+                                           args.init_args.dac, transmission_delay)
+            except ValueError as e:
+                print(f"Link metrics of simulation {index} failed: {e}")
+                continue
+            self._axes[index].set_xlabel(self._metrics_label(metrics))
+        self.draw_idle()
+
+    @staticmethod
+    def _metrics_label(metrics: LinkMetrics) -> str:
+        if not metrics.symbols:
+            return "No complete symbols yet"
+        return (f"eye height {metrics.eye_height * 1000:.1f} mV, "
+                f"width {metrics.eye_width * 1e9:.3f} ns, SNR {metrics.snr:.1f} dB\n"
+                f"SER {metrics.symbol_error_rate:.2e} "
+                f"({metrics.symbol_errors}/{metrics.symbols} symbols)")
@@ -1,33 +1,36 @@
+import os
 import sys
 import platform
-from typing import Optional, List
+from typing import TYPE_CHECKING, Callable, Dict, Optional, List
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QPushButton,
                              QLineEdit, QVBoxLayout, QFormLayout, QTabWidget,
                              QScrollArea, QLabel, QHBoxLayout, QCheckBox,
-                             QMessageBox, QFrame
+                             QMessageBox, QFrame, QProgressBar, QSpinBox
                              )
 from PyQt5.QtCore import Qt
 
 from phyether.dac import DAC, Attenuation
-from phyether.gui.pam_simulation import PAMSimulationCanvas, PAM16SimulationCanvas
-from phyether.gui.rs_register_tab import RSRegisterTab
-from phyether.gui.rs_tab import RSTab
 from phyether.gui.validators import IntListValidator
 from phyether.pam import NRZ, PAM, PAM16, PAM4
-from phyether.gui.simulation import (SimulationArgs, SimulationDisplay,
-                                     SimulationFormWidget, SimulationInitArgs,
-                                     SimulationRunArgs, SimulatorCanvas,
-                                     )
 from phyether.gui.util import create_msg_box
+from phyether.main import init_galois, init_ngspice, install_libngspice
+
+# tabs import galois and matplotlib, they are imported when tab is first shown
+if TYPE_CHECKING:
+    from phyether.gui.rs_tab import RSTab
+    from phyether.gui.simulation import SimulationArgs, SimulationFormWidget
 
 
 class EthernetGuiApp(QMainWindow):
     def __init__(self):
         try:
             super().__init__()
-            self.tabs: Optional[tuple[RSTab, QWidget, QWidget, QWidget, RSRegisterTab]] = None
-            self.tp_simulation_forms: List[SimulationFormWidget]
+            self.tabs: Optional[tuple[QWidget, QWidget, QWidget, QWidget, QWidget]] = None
+            self.rs_tab: Optional["RSTab"] = None
+            # builders of tab content, called when tab is shown for the first time
+            self.tab_builders: Dict[QWidget, Callable[[], None]] = {}
+            self.tp_simulation_forms: List["SimulationFormWidget"]
             simulation_enable = self.init_ngspice()
             self.init_ui(simulation_enable)
         except Exception as ex:
@@ -36,9 +39,8 @@ class EthernetGuiApp(QMainWindow):
 
     def init_ngspice(self):
         init_success = False
-        from phyether.main import init, install_libngspice
         try:
-            init()
+            init_ngspice()
             init_success = True
         except FileNotFoundError as ex:
             if platform.system() == "Windows":
@@ -55,7 +57,7 @@ class EthernetGuiApp(QMainWindow):
                     if install != QMessageBox.StandardButton.Yes:
                         return False
                     elif install_libngspice():
-                        init()
+                        init_ngspice()
                         init_success = True
                     else:
                         create_msg_box("ngspice installation failed, simulation tab will be disabled",
@@ -71,8 +73,8 @@ class EthernetGuiApp(QMainWindow):
         return init_success
 
     def closeEvent(self, a0) -> None:
-        if self.tabs is not None:
-            self.tabs[0].on_close()
+        if self.rs_tab is not None:
+            self.rs_tab.on_close()
         return super().closeEvent(a0)
 
     def init_ui(self, enable_simulation_tab):
@@ -82,12 +84,16 @@ class EthernetGuiApp(QMainWindow):
         self.setCentralWidget(central_widget)
 
         self.main_layout = QVBoxLayout(central_widget)
-        self.tabs = (RSTab(), QWidget(), QWidget(), QWidget(), RSRegisterTab())
+        self.tabs = (QWidget(), QWidget(), QWidget(), QWidget(), QWidget())
         if not enable_simulation_tab:
             self.tabs[3].setDisabled(True)
-        self.init_pam16()
-        self.init_pam()
-        self.init_twisted_pair()
+        self.tab_builders = {
+            self.tabs[0]: self.init_rs,
+            self.tabs[1]: self.init_pam16,
+            self.tabs[2]: self.init_pam,
+            self.tabs[3]: self.init_twisted_pair,
+            self.tabs[4]: self.init_rs_register,
+        }
         self.tab_widget = QTabWidget()
         self.tab_widget.setStyleSheet("QTabBar::tab:hover {\
                                       background-color: rgba(204, 204, 204, 178);\
@@ -100,11 +106,35 @@ class EthernetGuiApp(QMainWindow):
 
         self.tab_widget.currentChanged.connect(self.change_tab)
         self.main_layout.addWidget(self.tab_widget)
+        self.build_tab(self.tab_widget.currentWidget())
 
     def change_tab(self, index):
         self.tab_widget.setCurrentIndex(index)
+        self.build_tab(self.tab_widget.widget(index))
+
+    def build_tab(self, tab: QWidget):
+        builder = self.tab_builders.pop(tab, None)
+        if builder is not None:
+            print(f"Building tab: {builder.__name__}")
+            builder()
+
+    def init_rs(self):
+        from phyether.gui.rs_tab import RSTab
+        self.rs_tab = RSTab()
+        self.tabs[0].setLayout(QVBoxLayout())
+        self.tabs[0].layout().setContentsMargins(0, 0, 0, 0)
+        self.tabs[0].layout().addWidget(self.rs_tab)
+
+    def init_rs_register(self):
+        init_galois()
+        from phyether.gui.rs_register_tab import RSRegisterTab
+        self.tabs[4].setLayout(QVBoxLayout())
+        self.tabs[4].layout().setContentsMargins(0, 0, 0, 0)
+        self.tabs[4].layout().addWidget(RSRegisterTab())
 
     def init_pam16(self):
+        from matplotlib.backends.backend_qtagg import NavigationToolbar2QT
+        from phyether.gui.pam_simulation import PAM16SimulationCanvas
         self.pam16_simulator_data = QLineEdit()
         main_layout = QVBoxLayout()
         top_frame = QFrame()
@@ -122,9 +152,12 @@ class EthernetGuiApp(QMainWindow):
 
         self.pam16_canvas = PAM16SimulationCanvas()
         self.pam16_canvas.simulation_stopped_signal.connect(lambda: self.pam16_simulate_button.setDisabled(False))
+        self.tabs[1].layout().addWidget(NavigationToolbar2QT(self.pam16_canvas, self.tabs[1]))
         self.tabs[1].layout().addWidget(self.pam16_canvas)
 
     def init_pam(self):
+        from matplotlib.backends.backend_qtagg import NavigationToolbar2QT
+        from phyether.gui.pam_simulation import PAMSimulationCanvas
         self.pam_versions: List[PAM] = [NRZ(), PAM4(), PAM16()]
 
         self.pam_simulator_data = QLineEdit()
@@ -145,9 +178,13 @@ class EthernetGuiApp(QMainWindow):
         # Add your canvas
         self.pam_canvas = PAMSimulationCanvas()
         self.pam_canvas.simulation_stopped_signal.connect(lambda: self.pam_simulate_button.setDisabled(False))
+        self.tabs[2].layout().addWidget(NavigationToolbar2QT(self.pam_canvas, self.tabs[2]))
         self.tabs[2].layout().addWidget(self.pam_canvas)
 
     def init_twisted_pair(self):
+        from matplotlib.backends.backend_qtagg import NavigationToolbar2QT
+        from phyether.gui.eye_diagram import EyeDiagramCanvas
+        from phyether.gui.simulation import SimulationDisplay, SimulationFormWidget, SimulatorCanvas
         self.tabs[3].setLayout(QHBoxLayout())
 
         self.tp_simulation_forms = [SimulationFormWidget("Simulation parameters", 1)]
@@ -194,15 +231,54 @@ class EthernetGuiApp(QMainWindow):
         self.tabs[3].layout().addWidget(options_widget)
 
         self.tp_simulate_button = QPushButton("Simulate")
-        options_layout.addWidget(self.tp_simulate_button)
+        self.tp_cancel_button = QPushButton("Cancel")
+        self.tp_cancel_button.setDisabled(True)
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addWidget(self.tp_simulate_button)
+        buttons_layout.addWidget(self.tp_cancel_button)
+        options_layout.addLayout(buttons_layout)
         self.tp_simulate_button.clicked.connect(self.simulate)
 
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel("Parallel simulations:"))
+        self.tp_workers_spinbox = QSpinBox()
+        self.tp_workers_spinbox.setRange(1, max(os.cpu_count() or 1, 1))
+        workers_layout.addWidget(self.tp_workers_spinbox)
+        options_layout.addLayout(workers_layout)
+
+        self.tp_progress_bar = QProgressBar()
+        self.tp_progress_bar.setRange(0, 100)
+        options_layout.addWidget(self.tp_progress_bar)
+
         # Add your canvas
         self.tp_canvas = SimulatorCanvas()
-        self.tp_canvas.simulation_stopped_signal.connect(lambda: self.tp_simulate_button.setDisabled(False))
-        self.tabs[3].layout().addWidget(self.tp_canvas)
+        self.tp_canvas.simulation_stopped_signal.connect(self.simulation_stopped)
+        self.tp_canvas.simulation_progress_signal.connect(self.simulation_progress)
+        self.tp_cancel_button.clicked.connect(self.tp_canvas.cancel_simulation)
+        # zooming redraws only visible range, see SimulatorCanvas.lod
+        waveforms_widget = QWidget()
+        canvas_layout = QVBoxLayout(waveforms_widget)
+        canvas_layout.addWidget(NavigationToolbar2QT(self.tp_canvas, waveforms_widget))
+        canvas_layout.addWidget(self.tp_canvas)
+
+        # eye diagrams are accumulated from the same results as waveforms
+        self.tp_eye_canvas = EyeDiagramCanvas()
+        self.tp_canvas.simulations_started_signal.connect(self.tp_eye_canvas.start)
+        self.tp_canvas.waveform_signal.connect(self.tp_eye_canvas.add)
+        eye_widget = QWidget()
+        eye_layout = QVBoxLayout(eye_widget)
+        eye_layout.addWidget(NavigationToolbar2QT(self.tp_eye_canvas, eye_widget))
+        eye_layout.addWidget(self.tp_eye_canvas)
+
+        self.tp_view_tabs = QTabWidget()
+        self.tp_view_tabs.addTab(waveforms_widget, "Waveforms")
+        self.tp_view_tabs.addTab(eye_widget, "Eye diagram")
+        self.tabs[3].layout().addWidget(self.tp_view_tabs)
+        self.tp_workers_spinbox.setValue(self.tp_canvas.workers)
+        self.tp_workers_spinbox.valueChanged.connect(self.workers_changed)
 
     def add_simulation_form(self):
+        from phyether.gui.simulation import SimulationFormWidget
         # Fixing forms
         self.tp_simulation_forms = [f for f in self.tp_simulation_forms if f.parent()]
         for i, form in enumerate(self.tp_simulation_forms):
@@ -214,8 +290,9 @@ class EthernetGuiApp(QMainWindow):
         self.tp_simulation_form.insertRow(self.tp_simulation_form.rowCount() - 1, self.tp_simulation_forms[-1])
 
     def pam16_simulate(self):
+        from phyether.gui.simulation import SimulationArgs, SimulationInitArgs, SimulationRunArgs
         self.pam16_simulate_button.setDisabled(True)
-        simulation_args: List[SimulationArgs] = []
+        simulation_args: List["SimulationArgs"] = []
         encoder = PAM16()
         try:
             twisted_pairs_output = encoder.hex_to_signals(hex_data=self.pam16_simulator_data.text(), use_dsq128=True)
@@ -244,8 +321,9 @@ class EthernetGuiApp(QMainWindow):
             self.pam16_simulate_button.setDisabled(False)
 
     def pam_simulate(self):
+        from phyether.gui.simulation import SimulationArgs, SimulationInitArgs, SimulationRunArgs
         self.pam_simulate_button.setDisabled(True)
-        simulation_args: List[SimulationArgs] = []
+        simulation_args: List["SimulationArgs"] = []
 
         for i, encoder in enumerate(self.pam_versions):
             try:
@@ -273,14 +351,28 @@ class EthernetGuiApp(QMainWindow):
             create_msg_box(f"Simulation failed: {ex}", "Simulation error!")
             self.pam_simulate_button.setDisabled(False)
 
+    def simulation_stopped(self):
+        self.tp_simulate_button.setDisabled(False)
+        self.tp_cancel_button.setDisabled(True)
+        self.tp_progress_bar.reset()
+
+    def simulation_progress(self, label: str, progress: float):
+        self.tp_progress_bar.setFormat(f"{label}: %p%")
+        self.tp_progress_bar.setValue(int(progress * 100))
+
+    def workers_changed(self, workers: int):
+        self.tp_canvas.workers = workers
+
     def simulate(self):
+        from phyether.gui.simulation import SimulationArgs, SimulationInitArgs, SimulationRunArgs
         print("Simulating...")
         self.tp_simulate_button.setDisabled(True)
+        self.tp_cancel_button.setDisabled(False)
 
         # Fixing forms
         self.tp_simulation_forms = [f for f in self.tp_simulation_forms if f.parent()]
 
-        simulation_args: List[SimulationArgs] = []
+        simulation_args: List["SimulationArgs"] = []
         for i, form in enumerate(self.tp_simulation_forms):
             # Fixing labels
             form.name_label.setText(f"{i+1}. Simulation parameters")
@@ -293,7 +385,8 @@ class EthernetGuiApp(QMainWindow):
                 capacitance=capacitance,
                 length=args["length"] # type: ignore
                 )
-            run = SimulationRunArgs(presimulation_ratio=2, voltage_offset=args["voltage_offset"]) # type: ignore
+            # same presimulation symbols for every form, so they can be compared
+            run = SimulationRunArgs(presimulation_ratio=2, voltage_offset=args["voltage_offset"], seed=0) # type: ignore
             simulation_args.append(
                 SimulationArgs(init_args=init,
                                run_args=run,
@@ -304,9 +397,10 @@ class EthernetGuiApp(QMainWindow):
             self.tp_canvas.simulate(simulation_args)
         except Exception as ex:
             create_msg_box(f"Simulation failed: {ex}", "Simulation error!")
-            self.tp_simulate_button.setDisabled(False)
+            self.simulation_stopped()
 
     def checkbox_toggled(self, _):
+        from phyether.gui.simulation import SimulationDisplay
         self.tp_canvas.set_display_params([SimulationDisplay(checkbox.text())
                                     for checkbox in self.plot_checkboxes
                                     if checkbox.isChecked()])
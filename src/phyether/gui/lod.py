@@ -0,0 +1,140 @@
+from typing import Dict, List, Tuple
+
+import numpy
+from matplotlib.axes import Axes
+from matplotlib.cbook import CallbackRegistry
+from matplotlib.lines import Line2D
+
+
+class MinMaxPyramid:
+    """Min/max envelopes of trace at decreasing resolutions
+
+    Level k splits samples into bins of FACTOR**k samples and keeps minimum and
+    maximum of every bin with their times, so that any time range can be drawn
+    with about as many points as there are pixels without losing peaks.
+    """
+
+    FACTOR = 4
+
+    def __init__(self, x: numpy.ndarray, y: numpy.ndarray, min_bins: int = 512) -> None:
+        """
+        :param x: increasing times
+        :param y: values
+        :param min_bins: coarsest level has at least this many bins
+        """
+        self.x = numpy.asarray(x, dtype=float)
+        self.y = numpy.asarray(y, dtype=float)
+        # level -> (time of minimum, minimum, time of maximum, maximum)
+        self.levels: List[Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray]] = [
+            (self.x, self.y, self.x, self.y)]
+        while len(self.levels[-1][1]) > min_bins * self.FACTOR:
+            self.levels.append(self._coarser(*self.levels[-1]))
+
+    @classmethod
+    def _coarser(cls, min_x: numpy.ndarray, min_y: numpy.ndarray,
+                 max_x: numpy.ndarray, max_y: numpy.ndarray):
+        bins = -(-len(min_y) // cls.FACTOR)
+        padding = bins * cls.FACTOR - len(min_y)
+        rows = numpy.arange(bins)
+
+        def reduce(x: numpy.ndarray, y: numpy.ndarray, fill: float, select) -> Tuple[
+                numpy.ndarray, numpy.ndarray]:
+            y = numpy.pad(y, (0, padding), constant_values=fill).reshape(bins, cls.FACTOR)
+            x = numpy.pad(x, (0, padding), mode='edge').reshape(bins, cls.FACTOR)
+            columns = select(y, axis=1)
+            return x[rows, columns], y[rows, columns]
+
+        return (*reduce(min_x, min_y, numpy.inf, numpy.argmin),
+                *reduce(max_x, max_y, -numpy.inf, numpy.argmax))
+
+    def view(self, start: float, stop: float, pixels: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Points drawing range [start, stop] at resolution of pixels
+
+        One point outside of range is kept on both sides so that lines reach edges.
+        """
+        first = max(int(numpy.searchsorted(self.x, start, side='right')) - 1, 0)
+        last = min(int(numpy.searchsorted(self.x, stop, side='left')) + 1, len(self.x))
+        level = 0
+        while (level + 1 < len(self.levels)
+               and (last - first) // self.FACTOR**level > 2 * pixels):
+            level += 1
+        if level == 0:
+            return self.x[first:last], self.y[first:last]
+        size = self.FACTOR**level
+        min_x, min_y, max_x, max_y = (array[first // size:-(-last // size)]
+                                      for array in self.levels[level])
+        # keep order of minimum and maximum inside of every bin
+        min_first = min_x <= max_x
+        x = numpy.empty(2 * len(min_x))
+        y = numpy.empty(2 * len(min_y))
+        x[0::2] = numpy.where(min_first, min_x, max_x)
+        x[1::2] = numpy.where(min_first, max_x, min_x)
+        y[0::2] = numpy.where(min_first, min_y, max_y)
+        y[1::2] = numpy.where(min_first, max_y, min_y)
+        return x, y
+
+
+class LODPlotter:
+    """Plots traces through min/max pyramids and redraws visible range on zoom
+
+    Lines only hold points of visible range decimated to width of axes in pixels,
+    full resolution data stays in pyramids, see :meth:`data`.
+    """
+
+    def __init__(self) -> None:
+        self._pyramids: Dict[Line2D, MinMaxPyramid] = {}
+        # callbacks are replaced when axes are cleared
+        self._callbacks: Dict[Axes, Tuple[CallbackRegistry, int]] = {}
+
+    def plot(self, axes: Axes, x: numpy.ndarray, y: numpy.ndarray, **kwargs) -> Line2D:
+        """Plot trace over its whole range, like :meth:`Axes.plot`"""
+        pyramid = MinMaxPyramid(x, y)
+        line, = axes.plot(*self._view(pyramid, *self._full_range(pyramid), axes.bbox.width),
+                          **kwargs)
+        self._pyramids[line] = pyramid
+        registry, _ = self._callbacks.get(axes, (None, None))
+        if registry is not axes.callbacks:
+            self._callbacks[axes] = (axes.callbacks,
+                                     axes.callbacks.connect('xlim_changed', self._xlim_changed))
+        return line
+
+    def data(self, line: Line2D) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Full resolution time and values of line, e.g. for export"""
+        pyramid = self._pyramids[line]
+        return pyramid.x, pyramid.y
+
+    def remove(self, line: Line2D) -> None:
+        self._pyramids.pop(line, None)
+
+    def clear(self) -> None:
+        self._pyramids.clear()
+
+    def reset(self) -> None:
+        """Show whole traces, so that axes can be autoscaled to them"""
+        for line, pyramid in self._pyramids.items():
+            if line.axes is not None:
+                line.set_data(*self._view(pyramid, *self._full_range(pyramid),
+                                          line.axes.bbox.width))
+
+    def update(self, axes: Axes) -> None:
+        """Show visible range of traces in axes and axes sharing x with them"""
+        self._xlim_changed(axes)
+
+    @staticmethod
+    def _full_range(pyramid: MinMaxPyramid) -> Tuple[float, float]:
+        if not len(pyramid.x):
+            return 0, 0
+        return pyramid.x[0], pyramid.x[-1]
+
+    @staticmethod
+    def _view(pyramid: MinMaxPyramid, start: float, stop: float,
+              width: float) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        return pyramid.view(start, stop, max(int(width), 100))
+
+    def _xlim_changed(self, axes: Axes) -> None:
+        # shared axes don't emit their own change
+        siblings = set(axes.get_shared_x_axes().get_siblings(axes))
+        start, stop = sorted(axes.get_xlim())
+        for line, pyramid in self._pyramids.items():
+            if line.axes in siblings:
+                line.set_data(*self._view(pyramid, start, stop, axes.bbox.width))
@@ -29,9 +29,8 @@ class PAM16SimulationCanvas(SimulatorCanvas):
         plot_x = plot_x[plot_x>=0]
         plot_y = (analysis['vout+'] - analysis['vout-'])[-len(plot_x):]
         plot_y = plot_y[:len(plot_x)]
-        self.subplot_axes[index].plot(
-            plot_x, plot_y,
-            label=self.display_legend[index])
+        self.lod.plot(self.subplot_axes[index], plot_x, plot_y,
+                      label=self.display_legend[index])
 
         for ax in self.subplot_axes:
            ax.legend()
@@ -67,9 +66,8 @@ class PAMSimulationCanvas(SimulatorCanvas):
         plot_x = plot_x[plot_x>=0]
         plot_y = (analysis['vout+'] - analysis['vout-'])[-len(plot_x):]
         plot_y = plot_y[:len(plot_x)]
-        self.subplot_axes[index].plot(
-            plot_x, plot_y,
-            label=self.display_legend[index])
+        self.lod.plot(self.subplot_axes[index], plot_x, plot_y,
+                      label=self.display_legend[index])
 
         for ax in self.subplot_axes:
            ax.legend()
@@ -0,0 +1,282 @@
+from pathlib import Path
+from time import monotonic
+from typing import Any, Optional
+
+import numpy as np
+
+from PyQt5.QtCore import (QAbstractTableModel, QModelIndex, QObject, QThread, Qt,
+                          pyqtSignal, pyqtSlot)
+from PyQt5.QtWidgets import (QApplication, QDialog, QFileDialog, QFormLayout, QHBoxLayout,
+                             QHeaderView, QLabel, QProgressBar, QPushButton, QSpinBox,
+                             QTableView, QVBoxLayout)
+
+from phyether.gui.rs_tab import rs_codec
+from phyether.gui.util import create_msg_box
+from phyether.rs_payload import PayloadBatch, PayloadCodec, bytes_to_symbols, symbols_to_bytes
+from phyether.util import string_to_bytes
+
+
+class PayloadWorker(QObject):
+    # encoded and decoded batch
+    batch_signal = pyqtSignal(object)
+    # seconds taken
+    finished_signal = pyqtSignal(float)
+    # error message
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, codec: PayloadCodec, symbols: np.ndarray,
+                 errors_per_codeword: int) -> None:
+        super().__init__()
+        self.codec = codec
+        self.symbols = symbols
+        self.errors_per_codeword = errors_per_codeword
+        # set from GUI thread, checked between batches
+        self.cancelled = False
+
+    @pyqtSlot()
+    def run(self):
+        start = monotonic()
+        try:
+            for batch in self.codec.run(self.symbols,
+                                        errors_per_codeword=self.errors_per_codeword):
+                if self.cancelled:
+                    print("Payload encoding cancelled")
+                    break
+                self.batch_signal.emit(batch)
+        except Exception as ex:
+            self.error_signal.emit(str(ex))
+        self.finished_signal.emit(monotonic() - start)
+
+
+class CodewordTableModel(QAbstractTableModel):
+    """One page of codewords, cells are formatted only when view shows them"""
+
+    HEADERS = ("Received message", "Received parity", "Decoded message", "Corrected symbols")
+
+    def __init__(self, page_size: int = 500) -> None:
+        super().__init__()
+        self.page_size = page_size
+        self.page = 0
+        self.n = 0
+        self.k = 0
+        self.digits = 2
+        self.codewords = np.zeros((0, 0), dtype=np.int64)
+        self.decoded = np.zeros((0, 0), dtype=np.int64)
+        self.errors = np.zeros(0, dtype=np.int64)
+        # codewords [0, done) were decoded
+        self.done = 0
+
+    def reset(self, codewords: int, n: int, k: int, bits: int):
+        self.beginResetModel()
+        self.page = 0
+        self.n, self.k = n, k
+        self.digits = -(-bits // 4)
+        self.codewords = np.zeros((codewords, n), dtype=np.uint16)
+        self.decoded = np.zeros((codewords, k), dtype=np.uint16)
+        self.errors = np.zeros(codewords, dtype=np.int64)
+        self.done = 0
+        self.endResetModel()
+
+    @property
+    def pages(self) -> int:
+        return max(-(-len(self.codewords) // self.page_size), 1)
+
+    def set_page(self, page: int):
+        self.beginResetModel()
+        self.page = min(max(page, 0), self.pages - 1)
+        self.endResetModel()
+
+    def add_batch(self, batch: PayloadBatch):
+        rows = slice(batch.first, batch.first + len(batch.codewords))
+        self.codewords[rows] = batch.codewords
+        self.decoded[rows] = batch.decoded
+        self.errors[rows] = batch.errors
+        self.done = rows.stop
+        first = max(rows.start - self.page * self.page_size, 0)
+        last = min(rows.stop - self.page * self.page_size, self.rowCount()) - 1
+        if first <= last:
+            self.dataChanged.emit(self.index(first, 0),
+                                  self.index(last, len(self.HEADERS) - 1))
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return max(min(len(self.codewords) - self.page * self.page_size, self.page_size), 0)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return len(self.HEADERS)
+
+    def _symbols(self, symbols: np.ndarray) -> str:
+        return ' '.join(f'{symbol:0{self.digits}x}' for symbol in symbols.tolist())
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row = self.page * self.page_size + index.row()
+        if row >= self.done:
+            return "..."
+        if index.column() == 0:
+            return self._symbols(self.codewords[row, :self.k])
+        if index.column() == 1:
+            return self._symbols(self.codewords[row, self.k:])
+        if index.column() == 2:
+            return self._symbols(self.decoded[row])
+        errors = int(self.errors[row])
+        return "Too many errors" if errors < 0 else str(errors)
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.DisplayRole) -> Any:
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return str(self.page * self.page_size + section + 1)
+
+
+class LargePayloadDialog(QDialog):
+    """Encodes file or pasted text of any size as consecutive codewords"""
+
+    def __init__(self, n: int, k: int, gf_power: int, parent=None) -> None:
+        super().__init__(parent)
+        self.setWindowTitle(f"Large payload - RS({n},{k},{2**gf_power})")
+        self.resize(1000, 700)
+        self.n, self.k, self.gf_power = n, k, gf_power
+        self.payload = b''
+        self.worker_thread: Optional[QThread] = None
+        self.worker: Optional[PayloadWorker] = None
+
+        layout = QVBoxLayout(self)
+        source_layout = QHBoxLayout()
+        self.load_button = QPushButton("Load file...")
+        self.load_button.clicked.connect(self.load_file)
+        self.paste_button = QPushButton("Paste")
+        self.paste_button.clicked.connect(self.paste)
+        self.payload_label = QLabel("No payload")
+        source_layout.addWidget(self.load_button)
+        source_layout.addWidget(self.paste_button)
+        source_layout.addWidget(self.payload_label, 1)
+        layout.addLayout(source_layout)
+
+        form = QFormLayout()
+        self.errors_spinbox = QSpinBox()
+        self.errors_spinbox.setRange(0, n)
+        form.addRow("Symbol errors per codeword:", self.errors_spinbox)
+        layout.addLayout(form)
+
+        run_layout = QHBoxLayout()
+        self.start_button = QPushButton("Encode and decode")
+        self.start_button.clicked.connect(self.start)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setDisabled(True)
+        self.cancel_button.clicked.connect(self.cancel)
+        self.save_button = QPushButton("Save decoded...")
+        self.save_button.setDisabled(True)
+        self.save_button.clicked.connect(self.save_decoded)
+        self.progress_bar = QProgressBar()
+        run_layout.addWidget(self.start_button)
+        run_layout.addWidget(self.cancel_button)
+        run_layout.addWidget(self.save_button)
+        run_layout.addWidget(self.progress_bar, 1)
+        layout.addLayout(run_layout)
+
+        self.model = CodewordTableModel()
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table.setWordWrap(False)
+        layout.addWidget(self.table, 1)
+
+        page_layout = QHBoxLayout()
+        self.previous_button = QPushButton("<")
+        self.previous_button.clicked.connect(lambda: self.show_page(self.model.page - 1))
+        self.next_button = QPushButton(">")
+        self.next_button.clicked.connect(lambda: self.show_page(self.model.page + 1))
+        self.page_label = QLabel()
+        self.status_label = QLabel()
+        page_layout.addWidget(self.previous_button)
+        page_layout.addWidget(self.page_label)
+        page_layout.addWidget(self.next_button)
+        page_layout.addWidget(self.status_label, 1)
+        layout.addLayout(page_layout)
+        self.show_page(0)
+
+    def set_payload(self, payload: bytes, source: str):
+        self.payload = payload
+        self.payload_label.setText(f"{source}: {len(payload)} bytes")
+
+    def load_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load payload")
+        if path:
+            self.set_payload(Path(path).read_bytes(), Path(path).name)
+
+    def paste(self):
+        self.set_payload(string_to_bytes(QApplication.clipboard().text()), "Clipboard")
+
+    def show_page(self, page: int):
+        self.model.set_page(page)
+        self.page_label.setText(f"Page {self.model.page + 1}/{self.model.pages}")
+
+    def start(self):
+        try:
+            reed_solomon = rs_codec(self.n, self.k, 2**self.gf_power, True)
+            codec = PayloadCodec(reed_solomon)
+        except Exception as ex:
+            create_msg_box(f"Error with RS arguments!: {ex}", "Error")
+            return
+        symbols = bytes_to_symbols(self.payload, self.gf_power)
+        self.model.reset(codec.codewords(len(symbols)), self.n, self.k, self.gf_power)
+        self.show_page(0)
+        self.progress_bar.setRange(0, len(self.model.codewords))
+        self.progress_bar.setValue(0)
+        self.status_label.setText("")
+        self.start_button.setDisabled(True)
+        self.save_button.setDisabled(True)
+        self.cancel_button.setDisabled(False)
+
+        self.worker = PayloadWorker(codec, symbols, self.errors_spinbox.value())
+        self.worker_thread = QThread(self)
+        self.worker.batch_signal.connect(self._batch)
+        self.worker.error_signal.connect(lambda error: create_msg_box(error, "Encoding error!"))
+        self.worker.finished_signal.connect(self._finished)
+        self.worker.moveToThread(self.worker_thread)
+        self.worker_thread.started.connect(self.worker.run)  # type: ignore
+        self.worker_thread.start()
+
+    def cancel(self):
+        if self.worker is not None:
+            self.worker.cancelled = True
+
+    def _batch(self, batch: PayloadBatch):
+        self.model.add_batch(batch)
+        self.progress_bar.setValue(self.model.done)
+
+    def _finished(self, seconds: float):
+        errors = self.model.errors[:self.model.done]
+        failed = int(np.count_nonzero(errors < 0))
+        self.status_label.setText(
+            f"{self.model.done} codewords in {seconds:.2f} s, "
+            f"{int(errors[errors > 0].sum())} symbols corrected, {failed} codewords failed"
+            + (", decoded payload matches input"
+               if self.model.done == len(self.model.codewords)
+               and self.decoded_payload() == self.payload else ""))
+        if self.worker_thread is not None:
+            self.worker_thread.exit()
+            self.worker_thread.wait()
+        self.start_button.setDisabled(False)
+        self.cancel_button.setDisabled(True)
+        self.save_button.setDisabled(self.model.done < len(self.model.codewords))
+
+    def decoded_payload(self) -> bytes:
+        """Decoded messages joined into payload of original length"""
+        return symbols_to_bytes(self.model.decoded.ravel(), self.gf_power,
+                                len(self.payload))
+
+    def save_decoded(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save decoded payload")
+        if path:
+            Path(path).write_bytes(self.decoded_payload())
+
+    def closeEvent(self, a0) -> None:
+        self.cancel()
+        if self.worker_thread is not None:
+            self.worker_thread.exit()
+            self.worker_thread.wait()
+        super().closeEvent(a0)
@@ -1,6 +1,6 @@
 import sys
 from pathlib import Path
-from typing import Literal, List, Dict
+from typing import Literal, List, Dict, Optional, Type
 
 from PyQt5.QtWidgets import QWidget, QLineEdit, QLabel
 from PyQt5.QtGui import QPixmap
@@ -8,8 +8,9 @@ from PyQt5.QtCore import pyqtSlot
 
 from phyether.gui.ui.rs_register_widget import Ui_rsRegisterForm
 
-from galois import GF, Poly
+from galois import FieldArray, Poly
 
+from phyether import gf_tables
 from phyether.gui.util import create_msg_box
 from phyether.gui.validators import IntListValidator
 from phyether.reed_solomon_bch import BCH_RS
@@ -19,16 +20,41 @@ class ReedSolomonRegisterArguments:
                  *, repr: Literal['poly', 'int', 'power'] = 'int') -> None:
         self.n = n
         self.k = k
-        self.gf = GF(gf,
-                     irreducible_poly=primitive_poly,
-                     repr=repr)
-        self.generating_poly: Poly = Poly([0], field=self.gf)
+        self.field_order = gf
+        self.primitive_poly = primitive_poly
+        self.repr = repr
+        # GF(1024) takes a while to build, fields of standards are built when selected
+        self._gf: Optional[Type[FieldArray]] = None
+        self._generating_poly: Optional[Poly] = None
+
+    @property
+    def gf(self) -> Type[FieldArray]:
+        if self._gf is None:
+            self._gf = gf_tables.field(self.field_order,
+                                       irreducible_poly=self.primitive_poly,
+                                       repr=self.repr)
+        return self._gf
+
+    @property
+    def generating_poly(self) -> Poly:
+        if self._generating_poly is None:
+            self._generating_poly = Poly([0], field=self.gf)
+        return self._generating_poly
+
+    @generating_poly.setter
+    def generating_poly(self, poly: Poly):
+        self._generating_poly = poly
+
+    def set_repr(self, repr: Literal['poly', 'int', 'power']):
+        self.repr = repr
+        if self._gf is not None:
+            self._gf.repr(repr)
 
     def copy(self):
         return ReedSolomonRegisterArguments(
-            self.n, self.k, self.gf.order,
-            self.gf.irreducible_poly,
-            repr=self.gf.element_repr
+            self.n, self.k, self.field_order,
+            self.gf.irreducible_poly if self._gf is not None else self.primitive_poly,
+            repr=self.repr
             )
 
 class RSRegisterTab(QWidget, Ui_rsRegisterForm):
@@ -92,8 +118,8 @@ class RSRegisterTab(QWidget, Ui_rsRegisterForm):
     def poly_repr_checked(self, bool):
         poly_or_int: Literal['int', 'poly'] = 'int' if bool else 'poly'
         for params in self.rs_param_mapping.values():
-            params.gf.repr(poly_or_int)
-        self.current_arguments.gf.repr(poly_or_int)
+            params.set_repr(poly_or_int)
+        self.current_arguments.set_repr(poly_or_int)
         self.rs_primitive_element_lineEdit.setText(str(self.current_arguments.gf.primitive_element))
         self.rs_primitive_poly_lineEdit.setText(str(self.current_arguments.gf.irreducible_poly))
         self.gen_poly_lineEdit.setText(str(self.current_arguments.generating_poly))
@@ -190,10 +216,7 @@ class RSRegisterTab(QWidget, Ui_rsRegisterForm):
 
     def _calculate_gen_poly(self):
         t = self.current_arguments.n - self.current_arguments.k
-        x_poly = Poly.Str('x', self.current_arguments.gf)
-        poly = x_poly - self.current_arguments.gf.primitive_element**0 # type: ignore
-        for i in range(1, t):
-            poly *= x_poly - self.current_arguments.gf.primitive_element**i
+        poly = gf_tables.generator_poly(self.current_arguments.gf, t)
 
         self.current_arguments.generating_poly = poly
         self.bch = BCH_RS(self.current_arguments.n, self.current_arguments.k, self.current_arguments.gf, self.current_arguments.generating_poly)
@@ -2,21 +2,29 @@ import itertools
 import math
 
 from enum import Enum, auto
+from functools import lru_cache
+from time import monotonic
 from traceback import print_exc
-from typing import Optional, Protocol, Union, cast, List, Tuple, Dict
+from typing import TYPE_CHECKING, Optional, Protocol, Union, cast, List, Tuple, Dict
 
 from PyQt5.QtCore import (pyqtSlot, pyqtSignal, QObject,
                           QThread, QWaitCondition, QMutex)
 from PyQt5.QtGui import QValidator
-from PyQt5.QtWidgets import QWidget, QAbstractButton, QLineEdit
+from PyQt5.QtWidgets import QWidget, QAbstractButton, QLineEdit, QPushButton
 
+import numpy as np
 from attr import define
 
 from phyether.gui.ui.rs_widget import Ui_RS_Form
 from phyether.gui.util import create_msg_box
+from phyether.conversions import convert_ints, format_ints, parse_ints
 from phyether.gui.validators import BinListValidator, HexListValidator, IntListValidator
-from phyether.reed_solomon import RS_Original
-from phyether.util import DictMapping, iterable_to_string, list_from_string, list_to_string, string_to_list
+from phyether.main import init_galois
+from phyether.util import DictMapping, iterable_to_string, list_from_string, list_to_string, string_to_bytes, string_to_list
+
+# galois is imported by worker thread on first encoding, not on startup
+if TYPE_CHECKING:
+    from phyether.reed_solomon import RS_Original
 
 class _EncodingException(Exception):
      pass
@@ -48,6 +56,23 @@ class ReedSolomonArgs(DictMapping):
     bch: bool = True
     force: bool = False
 
+@define(kw_only=True, slots=False)
+class EncodingJob(DictMapping):
+    rs_args: ReedSolomonArgs
+    format: Format
+    message_input: str
+    error_input: str
+    detect_only: bool = False
+    decode_only: bool = False
+    submitted: float = 0
+
+@lru_cache(maxsize=8)
+def rs_codec(n: int, k: int, gf: int, systematic: bool) -> "RS_Original":
+    """RS codec, building GF(1024) codec takes a while, so recent codecs are kept"""
+    init_galois()
+    from phyether.reed_solomon import RS_Original
+    return RS_Original(n, k, gf, systematic)
+
 class Conversion(Protocol):
     def __call__(self, line_edit: QLineEdit, *max_bits: int) -> None:
         ...
@@ -55,46 +80,36 @@ class Conversion(Protocol):
 class Converters:
     @staticmethod
     def _text_to_dec(line_edit: QLineEdit, *args) -> None:
-        list_of_bytes = string_to_list(line_edit.text())
-        line_edit.setText(list_to_string(list_of_bytes))
+        list_of_bytes = string_to_bytes(line_edit.text())
+        line_edit.setText(format_ints(np.frombuffer(list_of_bytes, dtype=np.uint8)))
 
     @staticmethod
     def _hex_to_dec(line_edit: QLineEdit, *args):
-        line_hex = line_edit.text()
-        line_edit.setText(' '.join(
-            [str(int(hex_num, 16)) for hex_num in line_hex.split()])
-            )
+        line_edit.setText(convert_ints(line_edit.text(), 16, 10))
 
     @staticmethod
     def _bin_to_dec(line_edit: QLineEdit, *args):
-        line_bin = line_edit.text()
-        line_edit.setText(' '.join(
-            [str(int(bin_num, 2)) for bin_num in line_bin.split()])
-            )
+        line_edit.setText(convert_ints(line_edit.text(), 2, 10))
 
     @staticmethod
     def _dec_to_text(line_edit: QLineEdit, *args):
-        line_bytes = list_from_string(line_edit.text())
-        line_string = iterable_to_string(line_bytes)
+        line_bytes = parse_ints(line_edit.text())
+        line_string = iterable_to_string(line_bytes.tolist())
         line_edit.setText(line_string)
 
     @staticmethod
     def _dec_to_hex(line_edit: QLineEdit, max_bits: int = 8, *args):
-        line_bytes = list_from_string(line_edit.text())
-        line_edit.setText(' '.join([f'{dec:0{math.ceil(max_bits/4)}x}' for dec in line_bytes]))
+        line_edit.setText(convert_ints(line_edit.text(), 10, 16, math.ceil(max_bits/4)))
 
     @staticmethod
     def _dec_to_bin(line_edit: QLineEdit, max_bits: int = 8, *args):
-        line_bytes = list_from_string(line_edit.text())
-        line_edit.setText(' '.join([f'{dec:0{max_bits}b}' for dec in line_bytes]))
+        line_edit.setText(convert_ints(line_edit.text(), 10, 2, max_bits))
 
 encode_decode_converters = {
     Format.TEXT: (lambda x, _ = None: x, lambda x, _ = None: x),
     Format.DEC: (lambda x, _ = None: list_from_string(x), lambda x, _ = None: list_to_string(x)),
     Format.HEX: (lambda x, _ = None: list_from_string(x, 16), lambda x, bits = None: list_to_string(x, 16, math.ceil(bits/4))),
-    Format.BIN: (lambda x, _ = None,: list_from_string(x, 2),
-                 lambda x, max_bits = 0: ' '.join(
-                     [binary.rjust(max_bits, "0") for binary in list_to_string(x, 2).split()])),
+    Format.BIN: (lambda x, _ = None,: list_from_string(x, 2), lambda x, max_bits = 0: list_to_string(x, 2, max_bits)),
 }
 
 qline_converters: Dict[Tuple[Format, Format], List[Conversion]] = {
@@ -113,6 +128,11 @@ qline_converters: Dict[Tuple[Format, Format], List[Conversion]] = {
 }
 
 class EncodingWorker(QObject):
+    """Runs encoding jobs in its thread, only the latest submitted job matters
+
+    Jobs submitted in quick succession are coalesced, job submitted while another
+    one runs supersedes it and results of superseded jobs aren't emitted.
+    """
     # encoded message + encoded with errors
     encoded_signal = pyqtSignal(str)
     # encoded message with errors
@@ -123,57 +143,73 @@ class EncodingWorker(QObject):
     error_signal = pyqtSignal(str, str)
     # detected errors
     detected_signal = pyqtSignal(bool)
+    # seconds from submitting job to its result
+    latency_signal = pyqtSignal(float)
 
-    def __init__(self, rs_args: ReedSolomonArgs, format: Format,
-                 message_input: str, error_input: str) -> None:
+    # milliseconds without new job before the latest one starts
+    DEBOUNCE_INTERVAL = 50
+
+    def __init__(self) -> None:
         super().__init__()
-        self.rs_args = rs_args
-        self.format = format
-        self.message_input = message_input
-        self.error_input = error_input
         self.wait_condition = QWaitCondition()
         self.mutex = QMutex()
         self.stop = False
-        self.detect = False
-        self.decode = False
-
-    def update(self, rs_args: ReedSolomonArgs, format: Format,
-               message_input: str, error_input: str, detect_only: bool, decode_only: bool = False):
-        self.rs_args = rs_args
-        self.format = format
-        self.message_input = message_input
-        self.error_input = error_input
-        self.detect = detect_only
-        self.decode = decode_only
+        # guarded by mutex
+        self._pending: Optional[EncodingJob] = None
+
+    def submit(self, job: EncodingJob):
+        """Queue job, replacing job which hasn't started yet"""
+        job.submitted = monotonic()
+        self.mutex.lock()
+        self._pending = job
         self.wait_condition.wakeOne()
+        self.mutex.unlock()
+
+    def shutdown(self):
+        self.mutex.lock()
+        self.stop = True
+        self.wait_condition.wakeAll()
+        self.mutex.unlock()
+
+    def _superseded(self) -> bool:
+        self.mutex.lock()
+        superseded = self._pending is not None
+        self.mutex.unlock()
+        return superseded
+
+    def _next_job(self) -> Optional[EncodingJob]:
+        self.mutex.lock()
+        try:
+            while self._pending is None and not self.stop:
+                self.wait_condition.wait(self.mutex)
+            # newer job arriving within interval replaces pending one
+            while not self.stop and self.wait_condition.wait(self.mutex,
+                                                             self.DEBOUNCE_INTERVAL):
+                pass
+            if self.stop:
+                return None
+            job, self._pending = self._pending, None
+            return job
+        finally:
+            self.mutex.unlock()
 
     @pyqtSlot()
     def run(self):
-        while True:
-            self.mutex.lock()
-            if self.stop == True:
-                self.mutex.unlock()
-                return
-            self.wait_condition.wait(self.mutex)
-            if self.stop == True:
-                self.mutex.unlock()
-                return
-            else:
-                self.encode()
-            self.mutex.unlock()
+        while (job := self._next_job()) is not None:
+            self.encode(job)
 
-    def encode(self):
+    def encode(self, job: EncodingJob):
         print("Encoding/decoding...")
         try:
-            reed_solomon = RS_Original(self.rs_args.n, self.rs_args.k,
-                                       self.rs_args.gf, self.rs_args.systematic)
-            if self.decode:
-                encoded = encode_decode_converters[self.format][0](self.message_input)
+            reed_solomon = rs_codec(job.rs_args.n, job.rs_args.k,
+                                  job.rs_args.gf, job.rs_args.systematic)
+            if job.decode_only:
+                encoded = encode_decode_converters[job.format][0](job.message_input)
             else:
-                encoded = self._encode(reed_solomon)
+                encoded = self._encode(job, reed_solomon)
 
-            errors = encode_decode_converters[self.format][0](self.error_input)
-            if self.format != Format.TEXT:
+            errors = encode_decode_converters[job.format][0](job.error_input)
+            if job.format != Format.TEXT:
                 resized_errors = itertools.chain(errors, itertools.repeat(0))
                 encoded_err: Union[str, List[int]]
                 encoded_err = [enc ^ err for enc, err in zip(encoded, resized_errors)]
@@ -184,23 +220,33 @@ class EncodingWorker(QObject):
                     enc ^ err for enc, err in zip(list_encoded, resized_errors)
                     ]
                 encoded_err = iterable_to_string(tmp_encoded)
-            if not self.decode:
-                self.encoded_signal.emit(encode_decode_converters[self.format][1](encoded, reed_solomon.gf.degree))
+            if self._superseded():
+                print("Encoding superseded by newer job")
+                return
+            if not job.decode_only:
+                self.encoded_signal.emit(encode_decode_converters[job.format][1](encoded, reed_solomon.gf.degree))
             self.encoded_with_errors_signal.emit(
-                encode_decode_converters[self.format][1](encoded_err, reed_solomon.gf.degree))
-            if self.detect:
+                encode_decode_converters[job.format][1](encoded_err, reed_solomon.gf.degree))
+            if job.detect_only:
                 self._detect(encoded_err, reed_solomon)
             else:
-                self._decode(encoded_err, reed_solomon)
+                self._decode(job, encoded_err, reed_solomon)
+            latency = monotonic() - job.submitted
+            print(f"Encoding/decoding took {latency * 1000:.0f} ms")
+            self.latency_signal.emit(latency)
         except _EncodingException as ex:
-            self.error_signal.emit(f"Couldn't encode!: {ex}", "Encoding error!")
+            self._error(f"Couldn't encode!: {ex}", "Encoding error!")
         except _DecodingException as ex:
-            self.error_signal.emit(f"Couldn't decode!: {ex}", "Decoding error!")
+            self._error(f"Couldn't decode!: {ex}", "Decoding error!")
         except Exception as ex:
             print_exc()
-            self.error_signal.emit(f"Error with RS arguments!: {ex}", "Error")
+            self._error(f"Error with RS arguments!: {ex}", "Error")
 
-    def _detect(self, encoded: Union[str, List[int]], reed_solomon: RS_Original):
+    def _error(self, error: str, title: str):
+        if not self._superseded():
+            self.error_signal.emit(error, title)
+
+    def _detect(self, encoded: Union[str, List[int]], reed_solomon: "RS_Original"):
         print(f"Detecting errors in: {encoded}")
         try:
             detected = reed_solomon.detect(encoded)
@@ -209,24 +255,24 @@ class EncodingWorker(QObject):
             print_exc()
             raise _DecodingException(ex) from ex
 
-    def _encode(self, reed_solomon: RS_Original):
+    def _encode(self, job: EncodingJob, reed_solomon: "RS_Original"):
         print(f"Encoding message")
-        input = encode_decode_converters[self.format][0](self.message_input)
+        input = encode_decode_converters[job.format][0](job.message_input)
         try:
-            encoded = reed_solomon.encode(input, not self.rs_args.bch)
+            encoded = reed_solomon.encode(input, not job.rs_args.bch)
             return encoded
         except Exception as ex:
             print_exc()
             raise _EncodingException(ex) from ex
 
-    def _decode(self, encoded: Union[str, List[int]],
-                reed_solomon: RS_Original):
+    def _decode(self, job: EncodingJob, encoded: Union[str, List[int]],
+                reed_solomon: "RS_Original"):
         try:
             decoded_message, errors, fixed = reed_solomon.decode(encoded,
-                                                                 not self.rs_args.bch,
-                                                                 self.rs_args.force)
-            decoded_message = decoded_message[-len(self.message_input):]
-            decoded = cast(str, encode_decode_converters[self.format][1](
+                                                                 not job.rs_args.bch,
+                                                                 job.rs_args.force)
+            decoded_message = decoded_message[-len(job.message_input):]
+            decoded = cast(str, encode_decode_converters[job.format][1](
                 decoded_message, reed_solomon.gf.degree))
             self.decoded_signal.emit(decoded, errors, fixed)
         except Exception as ex:
@@ -247,6 +293,11 @@ class RSTab(QWidget, Ui_RS_Form):
             }
             self.standardsComboBox.addItems(self.rs_param_mapping.keys())
 
+            # payloads longer than k symbols are split into codewords in separate dialog
+            self.large_payload_pushButton = QPushButton("Large payload...")
+            self.large_payload_pushButton.clicked.connect(self.large_payload)
+            self.verticalLayout_2.addWidget(self.large_payload_pushButton)
+
             # validators for different format and max input size
             self.validators: Dict[Format, QValidator] = {
                 Format.TEXT: NoValidation(self),
@@ -258,19 +309,8 @@ class RSTab(QWidget, Ui_RS_Form):
 
             self.update_validators()
 
-            bch = self.bch_checkBox.isChecked()
-            self.encoding_worker = EncodingWorker(
-                rs_args=ReedSolomonArgs(
-                    n=self.rs_n_spinBox.value(),
-                    k=self.rs_k_spinBox.value(),
-                    gf=2**self.rs_gf_spinBox.value(),
-                    systematic=self.systematic_checkBox.isChecked(),
-                    bch=bch,
-                    force=self.force_checkBox.isChecked() if not bch else False
-                    ),
-                format=self.get_format(),
-                message_input=self.input_lineEdit.text(),
-                error_input=self.errors_lineEdit.text())
+            self.encoding_worker = EncodingWorker()
+            self.latency = 0.0
 
             self.worker_thread = QThread(self)
             self.encoding_worker.encoded_signal.connect(self._encoded)
@@ -278,6 +318,7 @@ class RSTab(QWidget, Ui_RS_Form):
             self.encoding_worker.decoded_signal.connect(self._decoded)
             self.encoding_worker.detected_signal.connect(self._detected)
             self.encoding_worker.error_signal.connect(self._error_msg)
+            self.encoding_worker.latency_signal.connect(self._latency)
             self.encoding_worker.moveToThread(self.worker_thread)
             self.worker_thread.started.connect(self.encoding_worker.run) # type: ignore
             self.worker_thread.start()
@@ -286,10 +327,7 @@ class RSTab(QWidget, Ui_RS_Form):
             raise ex from None
 
     def on_close(self):
-        self.encoding_worker.mutex.lock()
-        self.encoding_worker.stop = True
-        self.encoding_worker.mutex.unlock()
-        self.encoding_worker.wait_condition.wakeAll()
+        self.encoding_worker.shutdown()
         self.worker_thread.exit()
         self.worker_thread.wait()
 
@@ -365,24 +403,26 @@ class RSTab(QWidget, Ui_RS_Form):
         self.rs_k_spinBox.setValue(new_params.k)
         self.rs_gf_spinBox.setValue(new_params.gf_power)
 
+    def _rs_args(self) -> ReedSolomonArgs:
+        bch=self.bch_checkBox.isChecked()
+        return ReedSolomonArgs(
+            n=self.rs_n_spinBox.value(),
+            k=self.rs_k_spinBox.value(),
+            gf=2**self.rs_gf_spinBox.value(),
+            systematic=self.systematic_checkBox.isChecked(),
+            bch=bch,
+            force=self.force_checkBox.isChecked() if not bch else False
+            )
+
     def _decode_only(self, message):
         self._toggle_enabled(False)
-        bch=self.bch_checkBox.isChecked()
-        self.encoding_worker.update(
-            rs_args=ReedSolomonArgs(
-                n=self.rs_n_spinBox.value(),
-                k=self.rs_k_spinBox.value(),
-                gf=2**self.rs_gf_spinBox.value(),
-                systematic=self.systematic_checkBox.isChecked(),
-                bch=bch,
-                force=self.force_checkBox.isChecked() if not bch else False
-                ),
+        self.encoding_worker.submit(EncodingJob(
+            rs_args=self._rs_args(),
             format=self.get_format(),
             message_input=message,
             error_input=self.errors_lineEdit.text(),
-            detect_only=False,
             decode_only=True
-            )
+            ))
 
     @pyqtSlot()
     def shift_left(self):
@@ -404,21 +444,23 @@ class RSTab(QWidget, Ui_RS_Form):
 
     def _encode_detect(self, detect_errors: bool):
         self._toggle_enabled(False)
-        bch=self.bch_checkBox.isChecked()
-        self.encoding_worker.update(
-            rs_args=ReedSolomonArgs(
-                n=self.rs_n_spinBox.value(),
-                k=self.rs_k_spinBox.value(),
-                gf=2**self.rs_gf_spinBox.value(),
-                systematic=self.systematic_checkBox.isChecked(),
-                bch=bch,
-                force=self.force_checkBox.isChecked() if not bch else False
-                ),
+        self.encoding_worker.submit(EncodingJob(
+            rs_args=self._rs_args(),
             format=self.get_format(),
             message_input=self.input_lineEdit.text(),
             error_input=self.errors_lineEdit.text(),
             detect_only=detect_errors
-            )
+            ))
+
+    @pyqtSlot()
+    def large_payload(self):
+        from phyether.gui.rs_payload import LargePayloadDialog
+        if not self.systematic_checkBox.isChecked() or not self.bch_checkBox.isChecked():
+            create_msg_box("Large payloads need systematic BCH code", "Error")
+            return
+        dialog = LargePayloadDialog(self.rs_n_spinBox.value(), self.rs_k_spinBox.value(),
+                                    self.rs_gf_spinBox.value(), self)
+        dialog.show()
 
     @pyqtSlot()
     def encode(self):
@@ -453,7 +495,6 @@ class RSTab(QWidget, Ui_RS_Form):
         else:
             self.status_lineEdit.setText("No errors were detected in codeword")
         self.errors_found_lineEdit.setText("")
-        self.worker_thread.exit()
         self._toggle_enabled(True)
 
     def _encoded(self, encoded: str):
@@ -472,7 +513,6 @@ class RSTab(QWidget, Ui_RS_Form):
             self.errors_found_lineEdit.setText("Too many errors")
         else:
             self.errors_found_lineEdit.setText(str(errors))
-        self.worker_thread.exit()
         self._toggle_enabled(True)
 
     def _toggle_enabled(self, busy: bool):
@@ -484,5 +524,8 @@ class RSTab(QWidget, Ui_RS_Form):
 
     def _error_msg(self, error: str, title: str):
         create_msg_box(error, title)
-        self.worker_thread.exit()
         self._toggle_enabled(True)
+
+    def _latency(self, latency: float):
+        self.latency = latency
+        self.status_lineEdit.setToolTip(f"Last encoding/decoding took {latency * 1000:.0f} ms")
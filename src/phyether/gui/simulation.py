@@ -1,5 +1,10 @@
+import bisect
+import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from concurrent.futures.process import BrokenProcessPool
 from enum import Enum
-from typing import Literal, NamedTuple, Optional, TypedDict, Union, cast, Dict, Tuple, List
+from typing import Literal, Optional, TypedDict, Union, cast, Dict, Tuple, List
 from attr import define
 
 from PyQt5.QtCore import QObject, QThread, pyqtSlot, pyqtSignal, Qt
@@ -11,6 +16,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout,
 import matplotlib
 from matplotlib.axes import Axes
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+from matplotlib.lines import Line2D
 from matplotlib.ticker import EngFormatter
 
 from PySpice.Probe.WaveForm import TransientAnalysis
@@ -18,7 +24,16 @@ from PySpice.Probe.WaveForm import TransientAnalysis
 import numpy
 
 from phyether.dac import DAC, Attenuation, Cat5, Cat5e, Cat6, Cat7
+from phyether.gui.lod import LODPlotter
 from phyether.gui.util import DoubleSpinBoxNoWheel, SpinBoxNoWheel, create_msg_box
+from phyether.accuracy import Accuracy
+from phyether.probe import PAIR_NODES, Probe
+from phyether.result_cache import default_cache
+from phyether.simulation_pool import (JobControl, default_workers, reuse_pair, run_pair,
+                                      shutdown_pool, simulate_job, simulation_pool)
+from phyether.spice_session import transient_from_arrays
+from phyether.streaming import StreamedResult
+from phyether.standards import STANDARD_SPEEDS, StandardSpeed
 from phyether.twisted_pair import TwistedPair
 from phyether.util import DictMapping, removeprefix
 
@@ -28,7 +43,7 @@ matplotlib.use('QtAgg')
 @define(kw_only=True, slots=False)
 class SimulationInitArgs(DictMapping):
     dac: DAC
-    transmission_type: Literal['lossy', 'lossless'] = 'lossy'
+    transmission_type: Literal['lossy', 'lossless', 'txl', 'lumped', 'behavioural'] = 'lossy'
     output_impedance: float = 100
     characteristic_impedance: float = 100
     length: int = 1
@@ -42,6 +57,9 @@ class SimulationInitArgs(DictMapping):
 class SimulationRunArgs(DictMapping):
     presimulation_ratio: int = 2
     voltage_offset: int = 0
+    warm_start: Literal['presimulation', 'dc'] = 'presimulation'
+    seed: Optional[int] = None
+    accuracy: Accuracy = 'normal'
 
 
 @define(kw_only=True, slots=False)
@@ -61,37 +79,158 @@ class SimulationDisplay(str, Enum):
     VOUT_MINUS = "vout-"
 
 
+_DISPLAY_NODES: Dict[SimulationDisplay, Tuple[str, ...]] = {
+    SimulationDisplay.VIN: ('vin+', 'vin-'),
+    SimulationDisplay.VIN_PLUS: ('vin+',),
+    SimulationDisplay.VIN_MINUS: ('vin-',),
+    SimulationDisplay.VOUT: ('vout+', 'vout-'),
+    SimulationDisplay.VOUT_PLUS: ('vout+',),
+    SimulationDisplay.VOUT_MINUS: ('vout-',),
+}
+_DISPLAY_ORDER = list(SimulationDisplay)
+
+
 class PairSimulation(QObject):
     simulation_signal = pyqtSignal(TransientAnalysis, float, str)
+    partial_signal = pyqtSignal(TransientAnalysis, float, str)
+    progress_signal = pyqtSignal(str, float)
     simulation_finished_signal = pyqtSignal()
     error_signal = pyqtSignal()
 
-    def __init__(self, sim_args: List[SimulationArgs]) -> None:
+    # milliseconds between progress and partial waveform updates
+    UPDATE_INTERVAL = 200
+
+    def __init__(self, sim_args: List[SimulationArgs],
+                 twisted_pairs: Optional[Dict[str, TwistedPair]] = None,
+                 workers: int = 1) -> None:
+        """
+        :param sim_args: simulations, results are emitted as they finish
+        :param twisted_pairs: pairs of previous single-process runs, reused
+        :param workers: maximum number of concurrent simulations, simulations run in
+            this thread if it's 1
+        """
         super().__init__()
         self.sim_args = sim_args
+        # pairs from previous runs, their circuits stay loaded between simulations
+        self.twisted_pairs = twisted_pairs if twisted_pairs is not None else {}
+        self.workers = workers
+        # only plotted nodes, with resolution enough for the plot
+        self.probe = Probe(PAIR_NODES, samples_per_symbol=32)
+        # set from GUI thread, checked between updates
+        self.cancelled = False
+        self.partial_directory = ''
+
+    def cancel(self):
+        print("Cancelling simulation...")
+        self.cancelled = True
+
+    @staticmethod
+    def _symbols(input: str) -> List[int]:
+        return [int(symbol) for symbol in input.split()
+                if removeprefix(symbol, '-').isdecimal()]
+
+    @staticmethod
+    def _use_cache(run_args: SimulationRunArgs) -> bool:
+        # random presimulation symbols would only fill the cache
+        return run_args.seed is not None or not run_args.presimulation_ratio
 
     def simulate_one(self,
                      init_args: SimulationInitArgs,
                      run_args: SimulationRunArgs,
                      input: str,
                      index: str):
-        twisted_pair = TwistedPair(**init_args)
-        symbols = [int(symbol) for symbol in input.split()
-                                if removeprefix(symbol, '-').isdecimal()]
-
+        twisted_pair = reuse_pair(self.twisted_pairs, index, init_args)
+        symbols = self._symbols(input)
+        cache = default_cache() if self._use_cache(run_args) else None
+        delay = float(twisted_pair.transmission_delay)
         try:
-            analysis = twisted_pair.simulate(symbols, **run_args)
-            self.simulation_signal.emit(analysis, twisted_pair.transmission_delay, index)
+            analysis = run_pair(
+                twisted_pair, symbols, run_args, self.probe, cache,
+                f"{self.partial_directory}/{index}",
+                cancelled=lambda: self.cancelled,
+                progress=lambda progress: self.progress_signal.emit(index, progress),
+                partial=lambda streamed: self.partial_signal.emit(
+                    transient_from_arrays(*streamed), delay, index),
+                poll_interval=self.UPDATE_INTERVAL / 1000)
+            if analysis is None:
+                print(f"Simulation {index} cancelled")
+                return
+            self.simulation_signal.emit(analysis, delay, index)
         except Exception as e:
             print(f"Error: {e}")
             self.error_signal.emit()
 
+    def _emit_partial(self, index: str, control: JobControl):
+        self.progress_signal.emit(index, control.progress)
+        try:
+            time, nodes = StreamedResult.open(f"{self.partial_directory}/{index}")
+        except (OSError, ValueError):
+            # worker hasn't started streaming yet
+            return
+        if len(time):
+            analysis = transient_from_arrays(numpy.array(time), {
+                name: numpy.array(values) for name, values in nodes.items()})
+            self.partial_signal.emit(analysis, control.transmission_delay, index)
+
+    def simulate_pool(self):
+        """Run simulations in worker processes, emit results in order of completion"""
+        pool = simulation_pool(self.workers)
+        jobs: Dict[Future, Tuple[str, JobControl]] = {}
+        for args in self.sim_args:
+            directory = f"{self.partial_directory}/{args.index}"
+            control = JobControl(directory, create=True)
+            future = pool.submit(simulate_job, args.index, dict(args.init_args),
+                                 dict(args.run_args), self._symbols(args.input), self.probe,
+                                 self._use_cache(args.run_args), directory,
+                                 self.UPDATE_INTERVAL / 1000)
+            jobs[future] = (args.index, control)
+        pending = set(jobs)
+        while pending:
+            if self.cancelled:
+                for future in pending:
+                    future.cancel()
+                    jobs[future][1].cancel()
+            done, pending = wait(pending, timeout=self.UPDATE_INTERVAL / 1000,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                index, _ = jobs[future]
+                if future.cancelled():
+                    continue
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    print(f"Error: simulation process crashed: {e}")
+                    shutdown_pool()
+                    self.error_signal.emit()
+                    return
+                except Exception as e:
+                    print(f"Error: {e}")
+                    self.error_signal.emit()
+                    continue
+                if result is None:
+                    print(f"Simulation {index} cancelled")
+                    continue
+                time, nodes, delay = result
+                self.progress_signal.emit(index, 1.0)
+                self.simulation_signal.emit(transient_from_arrays(time, nodes), delay, index)
+            for future in pending:
+                if future.running():
+                    self._emit_partial(*jobs[future])
 
     @pyqtSlot()
     def simulate(self):
         print("Canvas simulating...")
-        for one_sim_args in self.sim_args:
-            self.simulate_one(**one_sim_args)
+        self.partial_directory = tempfile.mkdtemp(prefix='phyether-')
+        try:
+            if self.workers > 1 and len(self.sim_args) > 1:
+                self.simulate_pool()
+            else:
+                for one_sim_args in self.sim_args:
+                    if self.cancelled:
+                        break
+                    self.simulate_one(**one_sim_args)
+        finally:
+            shutil.rmtree(self.partial_directory, ignore_errors=True)
         self.simulation_finished_signal.emit()
 
 
@@ -131,15 +270,7 @@ class SimulationFormWidget(QFrame):
                 "Cat7": Cat7(),
             }
 
-        class StandardSpeed(NamedTuple):
-            rise_time: float
-            on_time: float
-
-        self.standards_mapping: Dict[str, StandardSpeed] = {
-                "40GBASE-T": StandardSpeed(0.1, 0.625),
-                "10GBASE-T": StandardSpeed(0.1, 1.2),
-                "1000BASE-T": StandardSpeed(2, 8)
-            }
+        self.standards_mapping: Dict[str, StandardSpeed] = dict(STANDARD_SPEEDS)
 
         self.combobox_widget = QWidget()
         self.combobox_layout = QHBoxLayout()
@@ -207,6 +338,11 @@ class SimulationFormWidget(QFrame):
 
 class SimulatorCanvas(FigureCanvasQTAgg):
     simulation_stopped_signal = pyqtSignal()
+    simulation_progress_signal = pyqtSignal(str, float)
+    # arguments of started simulations
+    simulations_started_signal = pyqtSignal(list)
+    # partial or final result: analysis, transmission delay, index
+    waveform_signal = pyqtSignal(TransientAnalysis, float, str)
 
     def __init__(self, *, init_axes = True):
         super().__init__()
@@ -222,63 +358,114 @@ class SimulatorCanvas(FigureCanvasQTAgg):
         self.simulation: Optional[PairSimulation] = None
         self.thread: QThread = QThread(self)
         self.simulations: List[Tuple[TransientAnalysis, float]] = []
+        self.twisted_pairs: Dict[str, TwistedPair] = {}
         self._display_params: List[SimulationDisplay] = []
         self.plots: Dict[SimulationDisplay, bool] = {}
+        # (simulation index, display) -> line, hidden instead of removed
+        self._lines: Dict[Tuple[int, SimulationDisplay], Line2D] = {}
+        # lines show only visible range of waveforms, decimated to canvas resolution
+        self.lod = LODPlotter()
+        # index -> lines of simulation which is still running, replaced on every update
+        self._partial_lines: Dict[str, List[Line2D]] = {}
+        # maximum number of concurrent simulations, see PairSimulation
+        self.workers = default_workers()
+        # index -> progress of running simulations
+        self._progress: Dict[str, float] = {}
 
     def set_display_params(self, display_params: List[SimulationDisplay]):
+        """Show lines of displayed traces, lines are created on first show and kept"""
         self._display_params = display_params
-        self._draw_plot()
+        for (_, display), line in self._lines.items():
+            line.set_visible(display in display_params)
+        for index, simulation in zip(self.plot_labels, self.simulations):
+            for display_param in display_params:
+                self._line(simulation, int(index), display_param)
+        self._update_view()
+
+    def _add_partial(self, analysis: TransientAnalysis, transmission_delay: float, index: str):
+        self._remove_partial(index)
+        previous_lines = {line for ax in self.figure.axes for line in ax.lines}
+        self._draw_add((analysis, transmission_delay), int(index))
+        self._partial_lines[index] = [line for ax in self.figure.axes for line in ax.lines
+                                      if line not in previous_lines]
+
+    def _remove_partial(self, index: Optional[str] = None):
+        """Remove partial lines of simulation, of all simulations if index is None"""
+        indexes = list(self._partial_lines) if index is None else [index]
+        partial_lines = {line for key in indexes for line in self._partial_lines.pop(key, [])}
+        for line in partial_lines:
+            line.remove()
+            self.lod.remove(line)
+        self._lines = {key: line for key, line in self._lines.items()
+                       if line not in partial_lines}
 
     def _add_simulation(self, analysis: TransientAnalysis, transmission_delay: float, index: str):
-        self.simulations.append((analysis, transmission_delay))
-        self.plot_labels.append(index)
+        self._remove_partial(index)
+        # simulations finish in any order, they are kept in order of indexes
+        position = bisect.bisect([int(label) for label in self.plot_labels], int(index))
+        self.simulations.insert(position, (analysis, transmission_delay))
+        self.plot_labels.insert(position, index)
         print(f"Draw simulation: {index}")
-        self._draw_add(self.simulations[-1], int(self.plot_labels[-1]))
-
-    def _get_vin_x(self, analysis, delay):
-        return analysis.time[analysis.time<(analysis.time[-1] - delay)]
+        self._draw_add(self.simulations[position], int(index))
+
+    def _simulation_progress(self, index: str, progress: float):
+        self._progress[index] = progress
+        finished = sum(progress >= 1 for progress in self._progress.values())
+        self.simulation_progress_signal.emit(
+            f"{finished}/{len(self._progress)} simulations",
+            sum(self._progress.values()) / len(self._progress))
+
+    @staticmethod
+    def _trace(simulation: Tuple[TransientAnalysis, float],
+               display_param: SimulationDisplay) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Time and voltage of displayed nodes, output is shifted by transmission delay"""
+        analysis, transmission_delay = simulation
+        nodes = _DISPLAY_NODES[display_param]
+        plot_y = analysis[nodes[0]].as_ndarray()
+        if len(nodes) == 2:
+            plot_y = plot_y - analysis[nodes[1]].as_ndarray()
+        time = numpy.asarray(analysis.time, dtype=float)
+        if nodes[0].startswith('vin'):
+            plot_x = time[time < (time[-1] - transmission_delay)]
+            return plot_x, plot_y[:len(plot_x)]
+        plot_x = time - transmission_delay
+        plot_x = plot_x[plot_x >= 0]
+        return plot_x, plot_y[len(plot_y) - len(plot_x):]
+
+    def _line(self,
+              simulation: Tuple[TransientAnalysis, float],
+              index: int,
+              display_param: SimulationDisplay) -> Line2D:
+        key = (index, display_param)
+        line = self._lines.get(key)
+        if line is None:
+            line = self.lod.plot(self.axes, *self._trace(simulation, display_param),
+                                 label=f'sim {index}: {display_param.value}')
+            self._lines[key] = line
+        line.set_visible(True)
+        return line
+
+    def _update_view(self):
+        visible_lines = [line for _, line in sorted(
+                             self._lines.items(),
+                             key=lambda item: (item[0][0], _DISPLAY_ORDER.index(item[0][1])))
+                         if line.get_visible()]
+        if visible_lines:
+            self.axes.legend(handles=visible_lines)
+        elif (legend := self.axes.get_legend()) is not None:
+            legend.remove()
+        self.lod.reset()
+        self.axes.relim(visible_only=True)
+        self.axes.autoscale_view()
+        self.lod.update(self.axes)
+        self.draw_idle()
 
     def _draw_add(self,
                   simulation: Tuple[TransientAnalysis, float],
                   index: int):
-        analysis, transmission_delay = simulation
         for display_param in self._display_params:
-            plot_x = None
-            plot_y = None
-
-            if display_param == SimulationDisplay.VIN:
-                plot_x = self._get_vin_x(analysis, transmission_delay)
-                plot_y = (analysis['vin+'] - analysis['vin-'])[:len(plot_x)]
-            elif display_param == SimulationDisplay.VOUT:
-                plot_x = cast(numpy.ndarray, analysis.time - transmission_delay)
-                plot_x = plot_x[plot_x>=0]
-                plot_y = (analysis['vout+'] - analysis['vout-'])[-len(plot_x):]
-            elif display_param == SimulationDisplay.VIN_PLUS:
-                plot_x = self._get_vin_x(analysis, transmission_delay)
-                plot_y = analysis['vin+'][:len(plot_x)]
-            elif display_param == SimulationDisplay.VIN_MINUS:
-                plot_x = self._get_vin_x(analysis, transmission_delay)
-                plot_y = analysis['vin-'][:len(plot_x)]
-            elif display_param == SimulationDisplay.VOUT_PLUS:
-                plot_x = cast(numpy.ndarray, analysis.time - transmission_delay)
-                plot_x = plot_x[plot_x>=0]
-                plot_y = analysis['vout+'][-len(plot_x):]
-            elif display_param == SimulationDisplay.VOUT_MINUS:
-                plot_x = cast(numpy.ndarray, analysis.time - transmission_delay)
-                plot_x = plot_x[plot_x>=0]
-                plot_y = analysis['vout-'][-len(plot_x):]
-
-            if plot_x is not None and plot_y is not None:
-                plot_y = plot_y[:len(plot_x)]
-                self.axes.plot(plot_x, plot_y,
-                               label=f'sim {index}: {display_param.value}')
-        self.axes.legend()
-        self.draw()
-
-    def _draw_plot(self):
-        self.clear_plot()
-        for index, simulation in zip(self.plot_labels, self.simulations):
-            self._draw_add(simulation, int(index))
+            self._line(simulation, index, display_param)
+        self._update_view()
 
     def simulation_error(self):
         create_msg_box("There was error during simulation, change parameters", "error")
@@ -286,22 +473,38 @@ class SimulatorCanvas(FigureCanvasQTAgg):
 
     def _stop_simulation(self):
         print("Simulation finished")
+        self._remove_partial()
+        self.draw()
         self.thread.exit()
         self.simulation_stopped_signal.emit()
 
+    def cancel_simulation(self):
+        if self.simulation is not None:
+            self.simulation.cancel()
+
     def simulate(self, sim_args: List[SimulationArgs]):
+        """Start simulations in background, see :attr:`workers`"""
         print("Simulating")
         self.simulations.clear()
         self.plot_labels.clear()
         self.simulating = True
+        self._partial_lines = {}
+        self._progress = {args.index: 0.0 for args in sim_args}
+        self._lines = {}
+        self.lod.clear()
         self.clear_plot()
-        self.simulation = PairSimulation(sim_args)
+        self.simulation = PairSimulation(sim_args, self.twisted_pairs, self.workers)
         self.thread = QThread(self)
         self.simulation.simulation_signal.connect(self._add_simulation)
+        self.simulation.partial_signal.connect(self._add_partial)
+        self.simulation.simulation_signal.connect(self.waveform_signal)
+        self.simulation.partial_signal.connect(self.waveform_signal)
+        self.simulation.progress_signal.connect(self._simulation_progress)
         self.simulation.error_signal.connect(self.simulation_error)
         self.simulation.simulation_finished_signal.connect(self._stop_simulation)
         self.simulation.moveToThread(self.thread)
         self.thread.started.connect(self.simulation.simulate) # type: ignore
+        self.simulations_started_signal.emit(sim_args)
         self.thread.start()
 
     def clear_plot(self):
@@ -0,0 +1,292 @@
+"""Binary LDPC codes: sparse parity checks, systematic encoding and batched layered
+min-sum decoding
+
+Parity-check matrix is stored as variable indexes of every check, all checks have the
+same weight. Checks are grouped into layers in which every variable is checked at most
+once, so a whole layer of all codewords of a batch is updated by a few array
+operations. 40GBASE-T (and 10GBASE-T) LDPC(2048,1723) code is built by
+:func:`ldpc_40gbase_t`.
+"""
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from phyether import gf_tables
+
+
+class LDPCDecodeResult(NamedTuple):
+    codewords: np.ndarray
+    """hard decisions of codeword bits, shape (codewords, n)"""
+    messages: np.ndarray
+    """message bits of hard decisions, shape (codewords, k)"""
+    valid: np.ndarray
+    """True for codewords satisfying all parity checks"""
+    iterations: np.ndarray
+    """decoding iterations of every codeword, 0 if received word was a codeword"""
+
+
+def _layers(checks: np.ndarray, n: int) -> List[np.ndarray]:
+    """Greedy grouping of checks into layers without shared variables"""
+    layers: List[List[int]] = []
+    used: List[np.ndarray] = []
+    for index, variables in enumerate(checks):
+        for layer, mask in zip(layers, used):
+            if not mask[variables].any():
+                break
+        else:
+            layer, mask = [], np.zeros(n, dtype=bool)
+            layers.append(layer)
+            used.append(mask)
+        layer.append(index)
+        mask[variables] = True
+    return [np.array(layer, dtype=np.intp) for layer in layers]
+
+
+def _systematic(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Gauss-Jordan elimination of parity-check matrix over GF(2)
+
+    Pivots are searched from the last column, so parity bits are at the end of
+    codeword as far as rank of matrix allows.
+
+    :param matrix: dense parity-check matrix of bools
+    :return: parity positions, message positions and matrix A of parity = A @ message
+    """
+    matrix = matrix.copy()
+    rows = len(matrix)
+    pivots: List[int] = []
+    for column in range(matrix.shape[1] - 1, -1, -1):
+        rank = len(pivots)
+        if rank == rows:
+            break
+        candidates = np.flatnonzero(matrix[rank:, column])
+        if not len(candidates):
+            continue
+        pivot = rank + candidates[0]
+        matrix[[rank, pivot]] = matrix[[pivot, rank]]
+        others = np.flatnonzero(matrix[:, column])
+        others = others[others != rank]
+        matrix[others] ^= matrix[rank]
+        pivots.append(column)
+    parity = np.array(pivots, dtype=np.intp)
+    message = np.setdiff1d(np.arange(matrix.shape[1]), parity)
+    # row i of reduced matrix: x[parity[i]] + sum of x[message] with ones = 0
+    return parity, message, matrix[:len(pivots)][:, message]
+
+
+class LDPC:
+    """Binary LDPC code given by its sparse parity-check matrix
+
+    Codewords are arrays of bits 0 and 1, message bits are placed at
+    :attr:`message_positions` and parity bits at :attr:`parity_positions`.
+    Decoder takes log-likelihood ratios log(P(0) / P(1)), positive for bit 0.
+    """
+
+    def __init__(self, checks: np.ndarray, n: int) -> None:
+        """
+        :param checks: variable indexes of every parity check, shape (checks, weight)
+        :param n: codeword length
+        """
+        checks = np.asarray(checks, dtype=np.intp)
+        self.n = n
+        layers = _layers(checks, n)
+        order = np.concatenate(layers)
+        # checks ordered by layer, so check messages of a layer are a slice
+        self.checks = checks[order]
+        bounds = np.cumsum([0] + [len(layer) for layer in layers])
+        self.layers = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+        self.parity_positions, self.message_positions, parity_matrix = _systematic(
+            self.parity_check_matrix().astype(bool))
+        self.k = n - len(self.parity_positions)
+        self._parity_matrix = parity_matrix.astype(np.float32)
+
+    @classmethod
+    def from_reed_solomon(cls, degree: int = 6, length: int = 32, column_weight: int = 6,
+                          irreducible_poly: Optional[int] = None) -> "LDPC":
+        """Regular LDPC code from Reed-Solomon code with two information symbols
+
+        Codewords a + b * x_j of the RS code, x_j = alpha^j for j < length, are
+        written as location vectors: every symbol becomes 2^degree bits with a single
+        one at position of its value. Codewords with the same b form one layer of
+        2^degree checks, in which every variable is checked once. Two checks share
+        at most one variable, so the code has no cycles of length 4.
+
+        :param degree: degree of field GF(2^degree)
+        :param length: length of RS code, checks have this weight
+        :param column_weight: number of layers, checks of every variable
+        :param irreducible_poly: polynomial of field, defaults to Conway polynomial
+        """
+        order = 1 << degree
+        if not length < order or not column_weight <= order:
+            raise ValueError(f"RS code over GF({order}) needs length < {order} "
+                             f"and at most {order} layers")
+        exp, log = gf_tables.log_tables(order, irreducible_poly)
+        # positions x_j = alpha^j, slope * x_j = alpha^(log slope + j)
+        powers = np.arange(length)
+        checks = []
+        for slope in range(column_weight):
+            product = exp[log[slope] + powers] if slope else np.zeros(length, dtype=np.int64)
+            symbols = np.arange(order)[:, None] ^ product[None, :]
+            checks.append(powers * order + symbols)
+        return cls(np.concatenate(checks), length * order)
+
+    def parity_check_matrix(self) -> np.ndarray:
+        """Dense parity-check matrix of 0 and 1, rows in order of :attr:`checks`"""
+        matrix = np.zeros((len(self.checks), self.n), dtype=np.uint8)
+        matrix[np.arange(len(self.checks))[:, None], self.checks] = 1
+        return matrix
+
+    def _unsatisfied(self, hard: np.ndarray) -> np.ndarray:
+        """Codewords with failed checks, hard decisions of shape (n, codewords)"""
+        failed: np.ndarray = np.bitwise_xor.reduce(hard[self.checks.T], axis=0).any(axis=0)
+        return failed
+
+    def syndrome(self, codewords: np.ndarray) -> np.ndarray:
+        """Parity of every check, shape (..., checks), all zero for codewords"""
+        bits = np.asarray(codewords, dtype=np.uint8)
+        syndrome: np.ndarray = np.bitwise_xor.reduce(bits[..., self.checks], axis=-1)
+        return syndrome
+
+    def encode(self, messages: np.ndarray) -> np.ndarray:
+        """Systematic encoding
+
+        :param messages: message bits of shape (..., k)
+        :return: codewords of shape (..., n)
+        """
+        messages = np.asarray(messages, dtype=np.uint8)
+        if messages.shape[-1] != self.k:
+            raise ValueError(f"Messages must have {self.k} bits, got {messages.shape[-1]}")
+        codewords = np.empty(messages.shape[:-1] + (self.n,), dtype=np.uint8)
+        codewords[..., self.message_positions] = messages
+        # sums of at most k ones are exact in float32
+        parity = messages.astype(np.float32) @ self._parity_matrix.T
+        codewords[..., self.parity_positions] = parity.astype(np.int64) & 1
+        return codewords
+
+    def decode(self, llr: np.ndarray, max_iterations: int = 10,
+               scale: float = 0.75, offset: float = 0,
+               batch: int = 256) -> LDPCDecodeResult:
+        """Layered min-sum decoding of many codewords at once
+
+        Messages of a check are the smallest and second smallest magnitude of other
+        variable messages, scaled and reduced by offset. Codewords are checked after
+        every iteration and codewords satisfying all checks leave the batch.
+
+        :param llr: log-likelihood ratios of codeword bits, shape (codewords, n) or (n,)
+        :param max_iterations: iterations over all layers
+        :param scale: normalization of min-sum, 1 is plain min-sum
+        :param offset: offset of min-sum, subtracted after scaling
+        :param batch: codewords decoded together, messages of larger batches don't
+            fit into CPU caches
+        :return: decisions, validity and iterations of every codeword
+        """
+        llr = np.asarray(llr, dtype=np.float32)
+        single = llr.ndim == 1
+        llr = llr.reshape(-1, self.n)
+        decided = (llr < 0).astype(np.uint8)
+        iterations = np.zeros(len(llr), dtype=np.int64)
+        valid = np.zeros(len(llr), dtype=bool)
+        for start in range(0, len(llr), batch):
+            chunk = slice(start, start + batch)
+            self._decode_batch(llr[chunk], decided[chunk], valid[chunk], iterations[chunk],
+                               max_iterations, scale, offset)
+        result = LDPCDecodeResult(decided, decided[:, self.message_positions], valid, iterations)
+        if single:
+            return LDPCDecodeResult._make(value[0] for value in result)
+        return result
+
+    def _decode_batch(self, llr: np.ndarray, decided: np.ndarray, valid: np.ndarray,
+                      iterations: np.ndarray, max_iterations: int,
+                      scale: float, offset: float) -> None:
+        """Decode codewords of llr into decided, valid and iterations in place"""
+        valid[...] = ~self._unsatisfied(np.ascontiguousarray(decided.T))
+
+        # codewords are the last axis, so that operations over edges of checks are
+        # elementwise operations of contiguous rows
+        active = np.flatnonzero(~valid)
+        posterior = np.ascontiguousarray(llr[active].T)
+        check_messages = np.zeros((self.checks.shape[1], len(self.checks), len(active)),
+                                  dtype=np.float32)
+        # decoding of active codeword continues, finished ones leave the batch when
+        # there are enough of them to pay for copying
+        running = np.ones(len(active), dtype=bool)
+        for iteration in range(1, max_iterations + 1):
+            if not running.any():
+                break
+            for layer in self.layers:
+                self._update_layer(posterior, check_messages[:, layer], self.checks[layer].T,
+                                   scale, offset)
+            hard = (posterior < 0).view(np.uint8)
+            done = running & ~self._unsatisfied(hard)
+            finished = running if iteration == max_iterations else done
+            decided[active[finished]] = hard[:, finished].T
+            valid[active[done]] = True
+            iterations[active[finished]] = iteration
+            running &= ~finished
+            if np.count_nonzero(~running) * 4 > len(running):
+                active = active[running]
+                posterior = np.ascontiguousarray(posterior[:, running])
+                check_messages = np.ascontiguousarray(check_messages[..., running])
+                running = np.ones(len(active), dtype=bool)
+
+    @staticmethod
+    def _update_layer(posterior: np.ndarray, check_messages: np.ndarray, edges: np.ndarray,
+                      scale: float, offset: float) -> None:
+        """Update posterior and check messages of one layer in place
+
+        :param posterior: posterior LLRs, shape (n, codewords)
+        :param check_messages: messages of layer checks, shape (weight, checks, codewords)
+        :param edges: variables of layer checks, shape (weight, checks)
+        """
+        incoming = posterior[edges] - check_messages
+        magnitude = np.abs(incoming)
+        first = magnitude.min(axis=0)
+        is_first = magnitude == first
+        np.putmask(magnitude, is_first, np.float32(np.inf))
+        second = magnitude.min(axis=0)
+        # several edges with the smallest magnitude all get it
+        np.copyto(second, first, where=is_first.sum(axis=0, dtype=np.uint16) > 1)
+        first *= scale
+        second *= scale
+        if offset:
+            np.maximum(first - offset, 0, out=first)
+            np.maximum(second - offset, 0, out=second)
+        outgoing = np.where(is_first, second, first)
+        # sign of other edges is own sign times sign of all edges
+        negative = np.logical_xor.reduce(np.signbit(incoming), axis=0)
+        np.copysign(outgoing, incoming, out=outgoing)
+        outgoing *= np.where(negative, np.float32(-1), np.float32(1))
+        check_messages[...] = outgoing
+        posterior[edges] = incoming + outgoing
+
+
+_40gbase_t: Optional[LDPC] = None
+
+
+def ldpc_40gbase_t() -> LDPC:
+    """LDPC(2048,1723) of 40GBASE-T and 10GBASE-T PCS, built once per process
+
+    RS-based (6,32)-regular code over GF(2^6) with polynomial x^6 + x + 1, see
+    :meth:`LDPC.from_reed_solomon`. It has the parameters of the code of the
+    standard, bit order of the standard's matrix isn't reproduced.
+    """
+    global _40gbase_t
+    if _40gbase_t is None:
+        _40gbase_t = LDPC.from_reed_solomon(degree=6, length=32, column_weight=6,
+                                            irreducible_poly=0x43)
+    return _40gbase_t
+
+
+def bpsk_llr(codewords: np.ndarray, ebn0_db: Union[float, np.ndarray], rate: float,
+             rng: np.random.Generator) -> np.ndarray:
+    """LLRs of codeword bits sent as BPSK (+1 for 0, -1 for 1) over AWGN channel
+
+    :param codewords: bits 0 and 1
+    :param ebn0_db: energy per information bit over noise density in dB
+    :param rate: code rate k / n
+    :param rng: generator of noise
+    """
+    sigma = np.sqrt(1 / (2 * rate * 10**(np.asarray(ebn0_db, dtype=float) / 10)))
+    received = 1 - 2 * np.asarray(codewords, dtype=np.float32)
+    received = received + rng.normal(0, 1, received.shape).astype(np.float32) * sigma
+    llr: np.ndarray = (2 * received / sigma**2).astype(np.float32)
+    return llr
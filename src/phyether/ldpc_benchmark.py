@@ -0,0 +1,62 @@
+import time
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from phyether.ldpc import LDPC, bpsk_llr, ldpc_40gbase_t
+
+
+class LDPCBenchmarkResult(NamedTuple):
+    ebn0_db: float
+    codewords: int
+    encode_rate: float
+    """encoded codewords per second"""
+    decode_rate: float
+    """decoded codewords per second"""
+    mean_iterations: float
+    bit_error_rate: float
+    """message bit errors after decoding"""
+    frame_error_rate: float
+    """codewords with any message bit error"""
+
+
+def benchmark_ldpc(code: Optional[LDPC] = None,
+                   ebn0_db: Sequence[float] = (3, 3.5, 4, 4.5, 5),
+                   codewords: int = 4096,
+                   max_iterations: int = 10,
+                   scale: float = 0.75,
+                   batch: int = 256,
+                   seed: int = 0) -> List[LDPCBenchmarkResult]:
+    """Throughput and error rates of LDPC code with random messages sent as BPSK over AWGN
+
+    Throughput of decoder depends on noise, codewords satisfying parity checks
+    leave the batch after fewer iterations.
+
+    :param code: code to benchmark, defaults to LDPC(2048,1723) of 40GBASE-T
+    :param ebn0_db: energy per information bit over noise density in dB
+    :param codewords: number of codewords for every Eb/N0
+    :param max_iterations: iterations of decoder
+    :param scale: normalization of min-sum
+    :param batch: codewords decoded together
+    :param seed: seed of messages and noise, defaults to 0
+    :return: one result for every Eb/N0
+    """
+    if code is None:
+        code = ldpc_40gbase_t()
+    rng = np.random.default_rng(seed)
+    results: List[LDPCBenchmarkResult] = []
+    for snr in ebn0_db:
+        messages = rng.integers(0, 2, (codewords, code.k), dtype=np.uint8)
+        start = time.perf_counter()
+        encoded = code.encode(messages)
+        encode_time = time.perf_counter() - start
+        llr = bpsk_llr(encoded, snr, code.k / code.n, rng)
+        start = time.perf_counter()
+        decoded = code.decode(llr, max_iterations=max_iterations, scale=scale, batch=batch)
+        decode_time = time.perf_counter() - start
+        errors = decoded.messages != messages
+        results.append(LDPCBenchmarkResult(
+            float(snr), codewords, codewords / encode_time, codewords / decode_time,
+            float(decoded.iterations.mean()), float(errors.mean()),
+            float(errors.any(axis=-1).mean())))
+    return results
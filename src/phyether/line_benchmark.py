@@ -0,0 +1,153 @@
+import random
+import time
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from PySpice.Probe.WaveForm import TransientAnalysis
+
+from phyether.accuracy import ACCURACY_PRESETS
+from phyether.dac import DAC, Attenuation, Cat5, Cat5e, Cat6, Cat7
+from phyether.standards import STANDARD_SPEEDS, StandardSpeed
+from phyether.twisted_pair import TwistedPair
+
+
+class BenchmarkResult(NamedTuple):
+    cable: str
+    length: int
+    model: str
+    runtime: float
+    """mean simulation time in seconds"""
+    max_error: float
+    """maximum difference of output voltage from LTRA in V"""
+    rms_error: float
+    """root mean square difference of output voltage from LTRA in V"""
+
+
+def _output(analysis: TransientAnalysis) -> np.ndarray:
+    return np.asarray(analysis['vout+'].as_ndarray() - analysis['vout-'].as_ndarray())
+
+
+def _timed(pair: TwistedPair, symbols: List[int], repeat: int, accuracy: str = 'normal'):
+    # first run loads circuit into ngspice
+    analysis = pair.simulate(symbols, warm_start='dc', accuracy=accuracy)  # type: ignore
+    start = time.perf_counter()
+    for _ in range(repeat):
+        analysis = pair.simulate(symbols, warm_start='dc', accuracy=accuracy)  # type: ignore
+    return analysis, (time.perf_counter() - start) / repeat
+
+
+def benchmark_line_models(models: Iterable[str] = ('txl', 'lumped', 'behavioural'),
+                          cables: Optional[Mapping[str, Attenuation]] = None,
+                          lengths: Sequence[int] = (1, 10, 50, 100),
+                          symbols: int = 200,
+                          rise_time: float = 1,
+                          on_time: float = 7,
+                          segments: int = 20,
+                          repeat: int = 3,
+                          seed: int = 0) -> List[BenchmarkResult]:
+    """Compare runtime and accuracy of line models against LTRA
+
+    Every model simulates the same random PAM16 symbols for every cable category and
+    length, output voltage is compared with LTRA ('lossy') simulation, which is
+    included in results with zero error for reference.
+
+    :param models: transmission types of :class:`TwistedPair` to compare
+    :param cables: cable categories, defaults to Cat5, Cat5e, Cat6 and Cat7
+    :param lengths: cable lengths in meters
+    :param symbols: number of symbols in every simulation
+    :param rise_time: rise time in ns, defaults to 1
+    :param on_time: symbol duration in ns, defaults to 7
+    :param segments: number of segments of lumped line, defaults to 20
+    :param repeat: number of timed simulations of every model, defaults to 3
+    :param seed: seed of random symbols, defaults to 0
+    :return: one result for every cable, length and model
+    """
+    if cables is None:
+        cables = {"Cat5": Cat5(), "Cat5e": Cat5e(), "Cat6": Cat6(), "Cat7": Cat7()}
+    results: List[BenchmarkResult] = []
+    for cable, attenuation in cables.items():
+        dac = DAC(rise_time, on_time, 15, attenuation=attenuation)
+        data = dac.random_signals(symbols, random.Random(seed))
+        for length in lengths:
+            reference_pair = TwistedPair(dac=dac, length=length, transmission_type='lossy')
+            reference, runtime = _timed(reference_pair, data, repeat)
+            reference_time = np.asarray(reference.time, dtype=float)
+            reference_output = _output(reference)
+            results.append(BenchmarkResult(cable, length, 'lossy', runtime, 0, 0))
+            for model in models:
+                pair = TwistedPair(dac=dac, length=length, transmission_type=model,  # type: ignore
+                                   segments=segments)
+                analysis, runtime = _timed(pair, data, repeat)
+                error = np.interp(reference_time, np.asarray(analysis.time, dtype=float),
+                                  _output(analysis)) - reference_output
+                results.append(BenchmarkResult(
+                    cable, length, model, runtime,
+                    float(np.max(np.abs(error))), float(np.sqrt(np.mean(error**2)))))
+    return results
+
+
+def fastest_models(results: Iterable[BenchmarkResult],
+                   max_error: float) -> Dict[str, Dict[int, str]]:
+    """Fastest model meeting accuracy budget for every cable category and length
+
+    :param results: results of :func:`benchmark_line_models`
+    :param max_error: maximum allowed difference of output voltage from LTRA in V
+    :return: cable -> length -> transmission type
+    """
+    best: Dict[str, Dict[int, BenchmarkResult]] = {}
+    for result in results:
+        if result.max_error > max_error:
+            continue
+        current = best.setdefault(result.cable, {}).get(result.length)
+        if current is None or result.runtime < current.runtime:
+            best[result.cable][result.length] = result
+    return {cable: {length: result.model for length, result in lengths.items()}
+            for cable, lengths in best.items()}
+
+
+class TimingResult(NamedTuple):
+    standard: str
+    accuracy: str
+    runtime: float
+    """mean simulation time in seconds"""
+    points: int
+    """number of output time points"""
+    max_error: float
+    """maximum difference of output voltage from 'signoff' preset in V"""
+
+
+def accuracy_report(standards: Optional[Mapping[str, StandardSpeed]] = None,
+                    presets: Iterable[str] = tuple(ACCURACY_PRESETS),
+                    length: int = 10,
+                    symbols: int = 200,
+                    repeat: int = 3,
+                    seed: int = 0) -> List[TimingResult]:
+    """Compare runtime and accuracy of accuracy presets on standard speeds
+
+    :param standards: rise and on times of standards, defaults to 1000BASE-T,
+        10GBASE-T and 40GBASE-T
+    :param presets: names of accuracy presets
+    :param length: cable length in meters, defaults to 10
+    :param symbols: number of symbols in every simulation, defaults to 200
+    :param repeat: number of timed simulations of every preset, defaults to 3
+    :param seed: seed of random symbols, defaults to 0
+    :return: one result for every standard and preset
+    """
+    if standards is None:
+        standards = STANDARD_SPEEDS
+    results: List[TimingResult] = []
+    for standard, speed in standards.items():
+        dac = DAC(speed.rise_time, speed.on_time, 15)
+        data = dac.random_signals(symbols, random.Random(seed))
+        pair = TwistedPair(dac=dac, length=length, transmission_type='lossy')
+        reference = pair.simulate(data, warm_start='dc', accuracy='signoff')
+        reference_time = np.asarray(reference.time, dtype=float)
+        reference_output = _output(reference)
+        for accuracy in presets:
+            analysis, runtime = _timed(pair, data, repeat, accuracy)
+            time_points = np.asarray(analysis.time, dtype=float)
+            error = np.interp(reference_time, time_points, _output(analysis)) - reference_output
+            results.append(TimingResult(standard, accuracy, runtime, len(time_points),
+                                        float(np.max(np.abs(error)))))
+    return results
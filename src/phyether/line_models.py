@@ -0,0 +1,274 @@
+from abc import ABC, abstractmethod
+from math import sqrt
+from typing import Dict, Mapping, Optional, Type, cast
+
+import numpy as np
+
+from PySpice.Probe.WaveForm import TransientAnalysis
+from PySpice.Spice.Netlist import Circuit, SubCircuit
+from PySpice.Unit import *
+from PySpice.Unit.Unit import UnitValue  # pylint: disable=unused-wildcard-import, wildcard-import
+
+from phyether.spice_session import SimulationSession, transient_from_arrays
+
+
+class LineModel(ABC):
+    """Lossy transmission line between nodes vin+, vin- and vout+, vout- of twisted pair
+
+    Line is described by length and resistance, inductance and capacitance per meter.
+    """
+    # simulated without ngspice by :meth:`transient`
+    behavioural = False
+
+    def __init__(self, name: str, length: float = 1, resistance: float = 0.188,
+                 inductance: float = 525, capacitance: float = 52) -> None:
+        """
+        :param name: name of twisted pair, used to name global models
+        :param length: length of line in meters, defaults to 1
+        :param resistance: resistance per meter in Ω, defaults to 0.188
+        :param inductance: inductance per meter in nH, defaults to 525
+        :param capacitance: capacitance per meter in pF, defaults to 52
+        """
+        self.name = name
+        self.set_parameters(length, resistance, inductance, capacitance)
+
+    def set_parameters(self, length: float, resistance: float,
+                       inductance: float, capacitance: float) -> None:
+        self.length = length
+        self.resistance = resistance
+        self.inductance = inductance
+        self.capacitance = capacitance
+
+    @property
+    def transmission_delay(self) -> UnitValue:
+        return cast(UnitValue,
+                    self.length * u_ns(u_s(sqrt(u_nH(self.inductance) * u_pF(self.capacitance)))))
+
+    @abstractmethod
+    def add_elements(self, subcircuit: SubCircuit) -> None:
+        """Add line elements to twisted pair subcircuit"""
+
+    def add_models(self, circuit: Circuit) -> None:
+        """Add global models used by line elements to circuit"""
+
+    @abstractmethod
+    def alter_session(self, session: SimulationSession) -> None:
+        """Apply current parameters to session containing twisted pair"""
+
+    def set_ltra_options(self, options: Mapping[str, float]) -> bool:
+        """Set accuracy parameters of LTRA models, other lines ignore them
+
+        :return: True if parameters changed and session has to be altered
+        """
+        return False
+
+
+class LTRALine(LineModel):
+    """ngspice lossy transmission line (LTRA), model is global so that it can be altered"""
+
+    def __init__(self, name: str, length: float = 1, resistance: float = 0.188,
+                 inductance: float = 525, capacitance: float = 52) -> None:
+        self.ltra_options: Dict[str, float] = {}
+        super().__init__(name, length, resistance, inductance, capacitance)
+
+    def set_ltra_options(self, options: Mapping[str, float]) -> bool:
+        if options == self.ltra_options:
+            return False
+        self.ltra_options = dict(options)
+        return True
+
+    @property
+    def model_name(self) -> str:
+        return f"ltra_{self.name}"
+
+    @property
+    def model_parameters(self) -> Dict[str, float]:
+        return {
+            'len': self.length,
+            'r': self.resistance,
+            'l': float(u_nH(self.inductance)),
+            'c': float(u_pF(self.capacitance)),
+            **self.ltra_options
+        }
+
+    def add_elements(self, subcircuit: SubCircuit) -> None:
+        subcircuit.raw_spice = f"O1 vin+ vin- vout+ vout- {self.model_name}"
+
+    def add_models(self, circuit: Circuit) -> None:
+        circuit.model(self.model_name, 'ltra', **self.model_parameters)
+
+    def alter_session(self, session: SimulationSession) -> None:
+        session.alter_model(self.model_name, **self.model_parameters)
+
+
+class TXLLine(LTRALine):
+    """ngspice single conductor lossy line (TXL) for each wire of the pair
+
+    TXL is referenced to ground, so differential line is modelled as two lines with
+    half of series resistance and inductance and double capacitance each.
+    """
+
+    def set_ltra_options(self, options: Mapping[str, float]) -> bool:
+        return False
+
+    @property
+    def model_name(self) -> str:
+        return f"txl_{self.name}"
+
+    @property
+    def model_parameters(self) -> Dict[str, float]:
+        return {
+            'r': self.resistance / 2,
+            'l': float(u_nH(self.inductance)) / 2,
+            'g': 0,
+            'c': float(u_pF(self.capacitance)) * 2,
+            'length': self.length
+        }
+
+    def add_elements(self, subcircuit: SubCircuit) -> None:
+        subcircuit.raw_spice = (f"Y1 vin+ 0 vout+ 0 {self.model_name}\n"
+                                f"Y2 vin- 0 vout- 0 {self.model_name}")
+
+    def add_models(self, circuit: Circuit) -> None:
+        circuit.model(self.model_name, 'txl', **self.model_parameters)
+
+
+class LumpedLine(LineModel):
+    """Cascade of lumped RLC segments
+
+    Every segment has series resistance and inductance split between both wires
+    followed by capacitance between wires. Accuracy grows with number of segments,
+    segment delay should be well below rise time.
+    """
+
+    def __init__(self, name: str, length: float = 1, resistance: float = 0.188,
+                 inductance: float = 525, capacitance: float = 52, segments: int = 20) -> None:
+        """
+        :param segments: number of segments, fixed for lifetime of the line, defaults to 20
+        """
+        if segments < 1:
+            raise ValueError("Lumped line needs at least one segment")
+        self.segments = segments
+        self._subcircuit: Optional[SubCircuit] = None
+        super().__init__(name, length, resistance, inductance, capacitance)
+
+    def set_parameters(self, length: float, resistance: float,
+                       inductance: float, capacitance: float) -> None:
+        super().set_parameters(length, resistance, inductance, capacitance)
+        if self._subcircuit is not None:
+            segment_r, segment_l, segment_c = self._segment_values()
+            for segment in range(1, self.segments + 1):
+                for wire in ('p', 'n'):
+                    self._subcircuit[f'Rseg{segment}{wire}'].resistance = segment_r
+                    self._subcircuit[f'Lseg{segment}{wire}'].inductance = segment_l
+                self._subcircuit[f'Cseg{segment}'].capacitance = segment_c
+
+    def _segment_values(self):
+        length = self.length / self.segments
+        return (u_Ohm(self.resistance * length / 2),
+                u_nH(self.inductance * length / 2),
+                u_pF(self.capacitance * length))
+
+    def add_elements(self, subcircuit: SubCircuit) -> None:
+        resistance, inductance, capacitance = self._segment_values()
+        previous = ('vin+', 'vin-')
+        for segment in range(1, self.segments + 1):
+            if segment == self.segments:
+                nodes = ('vout+', 'vout-')
+            else:
+                nodes = (f'n{segment}+', f'n{segment}-')
+            for wire, start, end in zip(('p', 'n'), previous, nodes):
+                subcircuit.R(f'seg{segment}{wire}', start, f'm{segment}{wire}', resistance)
+                subcircuit.L(f'seg{segment}{wire}', f'm{segment}{wire}', end, inductance)
+            subcircuit.C(f'seg{segment}', *nodes, capacitance)
+            previous = nodes
+        self._subcircuit = subcircuit
+
+    def alter_session(self, session: SimulationSession) -> None:
+        resistance, inductance, capacitance = self._segment_values()
+        for segment in range(1, self.segments + 1):
+            for wire in ('p', 'n'):
+                session.alter(f'r.x{self.name}.rseg{segment}{wire}',
+                              resistance=float(resistance))
+                session.alter(f'l.x{self.name}.lseg{segment}{wire}',
+                              inductance=float(inductance))
+            session.alter(f'c.x{self.name}.cseg{segment}', capacitance=float(capacitance))
+
+
+class BehaviouralLine(LineModel):
+    """Line simulated in numpy from its frequency response instead of ngspice
+
+    Uses exact transfer function of uniform RLC line driven by ideal voltage
+    source and terminated with load resistance. Signal is padded so that
+    reflections settle before periodic FFT wraps around.
+    """
+    behavioural = True
+
+    def add_elements(self, subcircuit: SubCircuit) -> None:
+        pass
+
+    def alter_session(self, session: SimulationSession) -> None:
+        raise ValueError("Behavioural line can't be simulated in ngspice")
+
+    def transfer_function(self, frequency: np.ndarray, load: float) -> np.ndarray:
+        """Output voltage over input voltage of terminated line
+
+        :param frequency: frequencies in Hz
+        :param load: load resistance in Ω
+        """
+        omega = 2j * np.pi * frequency
+        series = self.resistance + omega * float(u_nH(self.inductance))
+        shunt = omega * float(u_pF(self.capacitance))
+        propagation = np.sqrt(series * shunt) * self.length
+        # characteristic impedance * sinh(propagation), finite at 0 Hz
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sinhc = np.where(propagation == 0, 1, np.sinh(propagation) / propagation)
+        return load / (load * np.cosh(propagation) + series * self.length * sinhc)
+
+    def transient(self, times: np.ndarray, voltages: np.ndarray, load: float,
+                  step_time: float, start_time: float, end_time: float,
+                  voltage_offset: float = 0) -> TransientAnalysis:
+        """Response of line to PWL signal with the same nodes as ngspice simulation
+
+        Line is at rest at voltage of the first PWL point, as after DC operating point.
+
+        :param times: PWL times in seconds
+        :param voltages: PWL voltages
+        :param load: load resistance in Ω
+        :param step_time: time step in seconds
+        :param start_time: results before start_time aren't returned
+        :param end_time: final time in seconds
+        :param voltage_offset: common mode voltage of both wires
+        """
+        delay = float(self.transmission_delay)
+        settle = 20 * delay + 10 * step_time
+        time = np.arange(0, end_time + 3 * settle, step_time)
+        initial = voltages[0]
+        signal = np.interp(time, times, voltages) - initial
+        # return to initial level after end so that periodic signal has no jump
+        ramp = (time > end_time + settle) & (time < end_time + 2 * settle)
+        final = signal[time <= end_time + settle][-1]
+        signal[ramp] = final * (end_time + 2 * settle - time[ramp]) / settle
+        signal[time >= end_time + 2 * settle] = 0
+
+        frequency = np.fft.rfftfreq(len(time), step_time)
+        response = np.fft.irfft(np.fft.rfft(signal) * self.transfer_function(frequency, load),
+                                len(time))
+        output = response + initial * self.transfer_function(np.zeros(1), load).real[0]
+        vin = signal + initial
+
+        keep = (time >= start_time) & (time <= end_time)
+        return transient_from_arrays(time[keep], {
+            'vin+': voltage_offset + vin[keep] / 2,
+            'vin-': voltage_offset - vin[keep] / 2,
+            'vout+': voltage_offset + output[keep] / 2,
+            'vout-': voltage_offset - output[keep] / 2,
+        })
+
+
+LINE_MODELS: Dict[str, Type[LineModel]] = {
+    'lossy': LTRALine,
+    'txl': TXLLine,
+    'lumped': LumpedLine,
+    'behavioural': BehaviouralLine,
+}
@@ -0,0 +1,255 @@
+"""Link quality of simulated waveforms: eye opening, SNR/MER and symbol error rate
+
+Output is sampled at symbol centres, compensating transmission delay, and compared
+with transmitted symbols. Waveforms of many runs sharing one time axis, e.g.
+results of :class:`phyether.sweep.PairSweep`, are evaluated together as rows of one
+array.
+"""
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from PySpice.Probe.WaveForm import TransientAnalysis
+
+from phyether.dac import DAC
+
+
+class LinkMetrics(NamedTuple):
+    """Metrics of one run, or arrays with one value per run"""
+
+    eye_height: Union[float, np.ndarray]
+    """worst vertical opening between adjacent levels at sampling instant in volts"""
+    eye_width: Union[float, np.ndarray]
+    """horizontal opening around symbol centre with positive eye height in seconds"""
+    snr: Union[float, np.ndarray]
+    """signal to noise ratio in dB, noise without static offset"""
+    mer: Union[float, np.ndarray]
+    """modulation error ratio in dB, error includes static offset"""
+    symbol_errors: Union[int, np.ndarray]
+    symbol_error_rate: Union[float, np.ndarray]
+    symbols: int
+    """number of compared symbols"""
+
+
+def symbol_levels(dac: DAC) -> np.ndarray:
+    """Voltages of all symbols of DAC, in order of :attr:`DAC.possible_symbols`"""
+    return np.asarray(dac.possible_symbols, dtype=float) * dac.quotient
+
+
+def level_indexes(symbols: Union[Sequence[int], np.ndarray], dac: DAC) -> np.ndarray:
+    """Index of level of every symbol, see :func:`symbol_levels`
+
+    :param symbols: symbols of DAC
+    :param dac: DAC which generated symbols
+    :raises ValueError: symbol isn't one of possible symbols of DAC
+    """
+    offsets = np.asarray(symbols, dtype=np.int64) - dac.possible_symbols.start
+    indexes, remainders = np.divmod(offsets, dac.symbol_step)
+    if np.any((remainders != 0) | (indexes < 0) | (indexes >= len(dac.possible_symbols))):
+        raise ValueError("Symbols outside of possible symbols of DAC")
+    return indexes
+
+
+def symbol_centres(dac: DAC, symbols: int, transmission_delay: Union[float, np.ndarray] = 0,
+                   shift: Union[float, np.ndarray] = 0) -> np.ndarray:
+    """Times of centres of flat parts of symbols at output
+
+    Symbol k starts its transition at k * symbol_time after transmission delay.
+
+    :param dac: DAC which generated symbols
+    :param symbols: number of symbols
+    :param transmission_delay: delay of pair, array of delays gives one row per run
+    :param shift: seconds added to centres, array of shifts adds axis before symbols
+    :return: times of shape (*runs, *shifts, symbols)
+    """
+    delay = np.asarray(transmission_delay, dtype=float)
+    shift = np.asarray(shift, dtype=float)
+    if delay.ndim:
+        delay = delay.reshape(delay.shape + (1,) * (shift.ndim + 1))
+    centre = float(dac.rise_time) + float(dac.on_time) / 2 + shift[..., None]
+    return delay + centre + np.arange(symbols) * float(dac.symbol_time)
+
+
+def sample(time: np.ndarray, voltage: np.ndarray, at: np.ndarray) -> np.ndarray:
+    """Linear interpolation of rows of voltage sharing time axis
+
+    :param time: increasing times
+    :param voltage: waveforms of shape (*runs, samples)
+    :param at: sampling times of shape (*runs, ..., points)
+    :return: samples of shape of at
+    """
+    time = np.asarray(time, dtype=float)
+    voltage = np.asarray(voltage, dtype=float)
+    at = np.asarray(at, dtype=float)
+    right = np.clip(np.searchsorted(time, at), 1, len(time) - 1)
+    left = right - 1
+    weight = np.clip((at - time[left]) / (time[right] - time[left]), 0, 1)
+    rows = voltage.reshape(voltage.shape[:-1] + (1,) * max(at.ndim - voltage.ndim, 0)
+                           + voltage.shape[-1:])
+    low = np.take_along_axis(rows, left, axis=-1)
+    high = np.take_along_axis(rows, right, axis=-1)
+    samples: np.ndarray = low + weight * (high - low)
+    return samples
+
+
+def decide(samples: np.ndarray, levels: np.ndarray) -> np.ndarray:
+    """Index of nearest level of every sample
+
+    :param samples: sampled voltages
+    :param levels: increasing symbol voltages
+    """
+    thresholds = (levels[1:] + levels[:-1]) / 2
+    return np.searchsorted(thresholds, samples)
+
+
+def _eye_heights(samples: np.ndarray, level_index: np.ndarray, levels: int) -> np.ndarray:
+    """Worst opening between samples of transmitted levels and of all lower levels
+
+    :param samples: sampled voltages of shape (..., symbols)
+    :param level_index: transmitted level of every symbol, broadcast against samples
+    :param levels: number of levels
+    :return: heights of shape of samples without symbols, nan if less than two levels
+        were transmitted
+    """
+    rows = samples[..., 0].size
+    index = (np.arange(rows).reshape(samples.shape[:-1] + (1,)) * levels
+             + np.broadcast_to(level_index, samples.shape)).ravel()
+    minimum = np.full(rows * levels, np.inf)
+    maximum = np.full(rows * levels, -np.inf)
+    np.minimum.at(minimum, index, samples.ravel())
+    np.maximum.at(maximum, index, samples.ravel())
+    shape = samples.shape[:-1] + (levels,)
+    # levels which weren't transmitted are skipped: their minimum is inf and they
+    # don't raise maximum of lower levels
+    below = np.maximum.accumulate(maximum.reshape(shape), axis=-1)[..., :-1]
+    openings = minimum.reshape(shape)[..., 1:] - below
+    heights: np.ndarray = np.fmin.reduce(
+        np.where(np.isfinite(openings), openings, np.nan), axis=-1)
+    return heights
+
+
+def _eye_widths(heights: np.ndarray, step: float) -> np.ndarray:
+    """Width of contiguous phases with positive height around the best one
+
+    :param heights: eye heights of shape (..., phases)
+    :param step: time between phases
+    """
+    phases = np.arange(heights.shape[-1])
+    best = np.argmax(np.where(np.isnan(heights), -np.inf, heights), axis=-1)[..., None]
+    closed = ~(heights > 0)
+    left = np.where(closed & (phases < best), phases, -1).max(axis=-1)
+    right = np.where(closed & (phases > best), phases, heights.shape[-1]).min(axis=-1)
+    open_best = np.take_along_axis(heights, best, axis=-1)[..., 0] > 0
+    return np.where(open_best, (right - left - 1) * step, 0.0)
+
+
+def link_metrics(time: np.ndarray, voltage: np.ndarray,
+                 symbols: Union[Sequence[int], np.ndarray], dac: DAC,
+                 transmission_delay: Union[float, Sequence[float], np.ndarray] = 0,
+                 phases: int = 32, normalize_gain: bool = True) -> LinkMetrics:
+    """Metrics of differential output waveforms against transmitted symbols
+
+    :param time: times of samples, shared by all runs
+    :param voltage: vout+ - vout- of one run, or of shape (runs, samples)
+    :param symbols: transmitted symbols, or of shape (runs, symbols)
+    :param dac: DAC which generated symbols
+    :param transmission_delay: delay of pair, or one delay per run
+    :param phases: sampling phases across symbol time for eye width
+    :param normalize_gain: scale samples by least-squares gain to DAC levels before
+        slicing and SNR/MER, like receiver's automatic gain control, otherwise
+        attenuation of line counts as error
+    :return: metrics, with arrays if voltage has more than one dimension
+    """
+    time = np.asarray(time, dtype=float)
+    voltage = np.asarray(voltage, dtype=float)
+    runs = voltage.shape[:-1]
+    symbols_array = np.asarray(symbols, dtype=np.int64)
+    delay = np.broadcast_to(np.asarray(transmission_delay, dtype=float), runs)
+    levels = symbol_levels(dac)
+    level_index = level_indexes(symbols_array, dac)
+
+    # only symbols received by every run, including phases of eye width
+    symbol_time = float(dac.symbol_time)
+    last = (float(np.max(delay, initial=0)) + float(dac.rise_time) + float(dac.on_time) / 2
+            + symbol_time / 2)
+    received = int((time[-1] - last) // symbol_time) + 1
+    count = max(min(symbols_array.shape[-1], received), 0)
+    level_index = level_index[..., :count]
+    if not count:
+        nan = np.full(runs, np.nan)
+        zero = np.zeros(runs, dtype=np.int64)
+        return _scalars(LinkMetrics(nan, nan, nan, nan, zero, nan, 0), runs)
+
+    ideal = levels[level_index]
+    centre = sample(time, voltage, symbol_centres(dac, count, delay))
+    gain = np.ones(runs)
+    if normalize_gain:
+        gain = (centre * ideal).sum(axis=-1) / (ideal * ideal).sum(axis=-1)
+    normalized = centre / gain[..., None]
+    errors = np.count_nonzero(decide(normalized, levels) != level_index, axis=-1)
+    error = normalized - ideal
+    power = (ideal * ideal).mean(axis=-1)
+    with np.errstate(divide='ignore'):
+        mer = 10 * np.log10(power / (error * error).mean(axis=-1))
+        snr = 10 * np.log10(power / error.var(axis=-1))
+
+    # phases add axis between runs and symbols
+    step = symbol_time / phases
+    shifts = (np.arange(phases) - (phases - 1) / 2) * step
+    swept = sample(time, voltage[..., None, :], symbol_centres(dac, count, delay, shifts))
+    heights = _eye_heights(swept, level_index[..., None, :], len(levels))
+    return _scalars(LinkMetrics(_eye_heights(centre, level_index, len(levels)),
+                                _eye_widths(heights, step), snr, mer,
+                                errors, errors / count, count), runs)
+
+
+def _scalars(metrics: LinkMetrics, runs: Tuple[int, ...]) -> LinkMetrics:
+    if runs:
+        return metrics
+    return LinkMetrics._make(value.item() if isinstance(value, (np.ndarray, np.generic))
+                             else value for value in metrics)
+
+
+def analysis_metrics(analysis: TransientAnalysis, symbols: Sequence[int], dac: DAC,
+                     transmission_delay: float = 0, **kwargs) -> LinkMetrics:
+    """:func:`link_metrics` of vout+ - vout- of twisted pair simulation"""
+    voltage = analysis['vout+'].as_ndarray() - analysis['vout-'].as_ndarray()
+    return link_metrics(np.asarray(analysis.time, dtype=float), voltage, symbols, dac,
+                        transmission_delay, **kwargs)
+
+
+def sweep_metrics(analyses: Sequence[TransientAnalysis], symbols: Sequence, dac: DAC,
+                  transmission_delays: Sequence[float],
+                  shared_signal: bool = True, **kwargs) -> List[LinkMetrics]:
+    """Metrics of every run of sweep, runs sharing time axis are evaluated together
+
+    :param analyses: results of :func:`phyether.sweep.simulate_sweep`
+    :param symbols: transmitted symbols, one sequence per run if not shared_signal
+    :param dac: DAC used by all pairs
+    :param transmission_delays: delay of every pair
+    :param shared_signal: all pairs got the same symbols
+    :return: metrics in order of analyses
+    """
+    groups: List[Tuple[np.ndarray, List[int]]] = []
+    for index, analysis in enumerate(analyses):
+        time = np.asarray(analysis.time, dtype=float)
+        group: Optional[Tuple[np.ndarray, List[int]]] = next(
+            (group for group in groups
+             if len(group[0]) == len(time) and np.array_equal(group[0], time)), None)
+        if group is None:
+            groups.append((time, [index]))
+        else:
+            group[1].append(index)
+
+    metrics: List[Optional[LinkMetrics]] = [None] * len(analyses)
+    for time, indexes in groups:
+        voltage = np.stack([analyses[index]['vout+'].as_ndarray()
+                            - analyses[index]['vout-'].as_ndarray() for index in indexes])
+        run_symbols = (np.asarray(symbols) if shared_signal
+                       else np.stack([np.asarray(symbols[index]) for index in indexes]))
+        result = link_metrics(time, voltage, run_symbols, dac,
+                              np.asarray(transmission_delays, dtype=float)[indexes], **kwargs)
+        for row, index in enumerate(indexes):
+            metrics[index] = _scalars(LinkMetrics._make(
+                value[row] if isinstance(value, np.ndarray) else value for value in result), ())
+    return [metric for metric in metrics if metric is not None]
@@ -0,0 +1,279 @@
+"""End-to-end link over one twisted pair: RS encoding, PAM16 or DSQ128 modulation,
+channel, slicing and RS decoding
+
+Payload is processed in batches of codewords as NumPy arrays, every batch reports
+errors before FEC (line symbols and coded bits) and after it (codewords and payload
+bits). Channel is chosen by :class:`Channel` subclass:
+
+* :class:`SpiceChannel` - transient simulation of every batch by
+  :meth:`TwistedPair.simulate`, with any line model
+* :class:`ResponseChannel` from :meth:`ResponseChannel.from_pair` - response of the
+  pair to a single symbol is simulated once and batches are convolved with it
+* :class:`ResponseChannel` with given taps - behavioural ISI channel without any
+  simulation
+
+DSQ128 pairs of symbols are sent one after the other on the modelled pair.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Iterator, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+from phyether.dac import DAC
+from phyether.link_metrics import decide, symbol_levels
+from phyether.pam import PAM16
+from phyether.receiver import Equalizer, symbol_samples
+from phyether.reed_solomon import RS_Original
+from phyether.result_cache import ResultCache
+from phyether.rs_payload import PayloadCodec, bytes_to_symbols
+from phyether.twisted_pair import TwistedPair
+
+
+class Channel(ABC):
+    """Twisted pair seen by receiver as output sampled once per symbol"""
+
+    def __init__(self, dac: DAC) -> None:
+        self.dac = dac
+
+    @abstractmethod
+    def transmit(self, symbols: np.ndarray) -> np.ndarray:
+        """Differential output at centre of every symbol, transmission delay compensated
+
+        :param symbols: DAC symbols
+        :return: voltages of shape of symbols
+        """
+
+
+class SpiceChannel(Channel):
+    """Every batch is simulated as one transient analysis of pair"""
+
+    def __init__(self, pair: TwistedPair, **simulate_kwargs: Any) -> None:
+        """
+        :param pair: simulated pair, 'behavioural' transmission type runs without ngspice
+        :param simulate_kwargs: keyword arguments of :meth:`TwistedPair.simulate`,
+            e.g. warm_start, accuracy or cache
+        """
+        super().__init__(pair.dac)
+        self.pair = pair
+        self.simulate_kwargs = simulate_kwargs
+
+    def transmit(self, symbols: np.ndarray) -> np.ndarray:
+        analysis = self.pair.simulate(np.asarray(symbols).tolist(), **self.simulate_kwargs)
+        voltage = analysis['vout+'].as_ndarray() - analysis['vout-'].as_ndarray()
+        return symbol_samples(np.asarray(analysis.time, dtype=float), voltage, self.dac,
+                              float(self.pair.transmission_delay), len(symbols))
+
+
+class ResponseChannel(Channel):
+    """Linear channel given by its symbol-spaced response to a single symbol
+
+    PWL signal of DAC is a sum of trapezoids of single symbols, so output of a linear
+    line at symbol centres is convolution of symbol voltages with the response.
+    """
+
+    def __init__(self, dac: DAC, response: Union[Sequence[float], np.ndarray]) -> None:
+        """
+        :param dac: DAC which generates symbols
+        :param response: output at centre of symbol k per volt of symbol 0, response[0]
+            is the main cursor
+        """
+        super().__init__(dac)
+        self.response = np.asarray(response, dtype=float)
+
+    @classmethod
+    def from_pair(cls, pair: TwistedPair, span: int = 256,
+                  cache: Optional[ResultCache] = None,
+                  **simulate_kwargs: Any) -> "ResponseChannel":
+        """Response of pair simulated once for a single highest symbol
+
+        :param pair: simulated pair, its line model must be linear
+        :param span: symbols of response, inter-symbol interference beyond it is dropped,
+            lossy lines have tails of hundreds of symbols
+        :param cache: cache of results, so that response of the same pair is simulated once
+        :param simulate_kwargs: other keyword arguments of :meth:`TwistedPair.simulate`
+        """
+        dac = pair.dac
+        analysis = pair.simulate([dac.high_symbol] + [0] * (span - 1), cache=cache,
+                                 **simulate_kwargs)
+        voltage = analysis['vout+'].as_ndarray() - analysis['vout-'].as_ndarray()
+        samples = symbol_samples(np.asarray(analysis.time, dtype=float), voltage, dac,
+                                 float(pair.transmission_delay), span)
+        return cls(dac, samples / (dac.high_symbol * dac.quotient))
+
+    def transmit(self, symbols: np.ndarray) -> np.ndarray:
+        voltages = np.asarray(symbols, dtype=float) * self.dac.quotient
+        return np.convolve(voltages, self.response)[:len(voltages)]
+
+
+class LinkResult(NamedTuple):
+    """Error counts of a batch or of the whole payload"""
+
+    bits: int
+    """payload bits"""
+    symbols: int
+    """line symbols, without training symbols"""
+    symbol_errors: int
+    coded_bits: int
+    """bits of codewords sent over line"""
+    coded_bit_errors: int
+    """wrong bits of received codewords, before FEC"""
+    codewords: int
+    failed_codewords: int
+    """codewords which couldn't be decoded"""
+    corrected_symbols: int
+    """FEC symbols corrected in decoded codewords"""
+    bit_errors: int
+    """wrong payload bits after FEC"""
+
+    @property
+    def symbol_error_rate(self) -> float:
+        return self.symbol_errors / self.symbols if self.symbols else float('nan')
+
+    @property
+    def pre_fec_ber(self) -> float:
+        return self.coded_bit_errors / self.coded_bits if self.coded_bits else float('nan')
+
+    @property
+    def post_fec_ber(self) -> float:
+        return self.bit_errors / self.bits if self.bits else float('nan')
+
+
+def _to_bits(values: np.ndarray, bits: int) -> np.ndarray:
+    """Bits of every value, most significant first, shape (*values, bits)"""
+    return ((np.asarray(values, dtype=np.int64)[..., None] >> np.arange(bits - 1, -1, -1)) & 1
+            ).astype(np.uint8)
+
+
+class LinkPipeline:
+    """Payload sent over channel and decoded, batch by batch
+
+    Payload bytes are split into FEC symbols and messages of :class:`PayloadCodec`,
+    codewords are serialized most significant bit first and modulated by
+    :meth:`PAM16.bits_to_symbols`. Received samples are equalized or only scaled by
+    automatic gain control fitted to known training symbols, demodulated by
+    :meth:`PAM16.symbols_to_bits` and decoded.
+    """
+
+    def __init__(self, channel: Channel, *,
+                 reed_solomon: Optional[RS_Original] = None,
+                 use_dsq128: bool = False,
+                 equalizer: Optional[Equalizer] = None,
+                 noise: float = 0,
+                 training: int = 256,
+                 batch_symbols: int = 1 << 16) -> None:
+        """
+        :param channel: channel with DAC of PAM16 symbols
+        :param reed_solomon: systematic code, None sends payload without FEC
+        :param use_dsq128: send 7-bit frames as DSQ128 pairs of symbols
+        :param equalizer: receiver equalizer, every batch is preceded by
+            equalizer.training random symbols known to receiver, None slices samples
+            scaled by automatic gain control
+        :param noise: standard deviation of Gaussian noise added to samples in volts
+        :param training: random symbols known to receiver preceding every batch
+            without equalizer, gain of samples is fitted to them
+        :param batch_symbols: approximate line symbols of every batch, batches hold
+            whole codewords
+        """
+        if len(channel.dac.possible_symbols) != 16:
+            raise ValueError("Link pipeline needs DAC of PAM16 symbols")
+        self.channel = channel
+        self.dac = channel.dac
+        self.codec = PayloadCodec(reed_solomon) if reed_solomon is not None else None
+        self.use_dsq128 = use_dsq128
+        self.equalizer = equalizer
+        self.noise = noise
+        self.training = training
+        self.batch_symbols = batch_symbols
+        self.levels = symbol_levels(self.dac)
+
+    @property
+    def symbol_bits(self) -> int:
+        """Bits of every FEC symbol"""
+        return self.codec.reed_solomon.gf.degree if self.codec is not None else 1
+
+    def run(self, payload: bytes, seed: Optional[int] = None) -> Iterator[LinkResult]:
+        """Send payload batch by batch
+
+        :param payload: bytes to send
+        :param seed: seed of noise and training symbols
+        :return: result of every batch
+        """
+        rng = np.random.default_rng(seed)
+        bits = self.symbol_bits
+        if self.codec is not None:
+            payload_symbols = -(-len(payload) * 8 // bits)
+            messages = self.codec.split(bytes_to_symbols(payload, bits))
+            # padding of the last message isn't payload, it's random like idle data,
+            # long runs of one symbol would disturb adaptation of equalizer
+            padding = messages.size - payload_symbols
+            messages.ravel()[payload_symbols:] = rng.integers(0, 1 << bits, padding)
+            codeword_bits = self.codec.n * bits
+        else:
+            messages = _to_bits(np.frombuffer(payload, dtype=np.uint8), 8).reshape(-1, 1)
+            codeword_bits = 1
+        bits_per_symbol = 3.5 if self.use_dsq128 else 4
+        batch = max(int(self.batch_symbols * bits_per_symbol) // codeword_bits, 1)
+        for first in range(0, len(messages), batch):
+            batch_messages = messages[first:first + batch]
+            sent = len(payload) * 8 - first * batch_messages.shape[1] * bits
+            yield self._send(batch_messages, sent, rng)
+
+    def simulate(self, payload: bytes, seed: Optional[int] = None) -> LinkResult:
+        """Send whole payload, errors of all batches summed"""
+        results = list(self.run(payload, seed))
+        return LinkResult._make(sum(values) for values in zip(*results))
+
+    def _send(self, messages: np.ndarray, payload_bits: int,
+              rng: np.random.Generator) -> LinkResult:
+        """Send one batch
+
+        :param messages: messages, one per row
+        :param payload_bits: bits of messages which are payload, counted from the
+            first one, padding of the last FEC symbol and message isn't payload
+        """
+        bits = self.symbol_bits
+        codewords = self.codec.encode(messages) if self.codec is not None else messages
+        coded = _to_bits(codewords, bits).ravel()
+        symbols = PAM16.bits_to_symbols(coded, self.use_dsq128)
+        received = self._receive(symbols, rng)
+        symbol_errors = int(np.count_nonzero(
+            decide(received * self.dac.quotient, self.levels) != (symbols + 15) // 2))
+
+        received_bits = PAM16.symbols_to_bits(received, self.use_dsq128)[:len(coded)]
+        weights = 1 << np.arange(bits - 1, -1, -1)
+        received_codewords = received_bits.reshape(codewords.shape + (bits,)) @ weights
+        if self.codec is not None:
+            decoded, corrected = self.codec.decode(received_codewords)
+        else:
+            decoded, corrected = received_codewords, np.zeros(len(codewords), dtype=np.int64)
+        payload = min(payload_bits, messages.size * bits)
+        bit_errors = np.count_nonzero(_to_bits(decoded, bits).ravel()[:payload]
+                                      != _to_bits(messages, bits).ravel()[:payload])
+        return LinkResult(bits=payload,
+                          symbols=len(symbols),
+                          symbol_errors=symbol_errors,
+                          coded_bits=len(coded),
+                          coded_bit_errors=int(np.count_nonzero(received_bits != coded)),
+                          codewords=len(codewords) if self.codec is not None else 0,
+                          failed_codewords=int(np.count_nonzero(corrected < 0)),
+                          corrected_symbols=int(corrected[corrected > 0].sum()),
+                          bit_errors=int(bit_errors))
+
+    def _receive(self, symbols: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Received values of symbols in units of symbols, before slicing"""
+        training = self.equalizer.training if self.equalizer is not None else self.training
+        preamble = rng.choice(np.asarray(self.dac.possible_symbols), training)
+        sent = np.concatenate((preamble, symbols))
+        samples = self.channel.transmit(sent)
+        if self.noise:
+            samples = samples + rng.normal(0, self.noise, samples.shape)
+        if self.equalizer is not None:
+            output = self.equalizer.equalize(samples, sent, self.dac).output[training:]
+        else:
+            # automatic gain control, least-squares gain from samples of known symbols,
+            # power of payload depends on its content
+            known = samples[:training]
+            power = float(np.dot(known, known))
+            gain = np.dot(known, preamble * self.dac.quotient) / power if power else 1.0
+            output = samples[training:] * gain
+        return output / self.dac.quotient
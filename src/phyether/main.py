@@ -1,10 +1,6 @@
 import platform
-import distro
 import subprocess
 
-from PySpice.Spice.NgSpice.Shared import NgSpiceShared
-
-from phyether.gui import gui
 import sqlite3
 
 def _galois_sqlite3_fix(cls):
@@ -15,8 +11,19 @@ def _galois_sqlite3_fix(cls):
     return cls.singleton
 
 def init():
+    init_galois()
+    init_ngspice()
+
+# galois and PySpice are imported in functions so that importing this module stays cheap
+
+def init_galois():
+    """Allow galois to use its database from multiple threads, imports galois"""
     from galois._databases._interface import DatabaseInterface
     DatabaseInterface.__new__ = _galois_sqlite3_fix
+
+def init_ngspice():
+    """Find ngspice library used by PySpice"""
+    from PySpice.Spice.NgSpice.Shared import NgSpiceShared
     if platform.system() == "Windows":
         from pathlib import Path
         dll_name = "ngspice.dll"
@@ -41,6 +48,7 @@ def init():
         raise FileNotFoundError("Unsupported system")
 
 def install_libngspice() -> bool:
+    import distro
     packageInstallers = {
         "debian": ("apt-get", "install", "-y", "libngspice0"),
         "rhel fedora": ('rpm', 'yum', 'install', '-y', 'libngspice0'),
@@ -52,6 +60,8 @@ def install_libngspice() -> bool:
 
 def main():
     print("Starting phyether...")
+    # Qt is imported only when GUI starts, library and batch users don't need it
+    from phyether.gui import gui
     gui.main()
 
 if __name__ == "__main__":
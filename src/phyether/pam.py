@@ -1,8 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Tuple
+from functools import lru_cache
+from typing import Optional, Tuple
 from bitarray import bitarray
+from bitarray.util import ba2hex, hex2ba
 import re
 
+import numpy as np
+
+from phyether.scrambler import Scrambler
 from phyether.util import removeprefix
 
 class PAM(ABC):
@@ -53,10 +58,19 @@ class PAM16(PAM):
     def high_symbol(self) -> int:
         return 15
 
-    def hex_to_signals(self, hex_data: str, use_dsq128: bool = False):
+    def hex_to_signals(self, hex_data: str, use_dsq128: bool = False,
+                       scrambler: Optional[Scrambler] = None):
+        """
+        :param hex_data: hexadecimal data
+        :param use_dsq128: map 7-bit frames to DSQ128 pairs of symbols on four pairs
+        :param scrambler: scrambler of data bits before mapping, it keeps its state,
+            so consecutive calls continue one scrambled stream
+        """
         if not re.match("^[a-f0-9]+$", hex_data):
             raise ValueError("Input must be a valid hexadecimal string")
 
+        if scrambler is not None:
+            hex_data = ba2hex(scrambler.scramble(hex2ba(hex_data)))
         if use_dsq128:
             return PAM16._hex_to_signals_dsq128(hex_data)
         else:
@@ -110,3 +124,69 @@ class PAM16(PAM):
                 twisted_pairs_output[idx] += " " + str(pam16_1) + " " + str(pam16_2)
 
         return [output[1:] for output in twisted_pairs_output]
+
+    @staticmethod
+    def bits_to_symbols(bits: np.ndarray, use_dsq128: bool = False) -> np.ndarray:
+        """Modulate array of bits, 4 bits per symbol or 7 bits per pair of DSQ128 symbols
+
+        Same mapping as :meth:`hex_to_signals`, last group is padded with zero bits.
+
+        :param bits: array of 0 and 1, most significant bit of every group first
+        :param use_dsq128: map 7-bit frames to pairs of symbols
+        :return: symbols -15, -13, ..., 15
+        """
+        bits = np.asarray(bits, dtype=np.int64)
+        group = 7 if use_dsq128 else 4
+        bits = np.pad(bits, (0, -len(bits) % group))
+        values = bits.reshape(-1, group) @ (1 << np.arange(group - 1, -1, -1))
+        levels: np.ndarray = _dsq128_levels()[values].ravel() if use_dsq128 else values
+        return 2 * levels - 15
+
+    @staticmethod
+    def symbols_to_bits(received: np.ndarray, use_dsq128: bool = False) -> np.ndarray:
+        """Demodulate received values to bits of nearest symbols
+
+        DSQ128 pairs are decided together: both values are rounded to nearest symbol
+        and if that pair isn't a DSQ128 point, the value cheaper to move goes to its
+        second nearest symbol, which gives the nearest point of DSQ128 checkerboard.
+
+        :param received: values in units of symbols, e.g. -14.7, 3.2
+        :param use_dsq128: values are pairs of DSQ128 symbols
+        :return: bits, 4 per symbol or 7 per pair of DSQ128 symbols
+        """
+        # position between lowest (0) and highest (15) level
+        position = (np.asarray(received, dtype=float) + 15) / 2
+        nearest = np.clip(np.rint(position), 0, 15).astype(np.int64)
+        if not use_dsq128:
+            values = nearest
+            group = 4
+        else:
+            position = position.reshape(-1, 2)
+            nearest = nearest.reshape(-1, 2)
+            towards = np.where(position >= nearest, 1, -1)
+            second = nearest + towards
+            second = np.where((second < 0) | (second > 15), nearest - towards, second)
+            cost = (position - second)**2 - (position - nearest)**2
+            moved = np.argmin(cost, axis=1)
+            rows = np.flatnonzero(nearest.sum(axis=1) % 2)
+            nearest[rows, moved[rows]] = second[rows, moved[rows]]
+            values = _dsq128_frames()[nearest[:, 0], nearest[:, 1]]
+            group = 7
+        return ((values[:, None] >> np.arange(group - 1, -1, -1)) & 1).astype(np.uint8).ravel()
+
+
+@lru_cache(maxsize=None)
+def _dsq128_levels() -> np.ndarray:
+    """Levels (0 to 15) of DSQ128 pair of every 7-bit frame, shape (128, 2)"""
+    symbols = np.array([PAM16._bits_to_dsq128(bitarray(format(frame, '07b')))
+                        for frame in range(128)])
+    return (symbols + 15) // 2
+
+
+@lru_cache(maxsize=None)
+def _dsq128_frames() -> np.ndarray:
+    """7-bit frame of every pair of levels, -1 for pairs which aren't DSQ128 points"""
+    frames = np.full((16, 16), -1, dtype=np.int64)
+    levels = _dsq128_levels()
+    frames[levels[:, 0], levels[:, 1]] = np.arange(128)
+    return frames
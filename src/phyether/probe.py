@@ -0,0 +1,32 @@
+from typing import Iterable, Optional, Tuple
+
+
+class Probe:
+    """Nodes stored from simulation and resolution they are stored with
+
+    Only requested nodes are saved by ngspice, which cuts memory and transfer time
+    of long simulations. Results can be resampled to uniform time grid.
+    """
+
+    def __init__(self, nodes: Optional[Iterable[str]] = None,
+                 samples_per_symbol: Optional[int] = None) -> None:
+        """
+        :param nodes: names of saved nodes, e.g. ('vin+', 'vout+'), defaults to all nodes
+        :param samples_per_symbol: resample results to this many points per symbol,
+            defaults to time points chosen by ngspice
+        """
+        self.nodes: Optional[Tuple[str, ...]] = (
+            tuple(node.lower() for node in nodes) if nodes is not None else None)
+        if samples_per_symbol is not None and samples_per_symbol < 1:
+            raise ValueError("At least one sample per symbol is needed")
+        self.samples_per_symbol = samples_per_symbol
+
+    def step_time(self, symbol_time: float) -> Optional[float]:
+        """Step of uniform time grid in seconds or None if results aren't resampled"""
+        if self.samples_per_symbol is None:
+            return None
+        return symbol_time / self.samples_per_symbol
+
+
+# nodes of twisted pair shown in plots
+PAIR_NODES = ('vin+', 'vin-', 'vout+', 'vout-')
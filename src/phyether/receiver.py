@@ -0,0 +1,244 @@
+"""Receiver equalization of symbol-spaced output samples
+
+:class:`Equalizer` is a feed-forward FIR equalizer followed by a decision-feedback
+equalizer. Taps start at least-squares solution over training symbols and are
+adapted by block LMS over the whole stream. Taps are fixed within a block of symbols, so
+FIR outputs of the whole block are one matrix product. Decisions inside a block
+depend on each other through feedback, they are found by iterating slicing of the
+whole block until decisions stop changing, which gives the same decisions as
+symbol by symbol feedback. Several runs, e.g. configurations of a sweep, are
+equalized together as rows of one array.
+"""
+from typing import NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from phyether.dac import DAC
+from phyether.link_metrics import (decide, level_indexes, sample, symbol_centres,
+                                   symbol_levels)
+
+
+class EqualizerResult(NamedTuple):
+    output: np.ndarray
+    """equalized soft values of every symbol, in volts of DAC levels"""
+    symbols: np.ndarray
+    """decided symbols"""
+    ffe_taps: np.ndarray
+    """final feed-forward taps, main tap at index ffe_taps - precursors - 1"""
+    dfe_taps: np.ndarray
+    """final feedback taps, first one multiplies previous decision"""
+    mse: np.ndarray
+    """mean squared error of every block, shape (..., blocks)"""
+    symbol_errors: Optional[np.ndarray]
+    """decision errors after training if transmitted symbols were given"""
+
+
+def symbol_samples(time: np.ndarray, voltage: np.ndarray, dac: DAC,
+                   transmission_delay: Union[float, np.ndarray] = 0,
+                   symbols: Optional[int] = None) -> np.ndarray:
+    """Output sampled once per symbol at symbol centres
+
+    :param time: times shared by all runs
+    :param voltage: vout+ - vout- of shape (*runs, samples)
+    :param dac: DAC which generated symbols
+    :param transmission_delay: delay of pair, or one delay per run
+    :param symbols: number of symbols, defaults to symbols received by every run
+    :return: samples of shape (*runs, symbols)
+    """
+    time = np.asarray(time, dtype=float)
+    delay = np.broadcast_to(np.asarray(transmission_delay, dtype=float),
+                            np.shape(voltage)[:-1])
+    if symbols is None:
+        first = float(np.max(delay, initial=0)) + float(dac.rise_time) + float(dac.on_time) / 2
+        symbols = max(int((time[-1] - first) // float(dac.symbol_time)) + 1, 0)
+    return sample(time, voltage, symbol_centres(dac, symbols, delay))
+
+
+class Equalizer:
+    """Feed-forward and decision-feedback equalizer with block LMS adaptation
+
+    Output of symbol k is::
+
+        y[k] = sum(ffe[i] * x[k - main + i]) - sum(dfe[j] * d[k - 1 - j])
+
+    where x are symbol-spaced samples and d decided levels. Taps are solved by least
+    squares against the first training transmitted symbols, LMS then tracks them
+    against transmitted symbols during training and against decisions afterwards.
+    """
+
+    def __init__(self, levels: Union[Sequence[float], np.ndarray], *,
+                 ffe_taps: int = 7, precursors: int = 2, dfe_taps: int = 4,
+                 step: float = 0.001, block: int = 128, training: int = 2048) -> None:
+        """
+        :param levels: voltages of symbols, see :func:`from_dac`
+        :param ffe_taps: number of feed-forward taps
+        :param precursors: feed-forward taps after main tap, they cancel interference
+            of following symbols
+        :param dfe_taps: number of feedback taps, 0 disables feedback
+        :param step: normalized LMS step size per symbol, smaller adapts slower with
+            less noise, step * block should stay well below 1
+        :param block: symbols sharing the same taps
+        :param training: transmitted symbols used to solve initial taps
+        """
+        if not 0 <= precursors < ffe_taps:
+            raise ValueError("Precursors must be fewer than feed-forward taps")
+        self.levels = np.sort(np.asarray(levels, dtype=float))
+        self.ffe_taps = ffe_taps
+        self.precursors = precursors
+        self.dfe_taps = dfe_taps
+        self.step = step
+        self.block = block
+        self.training = training
+
+    @classmethod
+    def from_dac(cls, dac: DAC, **kwargs) -> "Equalizer":
+        """Equalizer slicing to symbols of DAC"""
+        return cls(symbol_levels(dac), **kwargs)
+
+    @property
+    def main_tap(self) -> int:
+        return self.ffe_taps - self.precursors - 1
+
+    def equalize(self, samples: np.ndarray, symbols: Optional[np.ndarray] = None,
+                 dac: Optional[DAC] = None) -> EqualizerResult:
+        """Equalize symbol-spaced samples
+
+        :param samples: samples of shape (*runs, symbols), see :func:`symbol_samples`
+        :param symbols: transmitted symbols for training and error counting, shared
+            by runs or of shape (*runs, symbols), DAC symbols if dac is given,
+            otherwise voltages of levels, without them taps adapt to decisions from
+            the first symbol
+        :param dac: DAC of symbols, decisions are returned as its symbols instead of
+            indexes of levels
+        :raises ValueError: symbols aren't symbols of dac, or voltages of levels without dac
+        :return: output, decisions and final taps
+        """
+        samples = np.asarray(samples, dtype=float)
+        runs = samples.shape[:-1]
+        x = samples.reshape(-1, samples.shape[-1])
+        rows, count = x.shape
+        levels = self.levels
+
+        reference: Optional[np.ndarray] = None
+        if symbols is not None:
+            transmitted = np.broadcast_to(np.asarray(symbols), runs + (count,)).reshape(rows, count)
+            if dac is not None:
+                reference = level_indexes(transmitted, dac)
+            else:
+                reference = np.minimum(np.searchsorted(levels, transmitted), len(levels) - 1)
+                if not np.allclose(levels[reference], transmitted):
+                    raise ValueError("Transmitted symbols must be voltages of levels, "
+                                     "DAC symbols need dac")
+        training = min(self.training, count) if reference is not None else 0
+
+        # windows of feed-forward taps, x before first and after last symbol is 0
+        padded = np.pad(x, ((0, 0), (self.main_tap, self.precursors)))
+        windows = sliding_window_view(padded, self.ffe_taps, axis=-1)
+
+        power = np.maximum((x * x).mean(axis=-1), 1e-30)
+        level_power = (levels * levels).mean()
+        if reference is not None and training:
+            ffe, dfe = self._train(windows[:, :training], levels[reference[:, :training]])
+        else:
+            ffe = np.zeros((rows, self.ffe_taps))
+            # main tap starts at gain matching power of levels
+            ffe[:, self.main_tap] = np.sqrt(level_power / power)
+            dfe = np.zeros((rows, self.dfe_taps))
+        ffe_step = self.step / (self.ffe_taps * power)[:, None]
+        dfe_step = self.step / (max(self.dfe_taps, 1) * level_power)
+
+        output = np.empty((rows, count))
+        decisions = np.empty((rows, count), dtype=np.int64)
+        # previous decided levels in time order
+        history = np.zeros((rows, self.dfe_taps))
+        blocks = -(-count // self.block)
+        mse = np.empty((rows, blocks))
+        for block_index, start in enumerate(range(0, count, self.block)):
+            stop = min(start + self.block, count)
+            window = windows[:, start:stop]
+            feed_forward = np.einsum('rnt,rt->rn', window, ffe)
+            known = np.arange(start, stop) < training
+            decided, feedback, equalized = self._decide(
+                feed_forward, history, dfe,
+                reference[:, start:stop] if reference is not None else None, known)
+
+            target = levels[decided]
+            error = target - equalized
+            ffe += ffe_step * np.einsum('rn,rnt->rt', error, window)
+            if self.dfe_taps:
+                dfe -= dfe_step * np.einsum('rn,rnt->rt', error, feedback)
+                history = np.concatenate((history, target), axis=1)[:, -self.dfe_taps:]
+            output[:, start:stop] = equalized
+            decisions[:, start:stop] = decided
+            mse[:, block_index] = (error * error).mean(axis=-1)
+
+        symbol_errors = None
+        if reference is not None:
+            symbol_errors = np.count_nonzero(decisions[:, training:] != reference[:, training:],
+                                             axis=-1).reshape(runs)
+        if dac is not None:
+            decisions = decisions * dac.symbol_step + dac.possible_symbols.start
+        return EqualizerResult(output.reshape(runs + (count,)),
+                               decisions.reshape(runs + (count,)),
+                               ffe.reshape(runs + (self.ffe_taps,)),
+                               dfe.reshape(runs + (self.dfe_taps,)),
+                               mse.reshape(runs + (blocks,)),
+                               symbol_errors)
+
+    def _train(self, windows: np.ndarray, target: np.ndarray):
+        """Least-squares feed-forward and feedback taps of every run
+
+        :param windows: feed-forward windows of training symbols, (runs, symbols, taps)
+        :param target: transmitted levels of training symbols, (runs, symbols)
+        """
+        past = np.pad(target, ((0, 0), (self.dfe_taps, 0)))
+        feedback = sliding_window_view(past, self.dfe_taps, axis=-1)[:, :target.shape[-1], ::-1]
+        matrix = np.concatenate((windows, -feedback), axis=-1)
+        gram = np.einsum('rni,rnj->rij', matrix, matrix)
+        # ridge keeps taps finite for silent or constant input and small where
+        # feed-forward and feedback taps are interchangeable, e.g. on channel without
+        # interference, large cancelling taps would slow down convergence of decisions
+        ridge = 1e-4 * np.trace(gram, axis1=1, axis2=2)[:, None, None] / len(gram[0]) + 1e-30
+        gram = gram + ridge * np.eye(gram.shape[-1])
+        taps = np.linalg.solve(gram, np.einsum('rni,rn->ri', matrix, target)[..., None])[..., 0]
+        return taps[:, :self.ffe_taps].copy(), taps[:, self.ffe_taps:].copy()
+
+    def _decide(self, feed_forward: np.ndarray, history: np.ndarray, dfe: np.ndarray,
+                reference: Optional[np.ndarray], known: np.ndarray):
+        """Decisions of block with feedback of previous decisions
+
+        Feedback is recomputed from decisions of the previous iteration until they
+        stop changing. Decision k only depends on earlier ones, so after iteration i
+        at least the first i decisions are final and the loop ends within block
+        length iterations.
+
+        :return: decided level indexes, feedback windows and equalized output
+        """
+        levels = self.levels
+        thresholds = (levels[1:] + levels[:-1]) / 2
+        # transmitted symbols replace decisions during training
+        fixed = reference if reference is not None and known.any() else None
+        decided = np.searchsorted(thresholds, feed_forward)
+        if fixed is not None:
+            decided = np.where(known, fixed, decided)
+        length = feed_forward.shape[-1]
+        taps = self.dfe_taps
+        if not taps:
+            return decided, np.zeros(feed_forward.shape + (0,)), feed_forward
+        past = np.concatenate((history, levels[decided]), axis=1)
+        for _ in range(length + 1):
+            # d[k-1-j] of all k is past[taps-1-j:taps-1-j+length]
+            equalized = feed_forward.copy()
+            for tap in range(taps):
+                equalized -= dfe[:, tap, None] * past[:, taps - 1 - tap:taps - 1 - tap + length]
+            new = np.searchsorted(thresholds, equalized)
+            if fixed is not None:
+                new = np.where(known, fixed, new)
+            if not (new != decided).any():
+                break
+            decided = new
+            past[:, taps:] = levels[decided]
+        # feedback[k] = previous levels d[k-1], ..., d[k-taps]
+        feedback = sliding_window_view(past, taps, axis=-1)[:, :length, ::-1]
+        return decided, feedback, equalized
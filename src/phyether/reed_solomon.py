@@ -1,10 +1,11 @@
 from typing import Union, cast, overload, Tuple, List
 
-from galois import Array, GF, FieldArray, Poly, ReedSolomon, lagrange_poly
+from galois import Array, FieldArray, Poly, ReedSolomon, lagrange_poly
 
 import numpy as np
 from numpy.linalg import LinAlgError
 
+from phyether import gf_tables
 from phyether.util import iterable_to_string, string_to_bytes, string_to_list
 
 
@@ -21,7 +22,7 @@ class RS_Original:
             raise ValueError(f"Values must fulfill: {message_length} < {codeword_length} < {field_order}")
         self.codeword_length = codeword_length
         self.message_length = message_length
-        self.gf = GF(field_order)
+        self.gf = gf_tables.field(field_order)
         self.parity_evaluation_points = [
             int(self.gf.primitive_element ** power)
             for power in range(self.message_length, self.codeword_length)
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from PySpice.Probe.WaveForm import TransientAnalysis
+
+from phyether.spice_session import transient_from_arrays
+from phyether.util import default_cache_directory
+
+
+class ResultCache:
+    """Content-addressed cache of simulation results on disk
+
+    Results are stored as compressed .npz files named by hash of everything that
+    influences simulation. Directory size is bounded, least recently used results
+    are removed first.
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None,
+                 max_size: int = 512 * 2**20) -> None:
+        """
+        :param directory: cache directory, defaults to :func:`default_cache_directory`
+        :param max_size: maximum size of cache directory in bytes, defaults to 512 MiB
+        """
+        self.directory = Path(directory) if directory is not None else default_cache_directory()
+        self.max_size = max_size
+
+    @staticmethod
+    def key(netlist: str,
+            signals: Mapping[str, Tuple[np.ndarray, np.ndarray]],
+            settings: Mapping[str, Any],
+            ngspice_version: Optional[int]) -> str:
+        """Hash identifying simulation
+
+        :param netlist: netlist loaded into ngspice
+        :param signals: PWL data of external sources
+        :param settings: analysis settings and parameter alterations
+        :param ngspice_version: version of ngspice library
+        :return: hexadecimal sha256 digest
+        """
+        digest = hashlib.sha256()
+        digest.update(netlist.encode())
+        digest.update(json.dumps(settings, sort_keys=True, default=float).encode())
+        digest.update(str(ngspice_version).encode())
+        for name in sorted(signals):
+            times, voltages = signals[name]
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(times, dtype=float).tobytes())
+            digest.update(np.ascontiguousarray(voltages, dtype=float).tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f'{key}.npz'
+
+    def get(self, key: str) -> Optional[TransientAnalysis]:
+        """Load cached result
+
+        :param key: key from :meth:`key`
+        :return: cached analysis or None if it isn't in cache
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                time = data['time']
+                nodes = {name: data[name] for name in data.files if name != 'time'}
+            # access time used for LRU eviction
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return transient_from_arrays(time, nodes)
+
+    def put(self, key: str, analysis: TransientAnalysis) -> None:
+        """Store node voltages of analysis and evict old results if cache is too big
+
+        :param key: key from :meth:`key`
+        :param analysis: simulation result
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        nodes = {str(name): node.as_ndarray() for name, node in analysis.nodes.items()}
+        file_descriptor, temp_name = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                np.savez_compressed(file, time=analysis.time.as_ndarray(), **nodes)
+            os.replace(temp_name, self._path(key))
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.directory.glob('*.npz'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total_size -= size
+
+    def clear(self) -> None:
+        """Remove all cached results"""
+        for path in self.directory.glob('*.npz'):
+            path.unlink()
+
+
+_default_cache: Optional[ResultCache] = None
+
+
+def default_cache() -> ResultCache:
+    """Cache in :func:`default_cache_directory` shared in this process"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
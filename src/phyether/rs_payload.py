@@ -0,0 +1,109 @@
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from phyether.reed_solomon import RS_Original
+
+
+def bytes_to_symbols(data: bytes, bits: int) -> np.ndarray:
+    """Split bytes into symbols of bits bits, last symbol is padded with zero bits
+
+    :param data: payload
+    :param bits: bits per symbol, degree of Galois field
+    :return: symbols in order of bitstream, most significant bit first
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if bits == 8:
+        return raw.astype(np.int64)
+    bitstream = np.unpackbits(raw)
+    bitstream = np.pad(bitstream, (0, -len(bitstream) % bits))
+    weights = 1 << np.arange(bits - 1, -1, -1, dtype=np.int64)
+    return bitstream.reshape(-1, bits).astype(np.int64) @ weights
+
+
+def symbols_to_bytes(symbols: np.ndarray, bits: int, length: int) -> bytes:
+    """Inverse of :func:`bytes_to_symbols`
+
+    :param symbols: symbols
+    :param bits: bits per symbol
+    :param length: length of payload in bytes, padding is dropped
+    """
+    symbols = np.asarray(symbols, dtype=np.int64)
+    if bits == 8:
+        return symbols.astype(np.uint8).tobytes()[:length]
+    bitstream = (symbols[:, None] >> np.arange(bits - 1, -1, -1)) & 1
+    return np.packbits(bitstream.astype(np.uint8).ravel()).tobytes()[:length]
+
+
+class PayloadBatch(NamedTuple):
+    first: int
+    """index of first codeword of batch"""
+    codewords: np.ndarray
+    """transmitted codewords with injected errors, one per row"""
+    decoded: np.ndarray
+    """decoded messages, one per row"""
+    errors: np.ndarray
+    """corrected symbols of every codeword, -1 if codeword couldn't be decoded"""
+
+
+class PayloadCodec:
+    """Encodes payloads of any length as consecutive codewords of systematic RS code
+
+    Payload is split into messages of k symbols, the last one is padded with
+    zeros. Codewords are encoded and decoded in batches by galois.
+    """
+
+    def __init__(self, reed_solomon: RS_Original) -> None:
+        if not reed_solomon.rs.is_systematic:
+            raise ValueError("Payloads can be split only into codewords of systematic code")
+        self.reed_solomon = reed_solomon
+        self.n = reed_solomon.codeword_length
+        self.k = reed_solomon.message_length
+
+    def codewords(self, symbols: int) -> int:
+        """Number of codewords needed for payload of symbols symbols"""
+        return max(-(-symbols // self.k), 1)
+
+    def split(self, symbols: np.ndarray) -> np.ndarray:
+        """Messages of k symbols, one per row"""
+        messages = np.zeros((self.codewords(len(symbols)), self.k), dtype=np.int64)
+        messages.ravel()[:len(symbols)] = symbols
+        return messages
+
+    def encode(self, messages: np.ndarray) -> np.ndarray:
+        return np.asarray(self.reed_solomon.rs.encode(self.reed_solomon.gf(messages)))
+
+    def decode(self, codewords: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Decoded messages and number of corrected symbols in every codeword"""
+        decoded, errors = self.reed_solomon.rs.decode(self.reed_solomon.gf(codewords),
+                                                      errors=True)
+        return np.asarray(decoded), np.asarray(errors)
+
+    def add_errors(self, codewords: np.ndarray, errors_per_codeword: int,
+                   rng: np.random.Generator) -> np.ndarray:
+        """Copy of codewords with symbol errors at random positions"""
+        codewords = codewords.copy()
+        if errors_per_codeword <= 0:
+            return codewords
+        rows = np.arange(len(codewords))[:, None]
+        positions = rng.random(codewords.shape).argsort(axis=1)[:, :errors_per_codeword]
+        values = rng.integers(1, self.reed_solomon.gf.order, positions.shape)
+        codewords[rows, positions] ^= values.astype(codewords.dtype)
+        return codewords
+
+    def run(self, symbols: np.ndarray, batch_size: int = 256, errors_per_codeword: int = 0,
+            seed: Optional[int] = None) -> Iterator[PayloadBatch]:
+        """Encode, corrupt and decode payload batch by batch
+
+        :param symbols: payload symbols
+        :param batch_size: codewords per batch
+        :param errors_per_codeword: symbol errors injected into every codeword
+        :param seed: seed of error positions and values
+        """
+        rng = np.random.default_rng(seed)
+        messages = self.split(symbols)
+        for first in range(0, len(messages), batch_size):
+            codewords = self.add_errors(self.encode(messages[first:first + batch_size]),
+                                        errors_per_codeword, rng)
+            decoded, errors = self.decode(codewords)
+            yield PayloadBatch(first, codewords, decoded, errors)
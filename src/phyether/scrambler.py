@@ -0,0 +1,115 @@
+"""Self-synchronizing scrambler of Ethernet PCS with polynomial 1 + x^39 + x^58
+
+Scrambled bit s[i] = d[i] ^ s[i - 39] ^ s[i - 58], descrambled d[i] = s[i] ^
+s[i - 39] ^ s[i - 58]. Bits are processed as Python integers, whose shifts and xors
+run over whole machine words. Descrambling is three shifted xors. Scrambling is
+division by the polynomial G = 1 + P, P = x^39 + x^58, done as multiplication by
+(1 + P)(1 + P^2)(1 + P^4)... where P^(2^k) = x^(39 * 2^k) + x^(58 * 2^k) over GF(2),
+so n bits take about log2(n / 39) shifted xors instead of n steps.
+"""
+from abc import ABC, abstractmethod
+from typing import Tuple, TypeVar, Union
+
+import numpy as np
+from bitarray import bitarray
+from bitarray.util import int2ba
+
+TAP = 39
+ORDER = 58
+STATE_MASK = (1 << ORDER) - 1
+
+Bits = TypeVar('Bits', bytes, bytearray, bitarray, np.ndarray)
+
+
+def _to_int(data: Union[bytes, bytearray, bitarray, np.ndarray]) -> Tuple[int, int]:
+    """Bits as integer, the first bit most significant, and number of bits"""
+    if isinstance(data, bitarray):
+        data = bitarray(data, endian='big')
+        padding = -len(data) % 8
+        return int.from_bytes(data.tobytes(), 'big') >> padding, len(data)
+    raw = data.tobytes() if isinstance(data, np.ndarray) else bytes(data)
+    return int.from_bytes(raw, 'big'), len(raw) * 8
+
+
+def _from_int(value: int, length: int, like: Bits) -> Bits:
+    """Integer of :func:`_to_int` back to type of like"""
+    if isinstance(like, bitarray):
+        return int2ba(value, length, endian='big') if length else bitarray(endian='big')
+    raw = value.to_bytes(length // 8, 'big')
+    if isinstance(like, np.ndarray):
+        packed: np.ndarray = np.frombuffer(raw, dtype=np.uint8).copy()
+        return packed
+    return type(like)(raw)
+
+
+class _SelfSynchronizing(ABC):
+    # bits processed at once, integers of a chunk stay in cache, longer chunks would
+    # also need more shifted xors per bit
+    CHUNK = 1 << 18
+
+    def __init__(self, state: int = STATE_MASK) -> None:
+        """
+        :param state: last 58 scrambled bits, the last one least significant,
+            defaults to all ones
+        """
+        self.state = state & STATE_MASK
+
+    def _process(self, data: Bits) -> Bits:
+        if isinstance(data, np.ndarray) and data.dtype != np.uint8:
+            raise ValueError("NumPy bits must be packed into uint8, see numpy.packbits")
+        if len(data) * (1 if isinstance(data, bitarray) else 8) <= self.CHUNK:
+            value, length = _to_int(data)
+            return _from_int(self._chunk(value, length), length, data)
+        step = self.CHUNK if isinstance(data, bitarray) else self.CHUNK // 8
+        chunks = [self._process(data[start:start + step]) for start in range(0, len(data), step)]
+        if isinstance(data, bitarray):
+            joined = bitarray(endian='big')
+            for chunk in chunks:
+                joined += chunk
+            return joined
+        if isinstance(data, np.ndarray):
+            return np.concatenate(chunks)
+        return type(data)(b''.join(chunks))
+
+    @abstractmethod
+    def _chunk(self, value: int, length: int) -> int:
+        """Process bits of value, the first one most significant, and update state"""
+
+
+class Scrambler(_SelfSynchronizing):
+    """Scrambler keeping its state between calls, so consecutive calls scramble one stream"""
+
+    def scramble(self, data: Bits) -> Bits:
+        """Scramble bits
+
+        :param data: bytes, bitarray or NumPy bits packed into uint8
+        :return: scrambled bits of the same type and length, bitarrays are big-endian
+        """
+        return self._process(data)
+
+    def _chunk(self, value: int, length: int) -> int:
+        # state is reproduced by dividing these bits with zero initial state, so it's
+        # prepended to data and division runs over both
+        history = self.state ^ (self.state >> TAP)
+        scrambled = (history << length) | value
+        total = length + ORDER
+        short, long = TAP, ORDER
+        while short < total:
+            scrambled ^= (scrambled >> short) ^ (scrambled >> long)
+            short <<= 1
+            long <<= 1
+        self.state = scrambled & STATE_MASK
+        return scrambled & ((1 << length) - 1)
+
+
+class Descrambler(_SelfSynchronizing):
+    """Descrambler, synchronized after 58 bits whatever its initial state"""
+
+    def descramble(self, data: Bits) -> Bits:
+        """Descramble bits, see :meth:`Scrambler.scramble`"""
+        return self._process(data)
+
+    def _chunk(self, value: int, length: int) -> int:
+        scrambled = (self.state << length) | value
+        self.state = scrambled & STATE_MASK
+        return (scrambled ^ (scrambled >> TAP) ^ (scrambled >> ORDER)) & ((1 << length) - 1)
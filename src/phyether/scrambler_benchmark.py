@@ -0,0 +1,88 @@
+import time
+from typing import Any, Callable, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+from bitarray import bitarray
+
+from phyether.scrambler import ORDER, STATE_MASK, TAP, Descrambler, Scrambler
+
+
+class ScramblerBenchmarkResult(NamedTuple):
+    implementation: str
+    """'bitwise' reference loop or word-parallel scrambler on 'bytes', 'bitarray' or 'numpy'"""
+    bits: int
+    scramble_rate: float
+    """scrambled bits per second"""
+    descramble_rate: float
+    """descrambled bits per second"""
+
+
+def _scramble_bitwise(bits: bitarray, state: int = STATE_MASK) -> bitarray:
+    """Reference scrambler, one bit per step"""
+    history = [(state >> (ORDER - 1 - index)) & 1 for index in range(ORDER)]
+    scrambled = bitarray(endian='big')
+    for bit in bits:
+        bit ^= history[-TAP] ^ history[-ORDER]
+        history.append(bit)
+        scrambled.append(bit)
+    return scrambled
+
+
+def _descramble_bitwise(bits: bitarray, state: int = STATE_MASK) -> bitarray:
+    """Reference descrambler, one bit per step"""
+    history = [(state >> (ORDER - 1 - index)) & 1 for index in range(ORDER)]
+    history.extend(bits)
+    return bitarray([bit ^ history[index + ORDER - TAP] ^ history[index]
+                     for index, bit in enumerate(bits)], endian='big')
+
+
+def _rate(function: Callable, data, bits: int, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(data)
+        best = min(best, time.perf_counter() - start)
+    return bits / best
+
+
+def benchmark_scrambler(sizes: Sequence[int] = (1 << 13, 1 << 17, 1 << 21, 1 << 25),
+                        bitwise_bits: int = 1 << 17,
+                        repeat: int = 3,
+                        seed: int = 0) -> List[ScramblerBenchmarkResult]:
+    """Throughput of word-parallel scrambler and descrambler against bit by bit loop
+
+    Every run starts at the same state, outputs of all implementations are checked
+    against each other.
+
+    :param sizes: bytes of random data
+    :param bitwise_bits: bits of reference loop, it's slow for large sizes
+    :param repeat: runs of every measurement, the fastest one is reported
+    :param seed: seed of data, defaults to 0
+    :return: result of reference loop followed by results of every size and container
+    """
+    rng = np.random.default_rng(seed)
+    reference = bitarray(rng.integers(0, 2, bitwise_bits).tolist(), endian='big')
+    expected = _scramble_bitwise(reference)
+    if Scrambler().scramble(reference) != expected:
+        raise AssertionError("Word-parallel scrambler differs from reference")
+    results = [ScramblerBenchmarkResult(
+        'bitwise', bitwise_bits,
+        _rate(_scramble_bitwise, reference, bitwise_bits, repeat),
+        _rate(_descramble_bitwise, expected, bitwise_bits, repeat))]
+
+    for size in sizes:
+        data = rng.bytes(size)
+        packed = np.frombuffer(data, dtype=np.uint8)
+        bits = bitarray(endian='big')
+        bits.frombytes(data)
+        containers: List[Tuple[str, Any]] = [('bytes', data), ('bitarray', bits),
+                                             ('numpy', packed)]
+        for name, container in containers:
+            scrambled = Scrambler().scramble(container)
+            if bytes(Descrambler().descramble(scrambled)) != data:
+                raise AssertionError(f"Descrambled {name} differ from data")
+            results.append(ScramblerBenchmarkResult(
+                name, size * 8,
+                _rate(Scrambler().scramble, container, size * 8, repeat),
+                _rate(Descrambler().descramble, scrambled, size * 8, repeat)))
+    return results
@@ -0,0 +1,204 @@
+"""Twisted-pair simulations in a pool of processes
+
+ngspice shared library is a singleton, so simulations run concurrently only in
+separate processes. Every worker process keeps its pairs between jobs, so that
+their circuits stay loaded like in single-process GUI simulations. Parent and
+worker exchange progress, cancellation and partial results through files in job
+directory, see :class:`JobControl` and :class:`phyether.streaming.StreamedResult`.
+"""
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from time import sleep
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from PySpice.Probe.WaveForm import TransientAnalysis
+from PySpice.Spice.NgSpice.Shared import NgSpiceShared
+
+from phyether.probe import Probe
+from phyether.result_cache import ResultCache, default_cache
+from phyether.twisted_pair import TwistedPair
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+# pairs of worker process, key -> pair
+_pairs: Dict[str, TwistedPair] = {}
+
+
+def default_workers() -> int:
+    """Number of worker processes, one core is left to GUI"""
+    return max((os.cpu_count() or 2) - 1, 1)
+
+
+def _init_worker(library_path: Optional[str]) -> None:
+    if library_path is not None:
+        NgSpiceShared.LIBRARY_PATH = library_path
+
+
+def simulation_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared pool of simulation processes, recreated when number of workers changes
+
+    :param workers: maximum number of concurrent simulations
+    """
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        # spawn: forked child would inherit loaded ngspice library of parent process
+        _pool = ProcessPoolExecutor(max_workers=workers,
+                                    mp_context=multiprocessing.get_context('spawn'),
+                                    initializer=_init_worker,
+                                    initargs=(NgSpiceShared.LIBRARY_PATH,))
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop worker processes, e.g. after one of them crashed"""
+    global _pool
+    if _pool is not None:
+        if sys.version_info >= (3, 9):
+            _pool.shutdown(wait=False, cancel_futures=True)
+        else:
+            # pending simulations of Python 3.8 pool run to completion in background
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def reuse_pair(pairs: Dict[str, TwistedPair], key: str, init_args: Mapping[str, Any]) -> TwistedPair:
+    """Pair built with init_args, circuit of previous pair with the same key is reused
+
+    :param pairs: key -> pair of previous simulations, updated
+    :param key: e.g. index of simulation form
+    :param init_args: arguments of :class:`TwistedPair`
+    """
+    twisted_pair = pairs.get(key)
+    if (twisted_pair is None
+            or twisted_pair.transmission_type != init_args['transmission_type']):
+        twisted_pair = TwistedPair(**init_args)
+        pairs[key] = twisted_pair
+    else:
+        twisted_pair.dac = init_args['dac']
+        twisted_pair.alter(**init_args)
+    return twisted_pair
+
+
+class JobControl:
+    """Progress, cancel request and transmission delay of job shared through file"""
+
+    PROGRESS, CANCELLED, TRANSMISSION_DELAY = range(3)
+
+    def __init__(self, directory: Union[str, Path], create: bool = False) -> None:
+        """
+        :param directory: job directory
+        :param create: create directory and zeroed file, done by parent before submit
+        """
+        path = Path(directory) / 'control.f64'
+        if create:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self._values = np.memmap(path, dtype=np.float64, mode='w+' if create else 'r+',
+                                 shape=(3,))
+
+    @property
+    def progress(self) -> float:
+        return float(self._values[self.PROGRESS])
+
+    @progress.setter
+    def progress(self, progress: float) -> None:
+        self._values[self.PROGRESS] = progress
+
+    @property
+    def cancelled(self) -> bool:
+        return bool(self._values[self.CANCELLED])
+
+    def cancel(self) -> None:
+        self._values[self.CANCELLED] = 1
+
+    @property
+    def transmission_delay(self) -> float:
+        return float(self._values[self.TRANSMISSION_DELAY])
+
+    @transmission_delay.setter
+    def transmission_delay(self, delay: float) -> None:
+        self._values[self.TRANSMISSION_DELAY] = delay
+
+
+def run_pair(twisted_pair: TwistedPair, symbols: List[int], run_args: Mapping[str, Any],
+             probe: Probe, cache: Optional[ResultCache], partial_results: str, *,
+             cancelled: Callable[[], bool],
+             progress: Callable[[float], None],
+             partial: Optional[Callable[[Tuple[np.ndarray, Dict[str, np.ndarray]]], None]] = None,
+             poll_interval: float = 0.2) -> Optional[TransientAnalysis]:
+    """Simulate pair reporting progress, shared by GUI thread and worker processes
+
+    Behavioural lines are simulated at once, other lines run in background and are
+    polled until they finish or are cancelled.
+
+    :param twisted_pair: simulated pair
+    :param symbols: symbols to send
+    :param run_args: arguments of :meth:`TwistedPair.start_simulation`
+    :param probe: stored nodes and their resolution
+    :param cache: cache of results, None disables it
+    :param partial_results: directory which partial results are streamed into
+    :param cancelled: polled, returns True when simulation should stop
+    :param progress: called with progress from 0 to 1
+    :param partial: called with time and node values streamed so far
+    :param poll_interval: seconds between polls
+    :return: analysis, None if cancelled
+    """
+    if twisted_pair.line_model is not None and twisted_pair.line_model.behavioural:
+        analysis = twisted_pair.simulate(symbols, **run_args, probe=probe, cache=cache)
+    else:
+        run = twisted_pair.start_simulation(symbols, **run_args, probe=probe, cache=cache,
+                                            partial_results=partial_results)
+        while run.running:
+            if cancelled():
+                run.cancel()
+                return None
+            progress(run.progress)
+            if partial is not None:
+                streamed = run.partial()
+                if streamed is not None and len(streamed[0]):
+                    partial(streamed)
+            sleep(poll_interval)
+        analysis = run.wait()
+    progress(1.0)
+    return analysis
+
+
+def simulate_job(key: str, init_args: Mapping[str, Any], run_args: Mapping[str, Any],
+                 symbols: List[int], probe: Probe, use_cache: bool, directory: str,
+                 poll_interval: float = 0.2) -> Optional[
+                     Tuple[np.ndarray, Dict[str, np.ndarray], float]]:
+    """Simulate pair in worker process, run in :func:`simulation_pool`
+
+    :param key: key of pair reused by later jobs, see :func:`reuse_pair`
+    :param init_args: arguments of :class:`TwistedPair`
+    :param run_args: arguments of :meth:`TwistedPair.start_simulation`
+    :param symbols: symbols to send
+    :param probe: stored nodes and their resolution
+    :param use_cache: use :func:`default_cache`
+    :param directory: job directory created with :class:`JobControl`, partial results
+        are streamed into it
+    :param poll_interval: seconds between progress updates and cancel checks
+    :return: time, node voltages and transmission delay of pair, None if cancelled
+    """
+    control = JobControl(directory)
+    twisted_pair = reuse_pair(_pairs, key, init_args)
+    control.transmission_delay = float(twisted_pair.transmission_delay)
+
+    def set_progress(progress: float) -> None:
+        control.progress = progress
+
+    analysis = run_pair(twisted_pair, symbols, run_args, probe,
+                        default_cache() if use_cache else None, directory,
+                        cancelled=lambda: control.cancelled, progress=set_progress,
+                        poll_interval=poll_interval)
+    if analysis is None:
+        return None
+    return (np.asarray(analysis.time, dtype=float),
+            {str(name): node.as_ndarray() for name, node in analysis.nodes.items()},
+            float(twisted_pair.transmission_delay))
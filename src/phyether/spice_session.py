@@ -0,0 +1,459 @@
+from time import monotonic, sleep
+from typing import (TYPE_CHECKING, Callable, Dict, Iterable, List, Mapping, Optional, Sequence,
+                    Tuple, Union, cast)
+
+import numpy as np
+
+from PySpice.Probe.WaveForm import TransientAnalysis, WaveForm
+from PySpice.Spice.Netlist import Circuit
+from PySpice.Spice.NgSpice.Shared import NgSpiceShared, ffi, ffi_string_utf8
+from PySpice.Unit import u_s, u_V
+
+if TYPE_CHECKING:
+    from phyether.result_cache import ResultCache
+    from phyether.streaming import StreamedResult
+
+
+class NgSpice(NgSpiceShared):
+    """ngspice shared library instance used by simulation sessions
+
+    Voltage sources defined as ``dc 0 external`` get their value from PWL tables
+    registered in :attr:`external_sources` instead of from the netlist.
+    Values of vectors at every time point are passed to :attr:`data_listener`,
+    time of the last computed point is kept in :attr:`simulation_time`.
+    """
+
+    def __init__(self, ngspice_id=0, send_data=True, verbose=False):
+        self.external_sources: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.loaded_session: Optional["SimulationSession"] = None
+        self.data_listener: Optional["StreamedResult"] = None
+        self.vector_names: List[str] = []
+        self.simulation_time = 0.0
+        self._time_index: Optional[int] = None
+        super().__init__(ngspice_id=ngspice_id, send_data=send_data, verbose=verbose)
+
+    def send_init_data(self, data, ngspice_id):
+        self.vector_names = [ffi_string_utf8(data.vecs[index].vecname)
+                             for index in range(data.veccount)]
+        names = [name.lower() for name in self.vector_names]
+        self._time_index = names.index('time') if 'time' in names else None
+        if self.data_listener is not None:
+            self.data_listener.start(self.vector_names)
+        return 0
+
+    @staticmethod
+    def _send_data(data, number_of_vectors, ngspice_id, user_data):
+        # replaces PySpice callback, which builds dict of complex values at every time point
+        self = ffi.from_handle(user_data)
+        vectors = data.vecsa
+        if self._time_index is not None:
+            self.simulation_time = vectors[self._time_index].creal
+        if self.data_listener is not None:
+            self.data_listener.append([vectors[index].creal
+                                       for index in range(number_of_vectors)])
+        return 0
+
+    def get_vsrc_data(self, voltage, time, node, ngspice_id):
+        times, values = self.external_sources[node.lower()]
+        voltage[0] = np.interp(time, times, values)
+        return 0
+
+    @property
+    def running(self) -> bool:
+        """True while command started with ``bg_`` prefix runs in background thread"""
+        return bool(self._ngspice_shared.ngSpice_running())
+
+
+def get_ngspice() -> NgSpice:
+    """Get ngspice instance shared by all sessions in this process
+
+    PySpice can load libngspice only once per process, simulators created with
+    ``simulator="ngspice-shared"`` will reuse the same instance.
+    """
+    instance = NgSpiceShared._instances.get(0)
+    if instance is None:
+        instance = NgSpice()
+        NgSpiceShared._instances[0] = instance
+    elif not isinstance(instance, NgSpice):
+        raise RuntimeError("ngspice was already initialized outside of phyether")
+    return instance
+
+
+def transient_from_arrays(time: np.ndarray,
+                          nodes: Mapping[str, np.ndarray]) -> TransientAnalysis:
+    """Create transient analysis from time and node voltage arrays
+
+    :param time: simulation time in seconds
+    :param nodes: node name -> voltages at each time
+    """
+    time_waveform = WaveForm.from_unit_values('time', u_s(time))
+    return TransientAnalysis(
+        simulation=None,
+        time=time_waveform,
+        nodes=[WaveForm.from_unit_values(name, u_V(values), abscissa=time_waveform)
+               for name, values in nodes.items()],
+        branches=[],
+        internal_parameters=[])
+
+
+def resample_analysis(analysis: TransientAnalysis, step_time: float,
+                      nodes: Optional[Iterable[str]] = None) -> TransientAnalysis:
+    """Interpolate node voltages to uniform time grid
+
+    :param analysis: simulation result
+    :param step_time: step of time grid in seconds
+    :param nodes: nodes to keep, defaults to all nodes
+    """
+    time = analysis.time.as_ndarray()
+    grid = time[0] + np.arange(int((time[-1] - time[0]) / step_time) + 1) * step_time
+    names = list(nodes) if nodes is not None else list(analysis.nodes)
+    return transient_from_arrays(
+        grid, {name: np.interp(grid, time, analysis[name].as_ndarray()) for name in names})
+
+
+class SimulationSession:
+    """Circuit loaded into ngspice once and re-simulated with changed parameters
+
+    Signals are sent through external voltage sources so new data only replaces
+    PWL tables kept in Python. Devices and models are changed with ``alter`` and
+    ``altermod`` commands, netlist is generated and parsed again only if other
+    session was loaded into ngspice in the meantime.
+    """
+
+    def __init__(self, circuit: Circuit) -> None:
+        """
+        :param circuit: circuit to simulate, signal sources must be added with
+            :meth:`add_signal_source`
+        """
+        self.circuit = circuit
+        self.ngspice = get_ngspice()
+        self.simulator = circuit.simulator(temperature=25,
+                                           nominal_temperature=25,
+                                           simulator="ngspice-shared",
+                                           ngspice_shared=self.ngspice)
+        self.signals: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.device_alterations: Dict[str, Dict[str, float]] = {}
+        self.model_alterations: Dict[str, Dict[str, float]] = {}
+        self._netlist: Optional[str] = None
+
+    @staticmethod
+    def add_signal_source(circuit: Circuit, name: str, positive: str, negative: str) -> None:
+        """Add voltage source driven by PWL data set with :meth:`set_signal`
+
+        :param circuit: circuit to add source to
+        :param name: name of voltage source without 'V' prefix
+        :param positive: positive node
+        :param negative: negative node
+        """
+        circuit.V(name, positive, negative, raw_spice='dc 0 external')
+
+    @property
+    def netlist(self) -> str:
+        if self._netlist is None:
+            self._netlist = str(self.simulator)
+        return self._netlist
+
+    def set_signal(self, name: str, times: np.ndarray, voltages: np.ndarray) -> None:
+        """Set PWL data of signal source
+
+        :param name: name of voltage source without 'V' prefix
+        :param times: PWL times in seconds
+        :param voltages: PWL voltages
+        """
+        self.signals[f'v{name}'.lower()] = (times, voltages)
+
+    def alter(self, device: str, **parameters: float) -> None:
+        """Change device parameters, e.g. alter('voffset', dc=5)"""
+        self.device_alterations.setdefault(device.lower(), {}).update(parameters)
+        if self.ngspice.loaded_session is self:
+            self.ngspice.alter_device(device, **parameters)
+
+    def alter_model(self, model: str, **parameters: float) -> None:
+        """Change model parameters, e.g. alter_model('ltra_pair', len=10)"""
+        self.model_alterations.setdefault(model.lower(), {}).update(parameters)
+        if self.ngspice.loaded_session is self:
+            self.ngspice.alter_model(model, **parameters)
+
+    def _load(self) -> None:
+        if self.ngspice.loaded_session is self:
+            return
+        if self.ngspice.loaded_session is not None:
+            self.ngspice.remove_circuit()
+        self.ngspice.loaded_session = None
+        self.ngspice.load_circuit(self.netlist)
+        self.ngspice.loaded_session = self
+        for device, parameters in self.device_alterations.items():
+            self.ngspice.alter_device(device, **parameters)
+        for model, parameters in self.model_alterations.items():
+            self.ngspice.alter_model(model, **parameters)
+
+    def transient(self, step_time: float, end_time: float, start_time: float = 0,
+                  max_time: Optional[float] = None,
+                  options: Optional[Mapping[str, Union[float, bool]]] = None,
+                  save: Optional[Sequence[str]] = None,
+                  resample_step: Optional[float] = None,
+                  cache: Optional["ResultCache"] = None) -> TransientAnalysis:
+        """Run transient analysis of loaded circuit
+
+        :param step_time: printing increment in seconds
+        :param end_time: final time in seconds
+        :param start_time: results before start_time aren't stored, defaults to 0
+        :param max_time: maximum step size in seconds, defaults to step_time
+            because ngspice doesn't see breakpoints of external sources
+        :param options: ngspice options set before analysis, True sets and False clears
+            flag option, options stay set in ngspice for following analyses, defaults
+            to None
+        :param save: nodes saved by ngspice, defaults to all nodes
+        :param resample_step: interpolate results to uniform grid with this step in seconds,
+            defaults to None, time points chosen by ngspice
+        :param cache: cache consulted before running ngspice, defaults to None
+        :return: Transient analysis simulation
+        """
+        if max_time is None:
+            max_time = step_time
+        key = None
+        if cache is not None:
+            key = self._cache_key(cache, step_time, end_time, start_time, max_time,
+                                  options, save, resample_step)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        self._run(step_time, end_time, start_time, max_time, options, save)
+        analysis = self._collect(save, resample_step)
+        if cache is not None and key is not None:
+            cache.put(key, analysis)
+        return analysis
+
+    def start_transient(self, step_time: float, end_time: float, start_time: float = 0,
+                        max_time: Optional[float] = None,
+                        options: Optional[Mapping[str, Union[float, bool]]] = None,
+                        save: Optional[Sequence[str]] = None,
+                        resample_step: Optional[float] = None,
+                        cache: Optional["ResultCache"] = None,
+                        stream: Optional["StreamedResult"] = None,
+                        finish: Optional[Callable[[TransientAnalysis], TransientAnalysis]] = None
+                        ) -> "BackgroundRun":
+        """Start transient analysis in ngspice background thread and return immediately
+
+        Parameters are the same as in :meth:`transient`. Only one analysis can run at
+        a time, other sessions can't be used until it's finished or cancelled.
+
+        :param stream: result receiving time points while analysis runs, its nodes
+            must be saved, defaults to None
+        :param finish: post-processing of result, applied after it's stored in cache
+        :return: handle reporting progress, cancelling and collecting the result
+        """
+        if self.ngspice.running:
+            raise RuntimeError("ngspice is already running a simulation")
+        if max_time is None:
+            max_time = step_time
+        key = None
+        if cache is not None:
+            key = self._cache_key(cache, step_time, end_time, start_time, max_time,
+                                  options, save, resample_step)
+            cached = cache.get(key)
+            if cached is not None:
+                return BackgroundRun(self, end_time, finish=finish, analysis=cached)
+        run = BackgroundRun(self, end_time, save=save, resample_step=resample_step,
+                            cache=cache, key=key, stream=stream, finish=finish)
+        self._run(step_time, end_time, start_time, max_time, options, save,
+                  listener=stream, background=True)
+        return run
+
+    def _cache_key(self, cache: "ResultCache", step_time: float, end_time: float,
+                   start_time: float, max_time: float,
+                   options: Optional[Mapping[str, Union[float, bool]]],
+                   save: Optional[Sequence[str]],
+                   resample_step: Optional[float]) -> str:
+        return cache.key(self.netlist, self.signals,
+                         {'tran': [float(step_time), float(end_time),
+                                   float(start_time), float(max_time)],
+                          'options': dict(options or {}),
+                          'save': list(save) if save is not None else None,
+                          'resample': resample_step,
+                          'alter': self.device_alterations,
+                          'altermod': self.model_alterations},
+                         self.ngspice.ngspice_version)
+
+    def _collect(self, save: Optional[Sequence[str]],
+                 resample_step: Optional[float]) -> TransientAnalysis:
+        plot_name = self.ngspice.last_plot
+        if plot_name == 'const':
+            raise NameError('Simulation failed')
+        analysis = cast(TransientAnalysis,
+                        self.ngspice.plot(self.simulator, plot_name).to_analysis())
+        if resample_step is not None:
+            analysis = resample_analysis(analysis, resample_step, save)
+        return analysis
+
+    def _run(self, step_time: float, end_time: float, start_time: float, max_time: float,
+             options: Optional[Mapping[str, Union[float, bool]]],
+             save: Optional[Sequence[str]],
+             listener: Optional["StreamedResult"] = None,
+             background: bool = False) -> None:
+        self._load()
+        self.ngspice.external_sources = self.signals
+        self.ngspice.data_listener = listener
+        self.ngspice.simulation_time = 0.0
+        self.ngspice.destroy()
+        # 'delete all' removes save commands of previous analysis
+        self.ngspice.exec_command('delete all')
+        if save is not None:
+            self.ngspice.exec_command(f"save {' '.join(save)}")
+        for name, value in (options or {}).items():
+            if value is True:
+                self.ngspice.exec_command(f'option {name}')
+            elif value is False:
+                self.ngspice.exec_command(f'option {name}=0')
+            else:
+                self.ngspice.exec_command(f'option {name}={value!r}')
+        # any command prefixed with bg_ runs in ngspice background thread
+        self.ngspice.exec_command(
+            f"{'bg_' if background else ''}tran {float(step_time)!r} {float(end_time)!r} "
+            f'{float(start_time)!r} {float(max_time)!r}')
+
+    def transient_streamed(self, result: "StreamedResult",
+                           step_time: float, end_time: float, start_time: float = 0,
+                           max_time: Optional[float] = None,
+                           options: Optional[Mapping[str, Union[float, bool]]] = None
+                           ) -> "StreamedResult":
+        """Run transient analysis writing time points into result as they are computed
+
+        Only nodes of result are saved and ngspice's own copy of them is destroyed
+        after analysis, so memory use doesn't grow with simulation length.
+
+        :param result: memory-mapped result receiving data
+        :param step_time: printing increment in seconds
+        :param end_time: final time in seconds
+        :param start_time: results before start_time aren't stored, defaults to 0
+        :param max_time: maximum step size in seconds, defaults to step_time
+        :param options: ngspice options set before analysis, defaults to None
+        :return: result with all time points written
+        """
+        if max_time is None:
+            max_time = step_time
+        try:
+            self._run(step_time, end_time, start_time, max_time, options, result.nodes,
+                      listener=result)
+        finally:
+            self.ngspice.data_listener = None
+            result.flush()
+        if self.ngspice.last_plot == 'const':
+            raise NameError('Simulation failed')
+        self.ngspice.destroy()
+        return result
+
+    def close(self) -> None:
+        """Remove circuit from ngspice"""
+        if self.ngspice.loaded_session is self:
+            self.ngspice.destroy()
+            self.ngspice.remove_circuit()
+            self.ngspice.loaded_session = None
+
+
+class SimulationCancelled(Exception):
+    """Background simulation was cancelled before it finished"""
+
+
+class BackgroundRun:
+    """Transient analysis running in ngspice background thread
+
+    Created by :meth:`SimulationSession.start_transient`. Progress is current simulation
+    time relative to end time, :meth:`cancel` halts ngspice and :meth:`wait` collects
+    the result. Partial results are available when analysis streams into
+    :class:`~phyether.streaming.StreamedResult`.
+    """
+
+    def __init__(self, session: SimulationSession, end_time: float,
+                 save: Optional[Sequence[str]] = None,
+                 resample_step: Optional[float] = None,
+                 cache: Optional["ResultCache"] = None,
+                 key: Optional[str] = None,
+                 stream: Optional["StreamedResult"] = None,
+                 finish: Optional[Callable[[TransientAnalysis], TransientAnalysis]] = None,
+                 analysis: Optional[TransientAnalysis] = None) -> None:
+        """
+        :param analysis: already known result, e.g. from cache, nothing is run
+        """
+        self.session = session
+        self.end_time = end_time
+        self.save = save
+        self.resample_step = resample_step
+        self.cache = cache
+        self.key = key
+        self.stream = stream
+        self.finish = finish
+        self.cancelled = False
+        self._analysis = finish(analysis) if analysis is not None and finish else analysis
+        self._started = analysis is None
+
+    @property
+    def running(self) -> bool:
+        return self._started and not self.cancelled and self.session.ngspice.running
+
+    @property
+    def progress(self) -> float:
+        """Fraction of simulated time between 0 and 1"""
+        if self._analysis is not None:
+            return 1.0
+        return min(max(self.session.ngspice.simulation_time / self.end_time, 0.0), 1.0)
+
+    def partial(self) -> Optional[Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+        """Time and node values streamed so far, None without stream
+
+        Safe to call from other threads while analysis runs, returned arrays are copies.
+        """
+        if self.stream is None:
+            return None
+        time_points, nodes = self.stream.arrays()
+        return np.array(time_points), {name: np.array(values) for name, values in nodes.items()}
+
+    def cancel(self, poll_interval: float = 0.01) -> None:
+        """Halt ngspice and discard the analysis
+
+        Circuit is removed from ngspice, session loads it again on next analysis.
+        """
+        if not self._started or self._analysis is not None or self.cancelled:
+            return
+        self.cancelled = True
+        ngspice = self.session.ngspice
+        if ngspice.running:
+            ngspice.exec_command('bg_halt')
+            while ngspice.running:
+                sleep(poll_interval)
+        self._release()
+        # halted analysis could be resumed, drop it together with the circuit
+        if ngspice.loaded_session is self.session:
+            ngspice.destroy()
+            ngspice.remove_circuit()
+            ngspice.loaded_session = None
+
+    def wait(self, poll_interval: float = 0.05,
+             timeout: Optional[float] = None) -> TransientAnalysis:
+        """Wait until analysis finishes and return its result
+
+        :param poll_interval: seconds between checks of ngspice state
+        :param timeout: seconds after which TimeoutError is raised, analysis keeps
+            running, defaults to None, wait indefinitely
+        :raises SimulationCancelled: if analysis was cancelled
+        """
+        deadline = monotonic() + timeout if timeout is not None else None
+        while self.running:
+            if deadline is not None and monotonic() > deadline:
+                raise TimeoutError("Simulation is still running")
+            sleep(poll_interval)
+        if self.cancelled:
+            raise SimulationCancelled("Simulation was cancelled")
+        if self._analysis is None:
+            self._release()
+            analysis = self.session._collect(self.save, self.resample_step)
+            if self.cache is not None and self.key is not None:
+                self.cache.put(self.key, analysis)
+            self._analysis = self.finish(analysis) if self.finish else analysis
+        return self._analysis
+
+    def _release(self) -> None:
+        if self.session.ngspice.data_listener is self.stream:
+            self.session.ngspice.data_listener = None
+        if self.stream is not None:
+            self.stream.flush()
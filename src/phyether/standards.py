@@ -0,0 +1,13 @@
+from typing import Dict, NamedTuple
+
+
+class StandardSpeed(NamedTuple):
+    rise_time: float
+    on_time: float
+
+
+STANDARD_SPEEDS: Dict[str, StandardSpeed] = {
+    "40GBASE-T": StandardSpeed(0.1, 0.625),
+    "10GBASE-T": StandardSpeed(0.1, 1.2),
+    "1000BASE-T": StandardSpeed(2, 8)
+}
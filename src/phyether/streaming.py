@@ -0,0 +1,164 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from PySpice.Probe.WaveForm import TransientAnalysis
+
+from phyether.spice_session import transient_from_arrays
+
+
+def _vector_name(name: str) -> str:
+    name = name.lower()
+    if name.startswith('v(') and name.endswith(')'):
+        return name[2:-1]
+    return name
+
+
+class StreamedResult:
+    """Simulation result written to memory-mapped file while ngspice is running
+
+    Every accepted time point is appended as a row of ``data.f64`` with columns
+    listed in ``meta.json``, number of written rows is kept in ``length.i64``, so
+    that other threads or processes can read partial results with :meth:`open`.
+    """
+
+    def __init__(self, directory: Union[str, Path],
+                 nodes: Optional[Sequence[str]] = None,
+                 start_time: float = 0,
+                 resample_step: Optional[float] = None,
+                 scales: Optional[Mapping[str, float]] = None,
+                 capacity: int = 4096) -> None:
+        """
+        :param directory: directory of result files, created if it doesn't exist
+        :param nodes: nodes to store, defaults to all vectors sent by ngspice
+        :param start_time: time points before start_time aren't stored, stored time is
+            relative to start_time
+        :param resample_step: store values interpolated to uniform grid with this step
+            in seconds, defaults to None, time points chosen by ngspice
+        :param scales: node -> factor multiplying its values, e.g. attenuation
+        :param capacity: number of preallocated rows, file grows when it's exceeded
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.nodes = [node.lower() for node in nodes] if nodes is not None else None
+        self.start_time = start_time
+        self.resample_step = resample_step
+        self.scales = {node.lower(): scale for node, scale in (scales or {}).items()}
+        self.capacity = max(capacity, 1)
+        self.names: List[str] = []
+        self._columns = np.zeros(0, dtype=int)
+        self._scale = np.ones(0)
+        self._data: Optional[np.memmap] = None
+        self._length = np.memmap(self.directory / 'length.i64', dtype=np.int64,
+                                 mode='w+', shape=(1,))
+        self._previous: Optional[np.ndarray] = None
+        self._next_time = 0.0
+
+    @property
+    def length(self) -> int:
+        """Number of rows written so far"""
+        return int(self._length[0])
+
+    def start(self, vector_names: Sequence[str]) -> None:
+        """Called by ngspice before analysis with names of sent vectors"""
+        names = [_vector_name(name) for name in vector_names]
+        if 'time' not in names:
+            raise ValueError("Streamed analysis has no time vector")
+        wanted = self.nodes if self.nodes is not None else [
+            name for name in names if name != 'time' and '#' not in name]
+        missing = set(wanted) - set(names)
+        if missing:
+            raise ValueError(f"Nodes not sent by ngspice: {', '.join(sorted(missing))}")
+        self.names = ['time', *wanted]
+        self._columns = np.array([names.index(name) for name in self.names])
+        self._scale = np.array([1.0] + [self.scales.get(name, 1.0) for name in wanted])
+        with open(self.directory / 'meta.json', 'w') as file:
+            json.dump({'names': self.names, 'dtype': 'float64'}, file)
+        self._data = np.memmap(self.directory / 'data.f64', dtype=np.float64, mode='w+',
+                               shape=(self.capacity, len(self.names)))
+        self._length[0] = 0
+        self._previous = None
+        self._next_time = self.start_time
+
+    def _grow(self) -> None:
+        assert self._data is not None
+        self._data.flush()
+        self.capacity *= 2
+        path = self.directory / 'data.f64'
+        # readers in other threads see no data instead of closed map while file grows
+        data, self._data = self._data, None
+        del data
+        os.truncate(path, self.capacity * len(self.names) * 8)
+        self._data = np.memmap(path, dtype=np.float64, mode='r+',
+                               shape=(self.capacity, len(self.names)))
+
+    def _write(self, row: np.ndarray) -> None:
+        length = int(self._length[0])
+        if length == self.capacity:
+            self._grow()
+        assert self._data is not None
+        row = row * self._scale
+        row[0] -= self.start_time
+        self._data[length] = row
+        self._length[0] = length + 1
+
+    def append(self, values: Sequence[float]) -> None:
+        """Called by ngspice with values of all vectors at accepted time point"""
+        row = np.asarray(values)[self._columns]
+        time = row[0]
+        if self.resample_step is None:
+            if time >= self.start_time:
+                self._write(row)
+            return
+        previous = self._previous
+        # write grid points between previous and current time point
+        while self._next_time <= time:
+            if previous is None or time == previous[0]:
+                self._write(row.copy())
+            else:
+                fraction = (self._next_time - previous[0]) / (time - previous[0])
+                point = previous + fraction * (row - previous)
+                point[0] = self._next_time
+                self._write(point)
+            self._next_time = self.start_time + self.length * self.resample_step
+        self._previous = row
+
+    def flush(self) -> None:
+        if self._data is not None:
+            self._data.flush()
+        self._length.flush()
+
+    def arrays(self) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Views of rows written so far: time and node values"""
+        mapped = self._data
+        if mapped is None:
+            return np.zeros(0), {}
+        data = mapped[:self.length]
+        return data[:, 0], {name: data[:, index]
+                            for index, name in enumerate(self.names) if index}
+
+    def to_analysis(self) -> TransientAnalysis:
+        """Copy rows written so far into transient analysis"""
+        time, nodes = self.arrays()
+        return transient_from_arrays(np.array(time), {name: np.array(values)
+                                                      for name, values in nodes.items()})
+
+    @staticmethod
+    def open(directory: Union[str, Path]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Read-only views of result written by other process, it may be still running
+
+        :param directory: directory of result files
+        :return: time and node values written so far
+        """
+        directory = Path(directory)
+        with open(directory / 'meta.json') as file:
+            names = json.load(file)['names']
+        length = int(np.memmap(directory / 'length.i64', dtype=np.int64, mode='r', shape=(1,))[0])
+        if length == 0:
+            return np.zeros(0), {name: np.zeros(0) for name in names[1:]}
+        data = np.memmap(directory / 'data.f64', dtype=np.float64, mode='r',
+                         shape=(length, len(names)))
+        return data[:, 0], {name: data[:, index] for index, name in enumerate(names) if index}
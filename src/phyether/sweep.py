@@ -0,0 +1,226 @@
+import math
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Literal, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from PySpice.Probe.WaveForm import TransientAnalysis
+from PySpice.Spice.Netlist import Circuit
+from PySpice.Spice.NgSpice.Shared import NgSpiceShared
+from PySpice.Unit import u_V
+
+from phyether.accuracy import Accuracy, transient_settings
+from phyether.dac import DAC
+from phyether.probe import PAIR_NODES
+from phyether.result_cache import ResultCache
+from phyether.spice_session import SimulationSession, transient_from_arrays
+from phyether.twisted_pair import TwistedPair
+
+
+# Starting a process and loading ngspice costs roughly as much as simulating this many
+# symbols on one pair, smaller sweeps are simulated as one netlist in this process
+MIN_PROCESS_WORK = 20000
+
+
+class PairSweep:
+    """Twisted pairs with different parameters simulated in one netlist
+
+    Every configuration becomes its own :class:`TwistedPair` subcircuit, one transient
+    analysis gives responses of all of them, which are split back into results with
+    the same nodes as :meth:`TwistedPair.simulate`.
+    """
+
+    def __init__(self, *, dac: DAC,
+                 configurations: Sequence[Mapping[str, Any]],
+                 shared_signal: bool = True) -> None:
+        """
+        :param dac: Digital to Analog Converter used by all pairs
+        :param configurations: keyword arguments of :class:`TwistedPair` for every pair,
+            without dac and name, e.g. [{'transmission_type': 'lossy', 'length': 10}, ...]
+        :param shared_signal: drive all pairs from one source, otherwise every pair
+            has its own source and gets its own data, defaults to True
+        """
+        if not configurations:
+            raise ValueError("No configurations to sweep")
+        self.dac = dac
+        self.shared_signal = shared_signal
+        self.configurations = [dict(configuration) for configuration in configurations]
+        self.pairs = [TwistedPair(dac=dac, **configuration, name=f"sweep{index}")
+                      for index, configuration in enumerate(self.configurations)]
+        self.circuit = Circuit("Twisted Pair Sweep")
+        self.circuit.V('offset', 'offset+', self.circuit.gnd, u_V(0))
+        if shared_signal:
+            SimulationSession.add_signal_source(self.circuit, 'signal', 'vin+', 'vin-')
+        for pair in self.pairs:
+            if shared_signal:
+                inputs = ['vin+', 'vin-']
+            else:
+                inputs = [f'{pair.name}_vin+', f'{pair.name}_vin-']
+                SimulationSession.add_signal_source(self.circuit, f'{pair.name}signal', *inputs)
+            pair.add_to(self.circuit, *inputs,
+                        f'{pair.name}_vout+', f'{pair.name}_vout-', 'offset+')
+        self._session: Optional[SimulationSession] = None
+
+    @property
+    def session(self) -> SimulationSession:
+        """Circuit kept loaded in ngspice between simulations"""
+        if self._session is None:
+            self._session = SimulationSession(self.circuit)
+        return self._session
+
+    def simulate(self, data: Sequence[Any], presimulation_ratio: int = 0,
+                 voltage_offset: float = 0,
+                 warm_start: Literal['presimulation', 'dc'] = 'presimulation',
+                 seed: Optional[int] = None,
+                 accuracy: Accuracy = 'normal',
+                 cache: Optional[ResultCache] = None) -> List[TransientAnalysis]:
+        """Simulate all pairs in one transient analysis
+
+        Presimulation is the same for all pairs and as long as needed by the pair with
+        the longest transmission delay.
+
+        :param data: Symbol data, with shared signal one sequence of symbols,
+            otherwise one sequence of symbols per configuration
+        :param presimulation_ratio: Simulate ratio * transmission_delay worth of signals beforehand, defaults to 0
+        :param voltage_offset: Voltage offset of pairs relative to ground, defaults to 0
+        :param warm_start: How lines are settled before data, see :meth:`TwistedPair.simulate`
+        :param seed: Seed of presimulation symbols, defaults to None
+        :param accuracy: Accuracy preset, see :meth:`TwistedPair.simulate`, defaults to 'normal'
+        :param cache: Cache of results consulted before running ngspice, defaults to None
+        :return: Transient analysis simulation of every configuration
+        """
+        if self.shared_signal:
+            pair_data = [list(data)]
+        else:
+            pair_data = [list(symbols) for symbols in data]
+            if len(pair_data) != len(self.pairs):
+                raise ValueError(f"Expected data for {len(self.pairs)} pairs, got {len(pair_data)}")
+        if warm_start == 'dc':
+            presimulation_ratio = 0
+        rng = random.Random(seed) if seed is not None else None
+        longest = max(self.pairs, key=lambda pair: float(pair.transmission_delay))
+        presignals, presimulation = longest._get_presignals([], presimulation_ratio, rng)
+        symbol_time = float(self.dac.symbol_time)
+
+        settings = transient_settings(accuracy, symbol_time, float(self.dac.rise_time),
+                                      float(longest.transmission_delay))
+        session = self.session
+        for pair in self.pairs:
+            if pair.line_model is not None and pair.line_model.set_ltra_options(settings.ltra):
+                pair.line_model.alter_session(session)
+        session.alter('voffset', dc=voltage_offset)
+        sources = ['signal'] if self.shared_signal else [f'{pair.name}signal' for pair in self.pairs]
+        for source, symbols in zip(sources, pair_data):
+            session.set_signal(source, *self.dac.to_pwl_arrays(presimulation + symbols,
+                                                               settled=warm_start == 'dc'))
+        end_time = ((presignals + max(len(symbols) for symbols in pair_data)) * symbol_time
+                    + float(longest.transmission_delay) + 2 * float(self.dac.rise_time))
+        simulation = session.transient(step_time=settings.step_time,
+                                       end_time=end_time,
+                                       start_time=presignals * symbol_time,
+                                       max_time=settings.max_time,
+                                       options=settings.options,
+                                       cache=cache)
+        return self._split(simulation)
+
+    def _split(self, simulation: TransientAnalysis) -> List[TransientAnalysis]:
+        time = simulation.time.as_ndarray()
+        time = time - time[0]
+        results = []
+        for pair in self.pairs:
+            nodes: Dict[str, np.ndarray] = {}
+            for node in PAIR_NODES:
+                name = node if self.shared_signal and node.startswith('vin') else f'{pair.name}_{node}'
+                nodes[node] = simulation[name].as_ndarray().copy()
+            result = transient_from_arrays(time, nodes)
+            pair._apply_loss(result)
+            results.append(result)
+        return results
+
+
+def _simulate_batch(library_path: str, dac: DAC,
+                    configurations: Sequence[Mapping[str, Any]],
+                    shared_signal: bool,
+                    data: Sequence[Any],
+                    run_args: Mapping[str, Any]
+                    ) -> List[Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+    NgSpiceShared.LIBRARY_PATH = library_path
+    results = PairSweep(dac=dac, configurations=configurations,
+                        shared_signal=shared_signal).simulate(data, **run_args)
+    return [(result.time.as_ndarray(),
+             {name: node.as_ndarray() for name, node in result.nodes.items()})
+            for result in results]
+
+
+def plan_batches(configurations: int, symbols: int, processes: Optional[int] = None) -> int:
+    """Number of netlists sweep is split into, each simulated in its own process
+
+    One netlist saves parsing and setup of every configuration, but its time step is
+    limited by all pairs together, so large sweeps are split between processes.
+
+    :param configurations: number of swept configurations
+    :param symbols: number of symbols sent over every pair
+    :param processes: maximum number of processes, defaults to number of CPUs
+    :return: 1 to simulate everything in one netlist in this process
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    by_work = configurations * symbols // MIN_PROCESS_WORK
+    return max(1, min(processes, configurations, by_work))
+
+
+def simulate_sweep(dac: DAC,
+                   configurations: Sequence[Mapping[str, Any]],
+                   data: Sequence[Any],
+                   shared_signal: bool = True,
+                   processes: Optional[int] = None,
+                   presimulation_ratio: int = 0,
+                   voltage_offset: float = 0,
+                   warm_start: Literal['presimulation', 'dc'] = 'presimulation',
+                   seed: Optional[int] = None,
+                   accuracy: Accuracy = 'normal',
+                   cache: Optional[ResultCache] = None) -> List[TransientAnalysis]:
+    """Simulate sweep over twisted pair parameters, batching configurations into netlists
+
+    Chooses between one netlist simulated in this process and several netlists
+    simulated in parallel processes with :func:`plan_batches`.
+
+    :param dac: Digital to Analog Converter used by all pairs
+    :param configurations: keyword arguments of :class:`TwistedPair` for every pair
+    :param data: Symbol data, see :meth:`PairSweep.simulate`
+    :param shared_signal: drive all pairs with the same data, defaults to True
+    :param processes: maximum number of processes, defaults to number of CPUs
+    :param presimulation_ratio: Simulate ratio * transmission_delay worth of signals beforehand, defaults to 0
+    :param voltage_offset: Voltage offset of pairs relative to ground, defaults to 0
+    :param warm_start: How lines are settled before data, see :meth:`TwistedPair.simulate`
+    :param seed: Seed of presimulation symbols, if None every batch gets different
+        presimulation symbols, defaults to None
+    :param accuracy: Accuracy preset, see :meth:`TwistedPair.simulate`, defaults to 'normal'
+    :param cache: Cache of results consulted before running ngspice, defaults to None
+    :return: Transient analysis simulation of every configuration, in order of configurations
+    """
+    run_args: Dict[str, Any] = dict(presimulation_ratio=presimulation_ratio,
+                                    voltage_offset=voltage_offset,
+                                    warm_start=warm_start, seed=seed,
+                                    accuracy=accuracy, cache=cache)
+    symbols = len(data) if shared_signal else max(len(pair_data) for pair_data in data)
+    batches = plan_batches(len(configurations), symbols, processes)
+    if batches == 1:
+        return PairSweep(dac=dac, configurations=configurations,
+                         shared_signal=shared_signal).simulate(data, **run_args)
+
+    batch_size = math.ceil(len(configurations) / batches)
+    starts = range(0, len(configurations), batch_size)
+    # spawn: forked child would inherit loaded ngspice library of parent process
+    with ProcessPoolExecutor(max_workers=batches,
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(_simulate_batch, NgSpiceShared.LIBRARY_PATH, dac,
+                                   configurations[start:start + batch_size], shared_signal,
+                                   data if shared_signal else data[start:start + batch_size],
+                                   run_args)
+                   for start in starts]
+        return [transient_from_arrays(time, nodes)
+                for future in futures for time, nodes in future.result()]
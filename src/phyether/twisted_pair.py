@@ -1,12 +1,21 @@
-from math import sqrt
-from typing import Iterable, Literal, Optional, Sequence, overload, Tuple
+import random
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Literal, Optional, Sequence, overload, Tuple, Union
+
+import numpy as np
 
 from PySpice.Probe.WaveForm import TransientAnalysis
 from PySpice.Spice.Netlist import Circuit, SubCircuit
 from PySpice.Unit import *
 from PySpice.Unit.Unit import UnitValue  # pylint: disable=unused-wildcard-import, wildcard-import
 
+from phyether.accuracy import Accuracy, transient_settings
 from phyether.dac import DAC
+from phyether.line_models import LINE_MODELS, BehaviouralLine, LineModel, LumpedLine
+from phyether.probe import Probe
+from phyether.result_cache import ResultCache
+from phyether.spice_session import BackgroundRun, SimulationSession, resample_analysis
+from phyether.streaming import StreamedResult
 
 
 class TwistedPair(SubCircuit):
@@ -24,7 +33,8 @@ class TwistedPair(SubCircuit):
                  resistance: float = 0.188,
                  inductance: float = 525,
                  capacitance: float = 52,
-                 transmission_type: Literal['lossy'],
+                 transmission_type: Literal['lossy', 'txl', 'lumped', 'behavioural'],
+                 segments: int = 20,
                  name: str = "pair"
                  ) -> None:
         """Lossy transmission line
@@ -32,12 +42,15 @@ class TwistedPair(SubCircuit):
         transmission delay = length * sqrt(inductance * capacitance)
 
         :param dac: Digital to Analog Converter
-        :param transmission_type: lossy transmission line
+        :param transmission_type: model of lossy transmission line, see :mod:`phyether.line_models`:
+            'lossy' - ngspice LTRA, 'txl' - ngspice TXL, 'lumped' - cascade of RLC segments,
+            'behavioural' - frequency response computed in numpy without ngspice
         :param output_impedance: In Ω, defaults to 100
         :param length: length of twisted pair in meters, defaults to 1
         :param resistance: resistance per meter, defaults to 0.188 Ω
         :param inductance: inductance per meter, defaults to 525 nH
         :param capacitance: capacitance per meter, defaults to 52 pF
+        :param segments: number of segments of lumped line, defaults to 20
         """
 
     @overload
@@ -67,20 +80,26 @@ class TwistedPair(SubCircuit):
                  inductance: Optional[float] = 525,
                  capacitance: Optional[float] = 52,
                  transmission_delay: Optional[float] = 5,
-                 transmission_type: Literal['lossy', 'lossless'],
+                 transmission_type: Literal['lossy', 'lossless', 'txl', 'lumped', 'behavioural'],
+                 segments: int = 20,
                  name: str = "pair"
                  ) -> None:
         SubCircuit.__init__(self, name, *self.__nodes__)
         self.dac = dac
+        self.transmission_type = transmission_type
         self.R('positiveR', 'vin+', 'vout+', u_GOhm(1000))
         self.R('negativeR', 'vout-', 'vin-', u_GOhm(1000))
         self.R('load', 'vout+', 'vout-', u_Ohm(output_impedance))
         self.transmission_delay: UnitValue
         self.cable_length = length
-        if transmission_type == 'lossy':
-            self.transmission_delay = length * u_ns(u_s(sqrt(u_nH(inductance) * u_pF(capacitance))))
-            self.raw_spice = "O1 vin+ vin- vout+ vout- ltra"
-            self.raw_spice += f"\n.model ltra ltra LEN={length} R={resistance} L={inductance}n C={capacitance}p"
+        self.line_model: Optional[LineModel] = None
+        if transmission_type == 'lumped':
+            self.line_model = LumpedLine(name, segments=segments)
+        elif transmission_type != 'lossless':
+            self.line_model = LINE_MODELS[transmission_type](name)
+        if self.line_model is not None:
+            self._set_lossy_parameters(length, resistance, inductance, capacitance)
+            self.line_model.add_elements(self)
         else:
             self.transmission_delay = u_ns(transmission_delay)
             self.LosslessTransmissionLine(
@@ -89,46 +108,333 @@ class TwistedPair(SubCircuit):
                 time_delay=self.transmission_delay)
         self.R('res+', 'vin+', 'offset+', u_GOhm(1000))
         self.R('res-', 'offset+', 'vin-', u_GOhm(1000))
+        self._session: Optional[SimulationSession] = None
 
-    def _get_pwl(self, data: Iterable[int],
-                 presimulation_ratio: int
-                 ) -> Tuple[int, Sequence[Tuple[UnitValue, UnitValue]]]:
+    def _set_lossy_parameters(self, length, resistance, inductance, capacitance):
+        self.cable_length = length
+        self.resistance = resistance
+        self.inductance = inductance
+        self.capacitance = capacitance
+        assert self.line_model is not None
+        self.line_model.set_parameters(length, resistance, inductance, capacitance)
+        self.transmission_delay = self.line_model.transmission_delay
+
+    def add_to(self, circuit: Circuit, *nodes: str) -> None:
+        """Add definition and instance X<name> of this pair to circuit
+
+        :param circuit: circuit to add twisted pair to
+        :param nodes: circuit nodes connected to vin+, vin-, vout+, vout-, offset+
+        """
+        if self.line_model is not None and self.line_model.behavioural:
+            raise ValueError("Behavioural line can't be added to ngspice circuit")
+        circuit.subcircuit(self)
+        if self.line_model is not None:
+            self.line_model.add_models(circuit)
+        circuit.X(self.name, self.name, *nodes)
+
+    def alter(self, *,
+              output_impedance: Optional[float] = None,
+              characteristic_impedance: Optional[float] = None,
+              length: Optional[int] = None,
+              resistance: Optional[float] = None,
+              inductance: Optional[float] = None,
+              capacitance: Optional[float] = None,
+              transmission_delay: Optional[float] = None,
+              **_) -> None:
+        """Change parameters of twisted pair without building new circuit
+
+        Parameters have the same meaning as in constructor, parameters that are None
+        or don't apply to transmission type are left unchanged.
+        """
+        if output_impedance is not None:
+            self.Rload.resistance = u_Ohm(output_impedance)
+        if self.line_model is not None:
+            self._set_lossy_parameters(
+                length if length is not None else self.cable_length,
+                resistance if resistance is not None else self.resistance,
+                inductance if inductance is not None else self.inductance,
+                capacitance if capacitance is not None else self.capacitance)
+        else:
+            if characteristic_impedance is not None:
+                self.Ttline.impedance = u_Ohm(characteristic_impedance)
+            if transmission_delay is not None:
+                self.transmission_delay = u_ns(transmission_delay)
+                self.Ttline.time_delay = self.transmission_delay
+        if self._session is not None:
+            self.alter_session(self._session)
+
+    def alter_session(self, session: SimulationSession) -> None:
+        """Apply current parameters of this pair to session containing it"""
+        session.alter(f'r.x{self.name}.rload', resistance=float(self.Rload.resistance))
+        if self.line_model is not None:
+            self.line_model.alter_session(session)
+        else:
+            session.alter(f't.x{self.name}.ttline',
+                          z0=float(self.Ttline.impedance),
+                          td=float(self.Ttline.time_delay))
+
+    @property
+    def session(self) -> SimulationSession:
+        """Circuit with this pair kept loaded in ngspice between simulations"""
+        if self._session is None:
+            circuit = Circuit("Twisted Pair")
+            circuit.V('offset', 'offset+', circuit.gnd, u_V(0))
+            SimulationSession.add_signal_source(circuit, 'signal', 'vin+', 'vin-')
+            self.add_to(circuit, 'vin+', 'vin-', 'vout+', 'vout-', 'offset+')
+            self._session = SimulationSession(circuit)
+        return self._session
+
+    def _get_presignals(self, data: Iterable[int],
+                        presimulation_ratio: int,
+                        rng: Optional[random.Random] = None) -> Tuple[int, List[int]]:
         presignals = 0
-        data_to_simulate = data
+        data_to_simulate = list(data)
         if presimulation_ratio:
             presignals = int(presimulation_ratio * self.delay/self.dac.symbol_time) + 5
-            data_to_simulate = self.dac.random_signals(presignals)
-            data_to_simulate.extend(data)
+            data_to_simulate = self.dac.random_signals(presignals, rng) + data_to_simulate
+        return presignals, data_to_simulate
+
+    def _get_pwl(self, data: Iterable[int],
+                 presimulation_ratio: int
+                 ) -> Tuple[int, Sequence[Tuple[UnitValue, UnitValue]]]:
+        presignals, data_to_simulate = self._get_presignals(data, presimulation_ratio)
         return presignals, self.dac.to_pwl(data_to_simulate)
 
+    def _get_pwl_arrays(self, data: Iterable[int],
+                        presimulation_ratio: int,
+                        rng: Optional[random.Random] = None,
+                        settled: bool = False
+                        ) -> Tuple[int, Tuple[np.ndarray, np.ndarray]]:
+        presignals, data_to_simulate = self._get_presignals(data, presimulation_ratio, rng)
+        return presignals, self.dac.to_pwl_arrays(data_to_simulate, settled)
+
+    def _apply_loss(self, simulation: TransientAnalysis, prefix: str = '') -> None:
+        for node in (f'{prefix}vout+', f'{prefix}vout-'):
+            if node not in simulation.nodes:
+                continue
+            vout = simulation[node]
+            vout[:] = self.dac.signal_after_loss(vout.as_ndarray(), self.cable_length)
+
     def simulate(self, data: Iterable[int], presimulation_ratio: int = 0,
-                 voltage_offset: float = 0) -> TransientAnalysis:
-        """_summary_
+                 voltage_offset: float = 0,
+                 warm_start: Literal['presimulation', 'dc'] = 'presimulation',
+                 seed: Optional[int] = None,
+                 accuracy: Accuracy = 'normal',
+                 probe: Optional[Probe] = None,
+                 cache: Optional[ResultCache] = None) -> TransientAnalysis:
+        """Simulate sending data over twisted pair
+
+        Circuit is loaded into ngspice on first simulation and reused afterwards.
 
         :param data: Symbol data to send over twisted pair.
         :param presimulation_ratio: Simulate ratio * transmission_delay worth of signals beforehand, defaults to 0
         :param voltage_offset: Voltage offset of one pair relative to ground, defaults to 0
+        :param warm_start: How line is settled before data. 'presimulation' sends random
+            symbols as set by presimulation_ratio, 'dc' starts from DC operating point at
+            voltage of the first symbol without presimulation, defaults to 'presimulation'
+        :param seed: Seed of presimulation symbols, same seed gives the same results, defaults to None
+        :param accuracy: Accuracy preset setting time steps and tolerances, one of
+            'draft', 'normal', 'signoff', see :mod:`phyether.accuracy`, defaults to 'normal'
+        :param probe: Nodes to save and their resolution, defaults to all nodes at time points
+            chosen by ngspice
+        :param cache: Cache of results consulted before running ngspice, defaults to None
         :return: Transient analysis simulation
         """
-        circuit = Circuit("Twisted Pair")
-        circuit.VoltageSource(f'offset', 'offset+', self.gnd, u_V(voltage_offset))
-        circuit.subcircuit(self)
-        circuit.X(1, 'pair', 'vin+', 'vin-', 'vout+', 'vout-', 'offset+')
-        presignals, pwl = self._get_pwl(data, presimulation_ratio)
-        self.PieceWiseLinearVoltageSource('signal', 'vin+', 'vin-', values = pwl)
-        end_time = pwl[-1][0] + self.transmission_delay + self.dac.rise_time
-        step_time = self.dac.rise_time
-        simulator = circuit.simulator(temperature=25,
-                                      nominal_temperature=25,
-                                      simulator="ngspice-shared")
-        simulation = simulator.transient(
-            step_time=step_time,
-            end_time=end_time,
-            start_time=presignals * self.dac.symbol_time)
+        presignals, data_to_simulate, end_time = self._prepare(
+            data, presimulation_ratio, warm_start, seed)
+        simulation = self._transient(data_to_simulate,
+                                     start_time=presignals * float(self.dac.symbol_time),
+                                     end_time=end_time,
+                                     voltage_offset=voltage_offset,
+                                     settled=warm_start == 'dc',
+                                     accuracy=accuracy,
+                                     probe=probe,
+                                     cache=cache)
         simulation._time = simulation.time.as_ndarray() - simulation._time[0]
-        for i, vout in enumerate(simulation["vout+"]):
-            simulation["vout+"][i] = self.dac.signal_after_loss(vout, self.cable_length)
-        for i, vout in enumerate(simulation["vout-"]):
-            simulation["vout-"][i] = self.dac.signal_after_loss(vout, self.cable_length)
-        self.Vsignal.detach()
         return simulation
+
+    def simulate_streamed(self, data: Iterable[int], directory: Union[str, Path],
+                          presimulation_ratio: int = 0,
+                          voltage_offset: float = 0,
+                          warm_start: Literal['presimulation', 'dc'] = 'presimulation',
+                          seed: Optional[int] = None,
+                          accuracy: Accuracy = 'normal',
+                          probe: Optional[Probe] = None) -> StreamedResult:
+        """Simulate sending data over twisted pair, streaming results into memory-mapped files
+
+        Time points are written to disk as ngspice computes them, so memory use is bounded
+        for very long simulations and :meth:`StreamedResult.open` can read partial results
+        while simulation is running. Parameters are the same as in :meth:`simulate`.
+
+        :param directory: directory of result files
+        :return: result with time relative to the first data symbol
+        """
+        if isinstance(self.line_model, BehaviouralLine):
+            raise ValueError("Behavioural line is computed in memory and can't be streamed")
+        presignals, data_to_simulate, end_time = self._prepare(
+            data, presimulation_ratio, warm_start, seed)
+        settings = transient_settings(accuracy, float(self.dac.symbol_time),
+                                      float(self.dac.rise_time), float(self.transmission_delay))
+        if probe is None:
+            probe = Probe()
+        start_time = presignals * float(self.dac.symbol_time)
+        loss = float(self.dac.signal_after_loss(1.0, self.cable_length))
+        result = StreamedResult(directory,
+                                nodes=probe.nodes,
+                                start_time=start_time,
+                                resample_step=probe.step_time(float(self.dac.symbol_time)),
+                                scales={'vout+': loss, 'vout-': loss},
+                                capacity=int((end_time - start_time) / settings.max_time) + 1)
+        session = self._prepare_session(data_to_simulate, voltage_offset,
+                                        warm_start == 'dc', settings.ltra)
+        return session.transient_streamed(result,
+                                          step_time=settings.step_time,
+                                          end_time=end_time,
+                                          start_time=start_time,
+                                          max_time=settings.max_time,
+                                          options=settings.options)
+
+    def start_simulation(self, data: Iterable[int], presimulation_ratio: int = 0,
+                         voltage_offset: float = 0,
+                         warm_start: Literal['presimulation', 'dc'] = 'presimulation',
+                         seed: Optional[int] = None,
+                         accuracy: Accuracy = 'normal',
+                         probe: Optional[Probe] = None,
+                         cache: Optional[ResultCache] = None,
+                         partial_results: Optional[Union[str, Path]] = None) -> BackgroundRun:
+        """Start simulation in ngspice background thread and return immediately
+
+        Returned run reports progress, can be cancelled and its :meth:`BackgroundRun.wait`
+        returns the same analysis as :meth:`simulate`. Other parameters are the same
+        as in :meth:`simulate`.
+
+        :param partial_results: directory into which time points are streamed while
+            simulation runs, read with :meth:`BackgroundRun.partial`, defaults to None
+        :return: handle of running simulation
+        """
+        if isinstance(self.line_model, BehaviouralLine):
+            raise ValueError("Behavioural line is computed in memory and can't run in ngspice")
+        presignals, data_to_simulate, end_time = self._prepare(
+            data, presimulation_ratio, warm_start, seed)
+        settings = transient_settings(accuracy, float(self.dac.symbol_time),
+                                      float(self.dac.rise_time), float(self.transmission_delay))
+        if probe is None:
+            probe = Probe()
+        start_time = presignals * float(self.dac.symbol_time)
+        resample_step = probe.step_time(float(self.dac.symbol_time))
+        stream = None
+        if partial_results is not None:
+            loss = float(self.dac.signal_after_loss(1.0, self.cable_length))
+            stream = StreamedResult(partial_results,
+                                    nodes=probe.nodes,
+                                    start_time=start_time,
+                                    resample_step=resample_step,
+                                    scales={'vout+': loss, 'vout-': loss})
+
+        def finish(simulation: TransientAnalysis) -> TransientAnalysis:
+            self._apply_loss(simulation)
+            simulation._time = simulation.time.as_ndarray() - simulation._time[0]
+            return simulation
+
+        session = self._prepare_session(data_to_simulate, voltage_offset,
+                                        warm_start == 'dc', settings.ltra)
+        return session.start_transient(step_time=settings.step_time,
+                                       end_time=end_time,
+                                       start_time=start_time,
+                                       max_time=settings.max_time,
+                                       options=settings.options,
+                                       save=probe.nodes,
+                                       resample_step=resample_step,
+                                       cache=cache,
+                                       stream=stream,
+                                       finish=finish)
+
+    def _prepare(self, data: Iterable[int], presimulation_ratio: int,
+                 warm_start: Literal['presimulation', 'dc'],
+                 seed: Optional[int]) -> Tuple[int, List[int], float]:
+        """Presimulation symbols and end time of simulation
+
+        :return: number of presimulation symbols, all symbols to send, end time in seconds
+        """
+        if warm_start == 'dc':
+            presimulation_ratio = 0
+        rng = random.Random(seed) if seed is not None else None
+        presignals, data_to_simulate = self._get_presignals(data, presimulation_ratio, rng)
+        end_time = (len(data_to_simulate) * float(self.dac.symbol_time)
+                    + float(self.transmission_delay) + 2 * float(self.dac.rise_time))
+        return presignals, data_to_simulate, end_time
+
+    def _prepare_session(self, symbols: Sequence[int], voltage_offset: float,
+                         settled: bool, ltra: Dict[str, float]) -> SimulationSession:
+        """Session with signal of symbols, offset and LTRA accuracy parameters set"""
+        session = self.session
+        if self.line_model is not None and self.line_model.set_ltra_options(ltra):
+            self.line_model.alter_session(session)
+        session.alter('voffset', dc=voltage_offset)
+        session.set_signal('signal', *self.dac.to_pwl_arrays(symbols, settled))
+        return session
+
+    def _transient(self, symbols: Sequence[int], start_time: float, end_time: float,
+                   voltage_offset: float, settled: bool = False,
+                   accuracy: Accuracy = 'normal',
+                   probe: Optional[Probe] = None,
+                   cache: Optional[ResultCache] = None) -> TransientAnalysis:
+        """Run transient analysis of symbols in session, attenuation is applied to outputs
+
+        :param symbols: all symbols to send, including presimulation symbols
+        :param start_time: time in seconds from which results are stored
+        :param end_time: time in seconds at which simulation ends
+        :param voltage_offset: Voltage offset of one pair relative to ground
+        :param settled: start from DC operating point at voltage of first symbol
+        :param accuracy: Accuracy preset setting time steps and tolerances
+        :param probe: Nodes to save and their resolution
+        :param cache: Cache of results consulted before running ngspice
+        """
+        settings = transient_settings(accuracy, float(self.dac.symbol_time),
+                                      float(self.dac.rise_time), float(self.transmission_delay))
+        if probe is None:
+            probe = Probe()
+        resample_step = probe.step_time(float(self.dac.symbol_time))
+        if isinstance(self.line_model, BehaviouralLine):
+            simulation = self.line_model.transient(
+                *self.dac.to_pwl_arrays(symbols, settled),
+                load=float(self.Rload.resistance),
+                step_time=settings.step_time,
+                start_time=start_time,
+                end_time=end_time,
+                voltage_offset=voltage_offset)
+            if resample_step is not None or probe.nodes is not None:
+                simulation = resample_analysis(simulation, resample_step or settings.step_time,
+                                               probe.nodes)
+            self._apply_loss(simulation)
+            return simulation
+        session = self._prepare_session(symbols, voltage_offset, settled, settings.ltra)
+        simulation = session.transient(
+            step_time=settings.step_time,
+            end_time=end_time,
+            start_time=start_time,
+            max_time=settings.max_time,
+            options=settings.options,
+            save=probe.nodes,
+            resample_step=resample_step,
+            cache=cache)
+        self._apply_loss(simulation)
+        return simulation
+
+    def _init_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments creating copy of this pair with current parameters"""
+        kwargs: Dict[str, Any] = {
+            'dac': self.dac,
+            'output_impedance': float(self.Rload.resistance),
+            'transmission_type': self.transmission_type,
+            'name': self.name
+        }
+        if isinstance(self.line_model, LumpedLine):
+            kwargs.update(segments=self.line_model.segments)
+        if self.line_model is not None:
+            kwargs.update(length=self.cable_length, resistance=self.resistance,
+                          inductance=self.inductance, capacitance=self.capacitance)
+        else:
+            kwargs.update(characteristic_impedance=float(self.Ttline.impedance),
+                          transmission_delay=float(self.transmission_delay) * 1e9)
+        return kwargs
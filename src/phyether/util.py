@@ -1,13 +1,17 @@
+import os
+from pathlib import Path
 from typing import Iterable, Literal, List, Optional
 from collections.abc import Mapping
 
+from phyether.conversions import format_ints, parse_ints
+
 def list_from_string(string: str, base: int = 10):
     """convert str: "0 2 34 20..." to List[int]: [0, 2, 34, 20...]
 
     :param string: string to convert
     :param base: what base are numbers in string
     """
-    return [int(x, base) for x in string.split()]
+    return parse_ints(string, base).tolist()
 
 def list_to_string(
         list_to_convert: List[int],
@@ -16,15 +20,9 @@ def list_to_string(
     """convert List[int]: [1,2,3,...] to string: "1 2 3 ..."
 
     :param list_to_convert: list with integers to convert
+    :param fill: minimum number of binary or hexadecimal digits
     """
-    if base == 2:
-        int_to_base = lambda x: f'{x:0{fill}b}'
-    elif base == 10:
-        int_to_base = lambda x: f'{x}'
-    else:
-        int_to_base = lambda x: f'{x:0{fill}x}'
-
-    return ' '.join(int_to_base(x) for x in list_to_convert)
+    return format_ints(list_to_convert, base, fill if base != 10 else 0)
 
 def iterable_to_string(iterable: Iterable[int]) -> str:
     """Decodes iterable as string. Each element is treated as utf-8 byte
@@ -43,6 +41,13 @@ def string_to_list(string: str) -> List[int]:
     """
     return list(string.encode(errors="surrogateescape"))
 
+def default_cache_directory() -> Path:
+    """User cache directory: %LOCALAPPDATA%/phyether or $XDG_CACHE_HOME/phyether"""
+    if os.name == 'nt' and 'LOCALAPPDATA' in os.environ:
+        return Path(os.environ['LOCALAPPDATA']) / 'phyether' / 'cache'
+    cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(cache_home) / 'phyether'
+
 def removeprefix(string: str, prefix: str) -> str:
     return string[len(prefix):] if string.startswith(prefix) else string
 
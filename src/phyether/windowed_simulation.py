@@ -0,0 +1,186 @@
+import math
+import multiprocessing
+import random
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Literal, Optional, Tuple
+
+import numpy as np
+
+from PySpice.Probe.WaveForm import TransientAnalysis
+from PySpice.Spice.NgSpice.Shared import NgSpiceShared
+
+from phyether.accuracy import Accuracy
+from phyether.probe import Probe
+from phyether.result_cache import ResultCache
+from phyether.spice_session import transient_from_arrays
+from phyether.twisted_pair import TwistedPair
+
+
+# pair created once in every worker process, its circuit stays loaded between windows
+_worker_pair: Optional[TwistedPair] = None
+
+
+class _Window:
+    def __init__(self, symbols: List[int], lead: int,
+                 global_start: float, end_time: float, settled: bool = False) -> None:
+        """One window of symbol stream
+
+        :param symbols: symbols to simulate, starting with overlap
+        :param lead: number of overlap symbols before window
+        :param global_start: time in seconds of first window symbol in whole stream
+        :param end_time: simulation end time in seconds
+        :param settled: start from DC operating point at voltage of first symbol
+        """
+        self.symbols = symbols
+        self.lead = lead
+        self.global_start = global_start
+        self.end_time = end_time
+        self.settled = settled
+
+
+def _init_worker(library_path: str, pair_kwargs: Dict[str, Any]) -> None:
+    global _worker_pair
+    NgSpiceShared.LIBRARY_PATH = library_path
+    _worker_pair = TwistedPair(**pair_kwargs)
+
+
+def _simulate_window(window: _Window, voltage_offset: float, accuracy: Accuracy,
+                     probe: Optional[Probe], cache: Optional[ResultCache]
+                     ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    assert _worker_pair is not None
+    return _simulate_pair_window(_worker_pair, window, voltage_offset, accuracy, probe, cache)
+
+
+def _simulate_pair_window(pair: TwistedPair, window: _Window, voltage_offset: float,
+                          accuracy: Accuracy = 'normal',
+                          probe: Optional[Probe] = None,
+                          cache: Optional[ResultCache] = None
+                          ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    start_time = window.lead * float(pair.dac.symbol_time)
+    analysis = pair._transient(window.symbols, start_time, window.end_time, voltage_offset,
+                               window.settled, accuracy, probe, cache)
+    time = analysis.time.as_ndarray() - start_time + window.global_start
+    return time, {name: node.as_ndarray().copy() for name, node in analysis.nodes.items()}
+
+
+def overlap_symbols(pair: TwistedPair, settling_time: Optional[float] = None) -> int:
+    """Number of symbols simulated before each window
+
+    :param pair: simulated twisted pair
+    :param settling_time: time in ns for reflections to settle, defaults to transmission delay
+    :return: symbols covering transmission delay + settling time
+    """
+    delay = float(pair.transmission_delay)
+    settling = delay if settling_time is None else settling_time * 1e-9
+    return math.ceil((delay + settling) / float(pair.dac.symbol_time)) + 1
+
+
+def simulate_windowed(pair: TwistedPair,
+                      data: Iterable[int],
+                      window_symbols: int = 1000,
+                      settling_time: Optional[float] = None,
+                      processes: Optional[int] = None,
+                      presimulation_ratio: int = 0,
+                      voltage_offset: float = 0,
+                      warm_start: Literal['presimulation', 'dc'] = 'presimulation',
+                      seed: Optional[int] = None,
+                      seam_tolerance: float = 0.01,
+                      accuracy: Accuracy = 'normal',
+                      probe: Optional[Probe] = None,
+                      cache: Optional[ResultCache] = None) -> TransientAnalysis:
+    """Simulate long symbol stream in windows running in separate processes
+
+    Every window is preceded by overlap of at least transmission delay + settling time
+    worth of symbols, which is simulated and discarded, so that line state at the start
+    of the window matches continuous simulation. Windows are stitched into one waveform
+    with the same time axis as :meth:`TwistedPair.simulate`.
+
+    :param pair: twisted pair to simulate, every process creates its own copy
+    :param data: Symbol data to send over twisted pair.
+    :param window_symbols: number of symbols kept from every window, defaults to 1000
+    :param settling_time: time in ns for reflections to settle, defaults to transmission delay
+    :param processes: number of worker processes, defaults to number of CPUs.
+        If 1 windows are simulated one after another in this process
+    :param presimulation_ratio: Simulate ratio * transmission_delay worth of random signals
+        before first window, defaults to 0
+    :param voltage_offset: Voltage offset of one pair relative to ground, defaults to 0
+    :param warm_start: How line is settled before first window, see :meth:`TwistedPair.simulate`
+    :param seed: Seed of presimulation symbols, defaults to None
+    :param seam_tolerance: Maximum voltage difference between windows at seams,
+        a warning is issued if it's exceeded, defaults to 0.01
+    :param accuracy: Accuracy preset, see :meth:`TwistedPair.simulate`, defaults to 'normal'
+    :param probe: Nodes to save and their resolution, defaults to all nodes
+    :param cache: Cache of window results consulted before running ngspice, defaults to None
+    :return: Transient analysis simulation of whole stream
+    """
+    symbols = list(data)
+    if not symbols:
+        raise ValueError("No symbols to simulate")
+    symbol_time = float(pair.dac.symbol_time)
+    overlap = overlap_symbols(pair, settling_time)
+    if warm_start == 'dc':
+        presimulation_ratio = 0
+    rng = random.Random(seed) if seed is not None else None
+    _, first_symbols = pair._get_presignals([], presimulation_ratio, rng)
+
+    windows: List[_Window] = []
+    for start in range(0, len(symbols), window_symbols):
+        stop = min(start + window_symbols, len(symbols))
+        first = max(0, start - overlap)
+        lead_symbols = first_symbols if start == 0 else []
+        # one symbol past the seam to compare with next window
+        window_data = lead_symbols + symbols[first:stop + 1]
+        lead = start - first + len(lead_symbols)
+        if stop == len(symbols):
+            end_time = (len(window_data) * symbol_time
+                        + float(pair.transmission_delay) + 2 * float(pair.dac.rise_time))
+        else:
+            end_time = len(window_data) * symbol_time
+        windows.append(_Window(window_data, lead, start * symbol_time, end_time,
+                               settled=start == 0 and warm_start == 'dc'))
+
+    if processes == 1 or len(windows) == 1:
+        results = [_simulate_pair_window(pair, window, voltage_offset, accuracy, probe, cache)
+                   for window in windows]
+    else:
+        # spawn: forked child would inherit loaded ngspice library of parent process
+        with ProcessPoolExecutor(max_workers=processes,
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker,
+                                 initargs=(NgSpiceShared.LIBRARY_PATH,
+                                           pair._init_kwargs())) as executor:
+            results = list(executor.map(_simulate_window, windows,
+                                        [voltage_offset] * len(windows),
+                                        [accuracy] * len(windows),
+                                        [probe] * len(windows),
+                                        [cache] * len(windows)))
+
+    return _stitch(windows, results, seam_tolerance)
+
+
+def _stitch(windows: List[_Window],
+            results: List[Tuple[np.ndarray, Dict[str, np.ndarray]]],
+            seam_tolerance: float) -> TransientAnalysis:
+    times: List[np.ndarray] = []
+    nodes: Dict[str, List[np.ndarray]] = {name: [] for name in results[0][1]}
+    for index, (window, (time, values)) in enumerate(zip(windows, results)):
+        if index + 1 < len(windows):
+            seam = windows[index + 1].global_start
+            keep = time < seam
+            next_time, next_values = results[index + 1]
+            for name, node in values.items():
+                difference = abs(np.interp(next_time[0], time, node) - next_values[name][0])
+                if difference > seam_tolerance:
+                    warnings.warn(f"Discontinuity of {difference:.3g} V in {name} at {seam:.4g} s, "
+                                  "increase settling time")
+        else:
+            keep = np.ones(len(time), dtype=bool)
+        keep &= time >= window.global_start
+        times.append(time[keep])
+        for name, node in values.items():
+            nodes[name].append(node[keep])
+
+    return transient_from_arrays(
+        np.concatenate(times),
+        {name: np.concatenate(node) for name, node in nodes.items()})
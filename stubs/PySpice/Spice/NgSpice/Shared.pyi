@@ -1,5 +1,9 @@
 from _typeshed import Incomplete
 
+ffi: Incomplete
+
+def ffi_string_utf8(_) -> str: ...
+
 class NgSpiceCircuitError(NameError): ...
 class NgSpiceCommandError(NameError): ...
 
@@ -29,6 +33,8 @@ class NgSpiceShared:
     LIBRARY_PATH: Incomplete
     MAX_COMMAND_LENGTH: int
     NUMBER_OF_EXEC_CALLS_TO_RELEASE_MEMORY: int
+    _instances: dict[int, NgSpiceShared]
+    _ngspice_shared: Incomplete
     @classmethod
     def setup_platform(cls) -> None: ...
     @classmethod
@@ -0,0 +1,102 @@
+import random
+
+import numpy as np
+import pytest
+
+from phyether.conversions import convert_ints, format_ints, parse_ints
+
+BASES = {2: 'b', 10: 'd', 16: 'x'}
+
+
+def _random_values(count: int, seed: int):
+    rng = random.Random(seed)
+    return [rng.randrange(0, 1 << rng.randrange(1, 60)) for _ in range(count)]
+
+
+@pytest.mark.parametrize('base', BASES)
+@pytest.mark.parametrize('fill', [0, 1, 4, 70])
+def test_round_trip(base, fill):
+    values = _random_values(500, base + fill) + [0, 1, 2**62, 2**63 - 1]
+    text = format_ints(values, base, fill)
+    assert text == ' '.join(f'{value:0{fill}{BASES[base]}}' for value in values)
+    parsed = parse_ints(text, base)
+    assert parsed.tolist() == [int(token, base) for token in text.split()] == values
+
+
+@pytest.mark.parametrize('base', BASES)
+def test_parse_int64(base):
+    values = _random_values(500, base)
+    parsed = parse_ints(format_ints(values, base), base)
+    assert parsed.dtype == np.int64
+    assert parsed.tolist() == values
+
+
+@pytest.mark.parametrize('base', BASES)
+def test_numpy_input(base):
+    values = np.array(_random_values(100, base), dtype=np.int64)
+    assert format_ints(values, base) == format_ints(values.tolist(), base)
+    unsigned = values.astype(np.uint16)
+    assert format_ints(unsigned, base, 4) == ' '.join(
+        f'{value:04{BASES[base]}}' for value in unsigned.tolist())
+
+
+def test_upper_case_hex():
+    text = 'FF 0A deadBEEF\t7f\n'
+    assert parse_ints(text, 16).tolist() == [int(token, 16) for token in text.split()]
+
+
+def test_whitespace():
+    assert parse_ints('  1\t\t2\n\r3  ', 10).tolist() == [1, 2, 3]
+
+
+@pytest.mark.parametrize('base', BASES)
+def test_empty(base):
+    for text in ('', '   ', '\n\t'):
+        parsed = parse_ints(text, base)
+        assert parsed.dtype == np.int64 and parsed.size == 0
+    assert format_ints([], base) == ''
+    assert format_ints(np.zeros(0, dtype=np.int64), base, 4) == ''
+
+
+@pytest.mark.parametrize('base', BASES)
+def test_beyond_int64(base):
+    values = [2**63, 2**100 + 12345, 5]
+    text = ' '.join(f'{value:{BASES[base]}}' for value in values)
+    parsed = parse_ints(text, base)
+    assert parsed.dtype == object
+    assert parsed.tolist() == values
+    assert format_ints(values, base) == text
+    assert format_ints(np.array([2**64 - 1], dtype=np.uint64), base) == \
+        f'{2**64 - 1:{BASES[base]}}'
+
+
+@pytest.mark.parametrize('base', BASES)
+@pytest.mark.parametrize('fill', [0, 5])
+def test_negative(base, fill):
+    values = [-1, 0, -(2**70), 42, -255]
+    text = format_ints(values, base, fill)
+    assert text == ' '.join(f'{value:0{fill}{BASES[base]}}' for value in values)
+    assert parse_ints(text, base).tolist() == values
+    assert parse_ints('-1 +1', base).tolist() == [-1, 1]
+
+
+def test_prefixes():
+    assert parse_ints('0x1f 0XaB', 16).tolist() == [0x1f, 0xab]
+    assert parse_ints('0b101 0B1', 2).tolist() == [0b101, 1]
+
+
+@pytest.mark.parametrize('text, base', [('12 z', 10), ('102', 2), ('1g', 16),
+                                        ('0x1f', 10), ('1.5', 10), ('-', 10)])
+def test_invalid(text, base):
+    with pytest.raises(ValueError):
+        parse_ints(text, base)
+
+
+def test_unsupported_format_base():
+    with pytest.raises(ValueError):
+        format_ints([1], 17)
+
+
+def test_convert():
+    assert convert_ints('255 16 0', 10, 16, 2) == 'ff 10 00'
+    assert convert_ints('ff 10 0', 16, 2) == '11111111 10000 0'
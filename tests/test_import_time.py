@@ -0,0 +1,54 @@
+"""Cold import time of phyether modules against budgets
+
+Every module is imported in a fresh interpreter with ``python -X importtime``.
+"""
+import importlib.util
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+import pytest
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+# module -> (budget in seconds, modules that must not be imported)
+BUDGETS: Dict[str, Tuple[float, Sequence[str]]] = {
+    "phyether": (0.05, ("numpy", "galois", "PySpice", "PyQt5", "matplotlib")),
+    "phyether.main": (0.05, ("galois", "PySpice", "PyQt5", "matplotlib")),
+    "phyether.reed_solomon": (2.0, ("PyQt5", "matplotlib")),
+    "phyether.cli": (2.0, ("PyQt5", "matplotlib")),
+    "phyether.gui.gui": (1.0, ("galois", "matplotlib")),
+}
+
+
+def import_time(module: str) -> Tuple[float, Dict[str, float]]:
+    """Cumulative import time of module and of every imported top-level package"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (str(SRC), env.get("PYTHONPATH"))))
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             capture_output=True, text=True, env=env)
+    assert process.returncode == 0, process.stderr.splitlines()[-1:]
+    packages: Dict[str, float] = {}
+    total = 0.0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        seconds = int(cumulative) / 1e6
+        name = name.strip()
+        packages[name.split(".")[0]] = max(packages.get(name.split(".")[0], 0), seconds)
+        if name == module:
+            total = seconds
+    return total, packages
+
+
+@pytest.mark.parametrize("module", BUDGETS)
+def test_import_time(module):
+    if module.startswith("phyether.gui") and importlib.util.find_spec("PyQt5") is None:
+        pytest.skip("PyQt5 isn't installed")
+    budget, forbidden = BUDGETS[module]
+    seconds, packages = import_time(module)
+    assert not [package for package in forbidden if package in packages]
+    assert seconds <= budget
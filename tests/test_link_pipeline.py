@@ -0,0 +1,32 @@
+import pytest
+
+from phyether.dac import DAC
+from phyether.link_pipeline import LinkPipeline, ResponseChannel
+from phyether.reed_solomon import RS_Original
+
+TEXT = b"The quick brown fox jumps over the lazy dog. " * 120
+
+
+@pytest.fixture(scope="module")
+def channel():
+    return ResponseChannel(DAC(1, 7, 15, 2), [1.0])
+
+
+@pytest.mark.parametrize("payload", [bytes(5000), TEXT], ids=["zeros", "text"])
+@pytest.mark.parametrize("use_dsq128", [False, True])
+def test_identity_channel_without_errors(channel, payload, use_dsq128):
+    result = LinkPipeline(channel, use_dsq128=use_dsq128).simulate(payload, seed=0)
+    assert result.bits == len(payload) * 8
+    assert result.symbol_errors == 0
+    assert result.bit_errors == 0
+
+
+@pytest.mark.parametrize("payload", [bytes(5000), TEXT], ids=["zeros", "text"])
+def test_identity_channel_with_reed_solomon(channel, payload):
+    pipeline = LinkPipeline(channel, reed_solomon=RS_Original(360, 326, 1024),
+                            batch_symbols=4096)
+    result = pipeline.simulate(payload, seed=0)
+    assert result.bits == len(payload) * 8
+    assert result.coded_bit_errors == 0
+    assert result.failed_codewords == 0
+    assert result.bit_errors == 0